@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ponto de reposição e alertas de estoque baixo
+
+Cada produto tem `estoque_minimo` (0 = sem alerta). Um produto está
+abaixo do ponto de reposição quando estoque < estoque_minimo.
+
+Índices parciais (só guardam as linhas que interessam aos relatórios da
+loja, então ficam pequenos e baratos de manter):
+    idx_produtos_estoque_baixo  (estoque, estoque_minimo, nome, tamanho)
+                                WHERE estoque < estoque_minimo
+                                (cobre o relatório e a sugestão de compras
+                                sem ler a tabela)
+    idx_produtos_valor_estoque  (tamanho, preco * estoque) WHERE estoque > 0
+
+Os alertas são incrementais: triggers gravam em `alertas_estoque` só a
+passagem de "ok" para "abaixo do mínimo" (cadastro já abaixo, baixa de
+estoque ou mínimo aumentado). O vigia lê apenas os alertas com id acima
+da última marca, em vez de recalcular a lista toda a cada verificação, e
+descarta os produtos que já foram repostos nesse meio-tempo.
+
+Uso:
+    python alertas_estoque.py vigiar --intervalo 180
+    python alertas_estoque.py limpar --dias 30
+"""
+
+import argparse
+import sqlite3
+import time
+
+AGORA = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+INDICE_ESTOQUE_BAIXO = """
+    CREATE INDEX IF NOT EXISTS idx_produtos_estoque_baixo
+    ON produtos (estoque, estoque_minimo, nome, tamanho) WHERE estoque < estoque_minimo
+    """
+
+
+def criar_estrutura_estoque(db_manager):
+    """Cria os índices parciais, a tabela de alertas e os triggers"""
+    # Recria o índice se ele existir com outra definição (versão anterior só com estoque)
+    for arquivo in db_manager.arquivos_da_tabela("produtos"):
+        conn = db_manager.abrir_conexao(arquivo)
+        try:
+            atual = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?",
+                                 ("idx_produtos_estoque_baixo",)).fetchone()
+        finally:
+            conn.close()
+        esperado = " ".join(INDICE_ESTOQUE_BAIXO.replace("IF NOT EXISTS ", "").split())
+        if atual and " ".join(atual[0].split()) != esperado:
+            db_manager.executar_query("DROP INDEX IF EXISTS idx_produtos_estoque_baixo")
+    db_manager.executar_query(INDICE_ESTOQUE_BAIXO)
+    db_manager.executar_query("""
+    CREATE INDEX IF NOT EXISTS idx_produtos_valor_estoque
+    ON produtos (tamanho, preco * estoque) WHERE estoque > 0
+    """)
+    db_manager.executar_query("""
+    CREATE TABLE IF NOT EXISTS alertas_estoque (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        produto_id INTEGER NOT NULL,
+        estoque INTEGER,
+        estoque_minimo INTEGER NOT NULL,
+        data TEXT NOT NULL
+    )
+    """)
+    db_manager.executar_query(f"""
+    CREATE TRIGGER IF NOT EXISTS alertas_estoque_insert AFTER INSERT ON produtos
+    WHEN NEW.estoque < NEW.estoque_minimo
+    BEGIN
+        INSERT INTO alertas_estoque (produto_id, estoque, estoque_minimo, data)
+        VALUES (NEW.id, NEW.estoque, NEW.estoque_minimo, {AGORA});
+    END
+    """)
+    db_manager.executar_query(f"""
+    CREATE TRIGGER IF NOT EXISTS alertas_estoque_update AFTER UPDATE OF estoque, estoque_minimo ON produtos
+    WHEN NEW.estoque < NEW.estoque_minimo AND NOT (OLD.estoque < OLD.estoque_minimo)
+    BEGIN
+        INSERT INTO alertas_estoque (produto_id, estoque, estoque_minimo, data)
+        VALUES (NEW.id, NEW.estoque, NEW.estoque_minimo, {AGORA});
+    END
+    """)
+
+
+class VigiaEstoque:
+    """Devolve só os produtos que cruzaram o mínimo desde a última verificação"""
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self.marcas = {}  # arquivo -> último alertas_estoque.id já visto
+
+    def _maior_id(self, conn):
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM alertas_estoque").fetchone()[0]
+
+    def iniciar(self):
+        """Ignora os alertas antigos: só o que cruzar daqui em diante é avisado"""
+        for arquivo in self.db.arquivos_da_tabela("produtos"):
+            conn = self.db.abrir_conexao(arquivo)
+            try:
+                self.marcas[arquivo] = self._maior_id(conn)
+            except sqlite3.Error as e:
+                print(f" Erro ao iniciar alertas de estoque: {e}")
+            finally:
+                conn.close()
+
+    def verificar(self):
+        """Lista de produtos (linhas) que ficaram abaixo do mínimo desde a última chamada"""
+        if not self.marcas:
+            self.iniciar()
+            return []
+
+        novos = []
+        # Com shards, cada arquivo tem os alertas (e os ids) dos próprios produtos
+        for arquivo in self.db.arquivos_da_tabela("produtos"):
+            conn = self.db.abrir_conexao(arquivo)
+            try:
+                # O limite é lido antes: o que entrar durante a leitura fica para a próxima
+                ate = self._maior_id(conn)
+                linhas = conn.execute("""
+                    SELECT a.id AS alerta_id, p.id, p.nome, p.tamanho, p.estoque, p.estoque_minimo
+                    FROM alertas_estoque a JOIN produtos p ON p.id = a.produto_id
+                    WHERE a.id > ? AND a.id <= ? AND p.estoque < p.estoque_minimo
+                    ORDER BY a.id
+                """, (self.marcas.get(arquivo, 0), ate)).fetchall()
+                vistos = set()
+                for linha in linhas:
+                    if linha["id"] not in vistos:
+                        vistos.add(linha["id"])
+                        novos.append(linha)
+                # A marca avança mesmo sobre os alertas de produtos já repostos
+                self.marcas[arquivo] = max(ate, self.marcas.get(arquivo, 0))
+            except sqlite3.Error as e:
+                print(f" Erro ao verificar alertas de estoque: {e}")
+            finally:
+                conn.close()
+        return novos
+
+
+def imprimir_alertas(alertas):
+    for produto in alertas:
+        print(f" ALERTA: {produto['nome']} ({produto['tamanho']}) com {produto['estoque']} "
+              f"em estoque, mínimo {produto['estoque_minimo']} (ID {produto['id']})")
+
+
+def limpar_alertas(db_manager, dias=30, arquivos=None):
+    """Apaga alertas com mais de `dias` dias; devolve quantos saíram"""
+    removidos = 0
+    for arquivo in arquivos or db_manager.arquivos_da_tabela("produtos"):
+        conn = db_manager.abrir_conexao(arquivo)
+        try:
+            cursor = conn.execute("DELETE FROM alertas_estoque WHERE data < datetime('now', ?)",
+                                  (f"-{int(dias)} days",))
+            conn.commit()
+            removidos += max(cursor.rowcount, 0)
+        except sqlite3.Error as e:
+            print(f" Erro ao limpar alertas de estoque: {e}")
+        finally:
+            conn.close()
+    return removidos
+
+
+def main():
+    from database import DatabaseManager
+    from sharding import carregar_mapa_padrao
+
+    parser = argparse.ArgumentParser(description="Alertas de estoque abaixo do ponto de reposição")
+    parser.add_argument("--banco", default="sistema_comercial.db")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    vig = sub.add_parser("vigiar", help="Avisa os produtos que ficarem abaixo do mínimo")
+    vig.add_argument("--intervalo", type=float, default=180, help="segundos entre verificações")
+    lim = sub.add_parser("limpar", help="Apaga alertas antigos")
+    lim.add_argument("--dias", type=int, default=30)
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.banco, mapa_shards=carregar_mapa_padrao())
+    if args.comando == "vigiar":
+        vigia = VigiaEstoque(db)
+        vigia.iniciar()
+        print(f" Vigiando o estoque a cada {args.intervalo:g}s (Ctrl+C para sair)...")
+        try:
+            while True:
+                time.sleep(args.intervalo)
+                imprimir_alertas(vigia.verificar())
+        except KeyboardInterrupt:
+            print()
+    else:
+        print(f" {limpar_alertas(db, args.dias)} alertas removidos.")
+
+
+if __name__ == "__main__":
+    main()
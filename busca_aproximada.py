@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Busca aproximada (trigramas) por nome de clientes e fornecedores
+
+Os nomes são normalizados (normalizar_nome_busca: sem acentos, caixa,
+letras dobradas e grafias equivalentes em português) e quebrados em
+trigramas, guardados em `busca_trigramas` (chave primária
+(tabela, trigrama, linha_id), sem rowid, e índice por (tabela, linha_id)
+para as exclusões).
+
+Manutenção do índice:
+    - triggers anotam em `busca_pendentes` toda linha inserida ou com nome
+      alterado (a normalização é feita em Python, então não pode rodar
+      dentro do trigger);
+    - as pendências são processadas antes de cada busca e pela thread de
+      manutenção; exclusões são removidas direto pelo trigger.
+
+Busca:
+    1. gera os trigramas do termo;
+    2. para similaridade mínima s, um resultado precisa ter pelo menos
+       ceil(s * k) dos k trigramas; então basta buscar candidatos nos
+       (k - mínimo + 1) trigramas mais raros (filtro de prefixo), usando a
+       frequência de cada trigrama em `busca_frequencias`;
+    3. calcula a similaridade (Jaccard dos trigramas) só dos candidatos.
+
+A busca começa com similaridade alta (prefixo curto, poucos candidatos) e
+só desce até SIMILARIDADE_MINIMA se ainda não tiver `limite` resultados.
+"""
+
+import heapq
+import math
+import sqlite3
+
+from normalizacao import normalizar_nome_busca
+
+TABELAS_BUSCA = ("clientes", "fornecedores")
+SIMILARIDADE_MINIMA = 0.3
+LIMITE_CANDIDATOS = 20000
+
+
+def trigramas(nome_normalizado):
+    """Trigramas no estilo do pg_trgm: cada palavra com 2 espaços antes e 1 depois"""
+    resultado = set()
+    for palavra in nome_normalizado.split():
+        palavra = f"  {palavra} "
+        for i in range(len(palavra) - 2):
+            resultado.add(palavra[i:i + 3])
+    return resultado
+
+
+def similaridade(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def criar_estrutura_busca(db_manager):
+    """Cria as tabelas do índice de trigramas e os triggers"""
+    db_manager.executar_query("""
+    CREATE TABLE IF NOT EXISTS busca_trigramas (
+        tabela TEXT NOT NULL,
+        trigrama TEXT NOT NULL,
+        linha_id INTEGER NOT NULL,
+        PRIMARY KEY (tabela, trigrama, linha_id)
+    ) WITHOUT ROWID
+    """)
+    db_manager.executar_query("""
+    CREATE INDEX IF NOT EXISTS idx_busca_trigramas_linha ON busca_trigramas (tabela, linha_id)
+    """)
+    db_manager.executar_query("""
+    CREATE TABLE IF NOT EXISTS busca_nomes (
+        tabela TEXT NOT NULL,
+        linha_id INTEGER NOT NULL,
+        nome_normalizado TEXT NOT NULL,
+        PRIMARY KEY (tabela, linha_id)
+    ) WITHOUT ROWID
+    """)
+    db_manager.executar_query("""
+    CREATE TABLE IF NOT EXISTS busca_frequencias (
+        tabela TEXT NOT NULL,
+        trigrama TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        PRIMARY KEY (tabela, trigrama)
+    ) WITHOUT ROWID
+    """)
+    db_manager.executar_query("""
+    CREATE TABLE IF NOT EXISTS busca_pendentes (
+        tabela TEXT NOT NULL,
+        linha_id INTEGER NOT NULL,
+        PRIMARY KEY (tabela, linha_id)
+    ) WITHOUT ROWID
+    """)
+    for tabela in TABELAS_BUSCA:
+        db_manager.executar_query(f"""
+        CREATE TRIGGER IF NOT EXISTS busca_{tabela}_insert AFTER INSERT ON {tabela}
+        BEGIN
+            INSERT OR IGNORE INTO busca_pendentes (tabela, linha_id) VALUES ('{tabela}', NEW.id);
+        END
+        """)
+        db_manager.executar_query(f"""
+        CREATE TRIGGER IF NOT EXISTS busca_{tabela}_update AFTER UPDATE OF nome ON {tabela}
+        WHEN OLD.nome IS NOT NEW.nome
+        BEGIN
+            INSERT OR IGNORE INTO busca_pendentes (tabela, linha_id) VALUES ('{tabela}', NEW.id);
+        END
+        """)
+        db_manager.executar_query(f"""
+        CREATE TRIGGER IF NOT EXISTS busca_{tabela}_delete AFTER DELETE ON {tabela}
+        BEGIN
+            UPDATE busca_frequencias SET total = total - 1
+            WHERE tabela = '{tabela}' AND trigrama IN (
+                SELECT trigrama FROM busca_trigramas WHERE tabela = '{tabela}' AND linha_id = OLD.id
+            );
+            DELETE FROM busca_trigramas WHERE tabela = '{tabela}' AND linha_id = OLD.id;
+            DELETE FROM busca_nomes WHERE tabela = '{tabela}' AND linha_id = OLD.id;
+            DELETE FROM busca_pendentes WHERE tabela = '{tabela}' AND linha_id = OLD.id;
+        END
+        """)
+        # Linhas que existiam antes do índice
+        db_manager.executar_query(f"""
+        INSERT OR IGNORE INTO busca_pendentes (tabela, linha_id)
+        SELECT '{tabela}', id FROM {tabela}
+        WHERE NOT EXISTS (SELECT 1 FROM busca_nomes WHERE tabela = '{tabela}' AND linha_id = {tabela}.id)
+        """)
+
+
+def processar_pendentes(db_manager, lote=2000, arquivos=None):
+    """Indexa as linhas anotadas pelos triggers; retorna quantas foram processadas"""
+    processadas = 0
+    for arquivo in arquivos or db_manager.arquivos():
+        conn = db_manager.abrir_conexao(arquivo)
+        conn.row_factory = None
+        try:
+            while True:
+                pendentes = conn.execute(
+                    "SELECT tabela, linha_id FROM busca_pendentes LIMIT ?", (lote,)).fetchall()
+                if not pendentes:
+                    break
+                for tabela, linha_id in pendentes:
+                    _indexar_linha(conn, tabela, linha_id)
+                conn.executemany("DELETE FROM busca_pendentes WHERE tabela = ? AND linha_id = ?", pendentes)
+                conn.commit()
+                processadas += len(pendentes)
+        except sqlite3.Error as e:
+            print(f" Erro ao atualizar índice de busca: {e}")
+        finally:
+            conn.close()
+    return processadas
+
+
+def _indexar_linha(conn, tabela, linha_id):
+    linha = conn.execute(f"SELECT nome FROM {tabela} WHERE id = ?", (linha_id,)).fetchone()
+    antigo = conn.execute("SELECT nome_normalizado FROM busca_nomes WHERE tabela = ? AND linha_id = ?",
+                          (tabela, linha_id)).fetchone()
+    velhos = trigramas(antigo[0]) if antigo else set()
+    if linha is None:
+        novo_nome, novos = None, set()
+    else:
+        novo_nome = normalizar_nome_busca(linha[0])
+        novos = trigramas(novo_nome)
+
+    removidos = velhos - novos
+    adicionados = novos - velhos
+    if removidos:
+        conn.executemany("DELETE FROM busca_trigramas WHERE tabela = ? AND trigrama = ? AND linha_id = ?",
+                         [(tabela, t, linha_id) for t in removidos])
+        conn.executemany("UPDATE busca_frequencias SET total = total - 1 WHERE tabela = ? AND trigrama = ?",
+                         [(tabela, t) for t in removidos])
+    if adicionados:
+        conn.executemany("INSERT OR IGNORE INTO busca_trigramas (tabela, trigrama, linha_id) VALUES (?, ?, ?)",
+                         [(tabela, t, linha_id) for t in adicionados])
+        conn.executemany("""
+            INSERT INTO busca_frequencias (tabela, trigrama, total) VALUES (?, ?, 1)
+            ON CONFLICT(tabela, trigrama) DO UPDATE SET total = total + 1
+        """, [(tabela, t) for t in adicionados])
+    if novo_nome is None:
+        conn.execute("DELETE FROM busca_nomes WHERE tabela = ? AND linha_id = ?", (tabela, linha_id))
+    else:
+        conn.execute("INSERT OR REPLACE INTO busca_nomes (tabela, linha_id, nome_normalizado) VALUES (?, ?, ?)",
+                     (tabela, linha_id, novo_nome))
+
+
+def buscar_aproximado(db_manager, tabela, termo, limite=10, similaridade_minima=SIMILARIDADE_MINIMA):
+    """
+    Devolve até `limite` linhas de `tabela` com nome parecido com `termo`,
+    como lista de (similaridade, linha), da mais parecida para a menos.
+    """
+    if tabela not in TABELAS_BUSCA:
+        return []
+    processar_pendentes(db_manager)
+
+    alvo = trigramas(normalizar_nome_busca(termo))
+    if not alvo:
+        return []
+
+    resultado = []
+    # Com shards, cada arquivo tem o índice das próprias linhas
+    for arquivo in db_manager.arquivos_da_tabela(tabela):
+        conn = db_manager.abrir_conexao(arquivo)
+        try:
+            for nota, linha_id in _melhores_do_arquivo(conn, tabela, alvo, limite, similaridade_minima):
+                linha = conn.execute(f"SELECT * FROM {tabela} WHERE id = ?", (linha_id,)).fetchone()
+                if linha:
+                    resultado.append((nota, linha))
+        except sqlite3.Error as e:
+            print(f" Erro na busca aproximada: {e}")
+        finally:
+            conn.close()
+    resultado.sort(key=lambda item: (-item[0], item[1]["id"]))
+    return resultado[:limite]
+
+
+def _melhores_do_arquivo(conn, tabela, alvo, limite, similaridade_minima):
+    marcadores = ", ".join("?" * len(alvo))
+    frequencias = dict(conn.execute(f"""
+        SELECT trigrama, total FROM busca_frequencias
+        WHERE tabela = ? AND trigrama IN ({marcadores})
+    """, (tabela, *alvo)).fetchall())
+    # Trigramas que não existem no índice não geram candidatos
+    presentes = sorted((t for t in alvo if frequencias.get(t)), key=lambda t: frequencias[t])
+
+    melhores = []
+    notas_por_nome = {}  # nomes repetidos (ex.: "maria silva") são pontuados uma vez
+    vistos = set()
+    pontuados = []
+    # Começa exigente (poucos trigramas raros, poucos candidatos) e só
+    # afrouxa a similaridade se ainda faltarem resultados
+    for minima in sorted({0.8, 0.6, similaridade_minima}, reverse=True):
+        if minima < similaridade_minima:
+            continue
+        minimo = max(1, math.ceil(minima * len(alvo)))
+        prefixo = presentes[:max(0, len(alvo) - minimo + 1)]
+        candidatos = set()
+        for trigrama in prefixo:
+            for (linha_id,) in conn.execute(
+                    "SELECT linha_id FROM busca_trigramas WHERE tabela = ? AND trigrama = ?",
+                    (tabela, trigrama)):
+                if linha_id not in vistos:
+                    candidatos.add(linha_id)
+            if len(candidatos) > LIMITE_CANDIDATOS:
+                break
+        vistos |= candidatos
+
+        ids = list(candidatos)
+        for inicio in range(0, len(ids), 500):
+            bloco = ids[inicio:inicio + 500]
+            for linha_id, nome in conn.execute(f"""
+                SELECT linha_id, nome_normalizado FROM busca_nomes
+                WHERE tabela = ? AND linha_id IN ({', '.join('?' * len(bloco))})
+            """, (tabela, *bloco)):
+                nota = notas_por_nome.get(nome)
+                if nota is None:
+                    nota = notas_por_nome[nome] = similaridade(alvo, trigramas(nome))
+                if nota >= similaridade_minima:
+                    pontuados.append((nota, linha_id))
+        melhores = heapq.nlargest(limite, pontuados)
+        if len(melhores) >= limite and melhores[-1][0] >= minima:
+            break
+    return melhores
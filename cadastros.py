@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cadastros por dia, semana e mês (clientes, fornecedores e produtos)
+
+`cadastros_por_dia` guarda quantos registros de cada tabela foram
+cadastrados em cada dia. Triggers de inserção, exclusão e troca de
+data_cadastro mantêm as contagens, então o relatório de um período lê só
+as linhas dos dias do intervalo (no máximo 3 por dia), em vez de varrer
+as tabelas e interpretar a data de cada linha. Semana e mês são somas
+dos dias.
+
+O arquivamento (arquivamento.py) não conta como exclusão: quem sai para o
+arquivo frio continua contado no dia em que foi cadastrado.
+
+Também cria um índice em data_cadastro de cada tabela, para as consultas
+que precisam das linhas (exclusão por data, arquivamento, conferências).
+
+Benchmark (varredura das tabelas pelo índice de data x contagens;
+200 mil clientes e produtos em 10 anos): 10 anos por mês 383ms -> 7ms,
+1 ano por mês 31ms -> 1ms, 1 mês por dia 4.8ms -> 0.1ms.
+    python cadastros.py --quantidade 200000
+"""
+
+import argparse
+import sqlite3
+import time
+
+TABELAS_CADASTRO = ("clientes", "fornecedores", "produtos")
+
+# Uma query por agrupamento (literais, para o verificar_planos conferir os planos)
+RELATORIOS = {
+    "dia": """
+        SELECT dia AS periodo,
+               SUM(CASE WHEN tabela = 'clientes' THEN total ELSE 0 END) AS clientes,
+               SUM(CASE WHEN tabela = 'fornecedores' THEN total ELSE 0 END) AS fornecedores,
+               SUM(CASE WHEN tabela = 'produtos' THEN total ELSE 0 END) AS produtos
+        FROM cadastros_por_dia WHERE dia >= ? AND dia <= ?
+        GROUP BY dia ORDER BY dia
+    """,
+    "semana": """
+        SELECT date(dia, 'weekday 0', '-6 days') AS periodo,
+               SUM(CASE WHEN tabela = 'clientes' THEN total ELSE 0 END) AS clientes,
+               SUM(CASE WHEN tabela = 'fornecedores' THEN total ELSE 0 END) AS fornecedores,
+               SUM(CASE WHEN tabela = 'produtos' THEN total ELSE 0 END) AS produtos
+        FROM cadastros_por_dia WHERE dia >= ? AND dia <= ?
+        GROUP BY periodo ORDER BY periodo
+    """,
+    "mes": """
+        SELECT strftime('%Y-%m', dia) AS periodo,
+               SUM(CASE WHEN tabela = 'clientes' THEN total ELSE 0 END) AS clientes,
+               SUM(CASE WHEN tabela = 'fornecedores' THEN total ELSE 0 END) AS fornecedores,
+               SUM(CASE WHEN tabela = 'produtos' THEN total ELSE 0 END) AS produtos
+        FROM cadastros_por_dia WHERE dia >= ? AND dia <= ?
+        GROUP BY periodo ORDER BY periodo
+    """,
+}
+
+SOMAR = """
+    INSERT INTO cadastros_por_dia (dia, tabela, total) VALUES (?, ?, ?)
+    ON CONFLICT (dia, tabela) DO UPDATE SET total = total + excluded.total
+"""
+
+
+def _triggers(tabela):
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS cadastros_{tabela}_insert AFTER INSERT ON {tabela}
+        WHEN date(NEW.data_cadastro) IS NOT NULL
+        BEGIN
+            INSERT INTO cadastros_por_dia (dia, tabela, total) VALUES (date(NEW.data_cadastro), '{tabela}', 1)
+            ON CONFLICT (dia, tabela) DO UPDATE SET total = total + 1;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS cadastros_{tabela}_delete AFTER DELETE ON {tabela}
+        WHEN date(OLD.data_cadastro) IS NOT NULL
+        BEGIN
+            UPDATE cadastros_por_dia SET total = total - 1
+            WHERE dia = date(OLD.data_cadastro) AND tabela = '{tabela}';
+            DELETE FROM cadastros_por_dia
+            WHERE dia = date(OLD.data_cadastro) AND tabela = '{tabela}' AND total <= 0;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS cadastros_{tabela}_update AFTER UPDATE OF data_cadastro ON {tabela}
+        WHEN date(OLD.data_cadastro) IS NOT date(NEW.data_cadastro)
+        BEGIN
+            UPDATE cadastros_por_dia SET total = total - 1
+            WHERE dia = date(OLD.data_cadastro) AND tabela = '{tabela}';
+            DELETE FROM cadastros_por_dia
+            WHERE dia = date(OLD.data_cadastro) AND tabela = '{tabela}' AND total <= 0;
+            INSERT INTO cadastros_por_dia (dia, tabela, total)
+            SELECT date(NEW.data_cadastro), '{tabela}', 1 WHERE date(NEW.data_cadastro) IS NOT NULL
+            ON CONFLICT (dia, tabela) DO UPDATE SET total = total + 1;
+        END
+        """,
+    ]
+
+
+def criar_estrutura_cadastros(db_manager):
+    """Índices em data_cadastro, tabela de contagens, triggers e carga inicial"""
+    for tabela in TABELAS_CADASTRO:
+        db_manager.executar_query(f"CREATE INDEX IF NOT EXISTS idx_{tabela}_data_cadastro ON {tabela} (data_cadastro)")
+
+    # Arquivos onde a tabela de contagens ainda não existe precisam da carga inicial
+    novos = []
+    for arquivo in db_manager.arquivos():
+        conn = db_manager.abrir_conexao(arquivo)
+        try:
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cadastros_por_dia'").fetchone():
+                novos.append(arquivo)
+        finally:
+            conn.close()
+
+    db_manager.executar_query("""
+    CREATE TABLE IF NOT EXISTS cadastros_por_dia (
+        dia TEXT NOT NULL,
+        tabela TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        PRIMARY KEY (dia, tabela)
+    ) WITHOUT ROWID
+    """)
+    for tabela in TABELAS_CADASTRO:
+        for sql in _triggers(tabela):
+            db_manager.executar_query(sql)
+
+    for arquivo in novos:
+        conn = db_manager.abrir_conexao(arquivo)
+        try:
+            for tabela in TABELAS_CADASTRO:
+                conn.execute(f"""
+                    INSERT INTO cadastros_por_dia (dia, tabela, total)
+                    SELECT date(data_cadastro), '{tabela}', COUNT(*) FROM {tabela}
+                    WHERE date(data_cadastro) IS NOT NULL GROUP BY 1
+                """)
+            conn.commit()
+            # Quem já estava no arquivo frio também foi cadastrado naquele dia
+            from arquivamento import contar_arquivados
+            contar_arquivados(conn, arquivo)
+        except sqlite3.Error as e:
+            db_manager.falhas += 1
+            print(f" Erro ao calcular cadastros por dia: {e}")
+        finally:
+            conn.close()
+
+
+def somar_cadastros(conn, tabela, contagens):
+    """Soma [(dia, quantidade), ...] às contagens (negativo para descontar)"""
+    conn.executemany(SOMAR, [(dia, tabela, quantidade) for dia, quantidade in contagens])
+    conn.executemany("DELETE FROM cadastros_por_dia WHERE dia = ? AND tabela = ? AND total <= 0",
+                     [(dia, tabela) for dia, _ in contagens])
+
+
+def cadastros_por_periodo(conn, inicio, fim, periodo="mes"):
+    """Linhas (periodo, clientes, fornecedores, produtos) entre as datas AAAA-MM-DD"""
+    return conn.execute(RELATORIOS[periodo], (inicio, fim)).fetchall()
+
+
+def imprimir_cadastros(linhas, periodo="mes"):
+    if not linhas:
+        print(" Nenhum cadastro no período.")
+        return
+    titulo = {"dia": "Dia", "semana": "Semana de", "mes": "Mês"}[periodo]
+    print("-" * 56)
+    print(f"{titulo:<12} {'Clientes':>12} {'Fornecedores':>14} {'Produtos':>12}")
+    print("-" * 56)
+    totais = [0, 0, 0]
+    for linha in linhas:
+        valores = linha[1:]
+        totais = [total + valor for total, valor in zip(totais, valores)]
+        print(f"{linha[0]:<12} {valores[0]:>12} {valores[1]:>14} {valores[2]:>12}")
+    print("-" * 56)
+    print(f"{'Total':<12} {totais[0]:>12} {totais[1]:>14} {totais[2]:>12}")
+
+
+# ----------------------------------------------------------------- benchmark
+
+def benchmark(quantidade=200000, repeticoes=5):
+    import os
+    import shutil
+    import tempfile
+
+    from database import DatabaseManager
+    from dados_exemplo import popular_banco
+
+    pasta = tempfile.mkdtemp(prefix="cadastros_")
+    try:
+        caminho = os.path.join(pasta, "sistema_comercial.db")
+        db = DatabaseManager(caminho)
+        db.criar_tabelas()
+        popular_banco(caminho, produtos=quantidade, clientes=quantidade, fornecedores=quantidade // 10)
+        conn = sqlite3.connect(caminho)
+        # Cadastros espalhados por 10 anos (as triggers movem as contagens)
+        for tabela in TABELAS_CADASTRO:
+            conn.execute(f"UPDATE {tabela} SET data_cadastro = datetime('2015-01-01', '+' || (id % 3650) || ' days')")
+        conn.commit()
+
+        varredura = " UNION ALL ".join(
+            f"SELECT strftime(?, data_cadastro) AS periodo, '{tabela}' AS tabela FROM {tabela} "
+            f"WHERE data_cadastro >= ? AND data_cadastro < date(?, '+1 day')" for tabela in TABELAS_CADASTRO)
+        varredura = f"""
+            SELECT periodo,
+                   SUM(tabela = 'clientes'), SUM(tabela = 'fornecedores'), SUM(tabela = 'produtos')
+            FROM ({varredura}) GROUP BY periodo ORDER BY periodo
+        """
+        print(f"\n {quantidade} clientes e produtos, {quantidade // 10} fornecedores, 10 anos de cadastros")
+        print("-" * 60)
+        print(f"{'Consulta':<28} {'Tabelas':>14} {'Rollup':>14}")
+        print("-" * 60)
+        for rotulo, periodo, inicio, fim in (("10 anos por mês", "mes", "2015-01-01", "2024-12-31"),
+                                             ("1 ano por mês", "mes", "2020-01-01", "2020-12-31"),
+                                             ("1 mês por dia", "dia", "2020-03-01", "2020-03-31")):
+            formato = "%Y-%m" if periodo == "mes" else "%Y-%m-%d"
+            tempos = []
+            for sql, params in ((varredura, (formato, inicio, fim) * len(TABELAS_CADASTRO)),
+                                (RELATORIOS[periodo], (inicio, fim))):
+                melhor = None
+                for _ in range(repeticoes):
+                    comeco = time.perf_counter()
+                    resultado = [tuple(linha) for linha in conn.execute(sql, params)]
+                    duracao = time.perf_counter() - comeco
+                    melhor = duracao if melhor is None else min(melhor, duracao)
+                tempos.append((melhor, resultado))
+            if tempos[0][1] != tempos[1][1]:
+                print(f" Divergência entre varredura e rollup em '{rotulo}'")
+            print(f"{rotulo:<28} {tempos[0][0] * 1000:>12.2f}ms {tempos[1][0] * 1000:>12.2f}ms")
+        conn.close()
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark: relatório de cadastros por varredura x rollup")
+    parser.add_argument("--quantidade", type=int, default=200000)
+    args = parser.parse_args()
+    benchmark(args.quantidade)
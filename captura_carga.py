@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Captura e reprodução de carga real para testes de desempenho
+
+Captura (DatabaseManager.iniciar_captura ou `python main.py --capturar`):
+cada chamada do executar_query vira uma linha NDJSON. O texto de cada SQL
+aparece uma vez só ({"sql": id, "texto": ...}); as chamadas levam o id:
+
+    {"t": 12.345, "th": 1, "sql": 3, "p": ["Camiseta", 49.9], "ms": 0.41, "ok": true}
+
+t   segundos desde o início da captura
+th  número da thread que chamou (a ordem dentro da thread é preservada)
+p   parâmetros; com redigir=True os valores ligados às colunas pessoais
+    (COLUNAS_REDIGIDAS) viram pseudônimos estáveis ("r_" + hash), então
+    valores iguais continuam iguais (UNIQUE, buscas pelo mesmo email) mas
+    nomes, emails e telefones não saem do banco. Tamanhos, datas e os
+    curingas de LIKE ('%termo%' -> '%r_...%') ficam como estão
+ms  tempo original da chamada
+
+Reprodução: copia o banco (API de backup) e reexecuta o log na cópia na
+velocidade original (1x), N vezes mais rápido ou no máximo (0), com
+várias threads; as chamadas de uma mesma thread original vão sempre para
+a mesma thread, na ordem. Relata vazão e distribuição de latência geral e
+por SQL.
+
+Uso:
+    python main.py --capturar carga.ndjson --redigir
+    python captura_carga.py reproduzir carga.ndjson --velocidade 4 --threads 4
+    python captura_carga.py reproduzir carga.ndjson --velocidade 0 --threads 8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+
+COLUNAS_REDIGIDAS = {"nome", "email", "telefone", "endereco", "cnpj"}
+
+_re_insert = re.compile(r"INSERT\s+(?:OR\s+\w+\s+)?INTO\s+\w+\s*\(([^)]*)\)\s*VALUES\s*\((.*)\)", re.I | re.S)
+_re_comparacao = re.compile(r"(\w+)\s*(?:=|<>|!=|<=|>=|<|>|\bLIKE|\bGLOB)\s*$", re.I)
+_re_literal = re.compile(r"'(?:[^']|'')*'")
+
+
+def _pseudonimo(valor):
+    return "r_" + hashlib.sha1(valor.encode("utf-8")).hexdigest()[:16]
+
+
+def _redigir(valor):
+    """Pseudônimo que mantém os curingas das pontas ('%Silva%' -> '%r_...%')"""
+    miolo = valor.strip("%_")
+    if not miolo:
+        return valor
+    comeco = valor[:len(valor) - len(valor.lstrip("%_"))]
+    fim = valor[len(valor.rstrip("%_")):]
+    return comeco + _pseudonimo(miolo) + fim
+
+
+def colunas_dos_parametros(query):
+    """
+    Coluna ligada a cada '?' da query (None quando não dá para saber):
+    pela lista de colunas do INSERT ou pela comparação que antecede o '?'.
+    """
+    sql = _re_literal.sub("''", query)
+    m = _re_insert.search(sql)
+    if m:
+        colunas = [coluna.strip() for coluna in m.group(1).split(",")]
+        valores = m.group(2).split(",")
+        if len(colunas) == len(valores):
+            return [coluna for coluna, valor in zip(colunas, valores) for _ in range(valor.count("?"))]
+    partes = sql.split("?")[:-1]
+    resultado = []
+    for parte in partes:
+        comparacao = _re_comparacao.search(parte)
+        resultado.append(comparacao.group(1).lower() if comparacao else None)
+    return resultado
+
+
+class CapturaCarga:
+    def __init__(self, caminho, redigir=False):
+        self.caminho = caminho
+        self.redigir = redigir
+        self.modelos = {}  # sql -> id
+        self.colunas = {}  # sql -> coluna de cada '?'
+        self.threads = {}  # ident -> número curto
+        self.chamadas = 0
+        self._trava = threading.Lock()
+        # Log já existente: continua a numeração das SQL e das threads e o relógio
+        ultimo_t, self._threads_anteriores = self._continuar(caminho)
+        self.arquivo = open(caminho, 'a', encoding='utf-8')
+        self.inicio = time.perf_counter() - ultimo_t
+
+    def _continuar(self, caminho):
+        """Carrega os modelos de um log existente; devolve (último t, maior th)"""
+        if not os.path.exists(caminho):
+            return 0.0, 0
+        modelos, chamadas = ler_log(caminho)
+        self.modelos = {texto: modelo for modelo, texto in modelos.items()}
+        if not chamadas:
+            return 0.0, 0
+        return chamadas[-1]["t"], max(chamada["th"] for chamada in chamadas)
+
+    def _parametros(self, query, params):
+        if params is None:
+            return None
+        if isinstance(params, dict):
+            return {chave: self._valor(valor, chave) for chave, valor in params.items()}
+        if self.redigir and query not in self.colunas:
+            self.colunas[query] = colunas_dos_parametros(query)
+        colunas = self.colunas.get(query, [])
+        return [self._valor(valor, colunas[i] if i < len(colunas) else None) for i, valor in enumerate(params)]
+
+    def _valor(self, valor, coluna):
+        if isinstance(valor, bytes):
+            valor = valor.hex()
+        if self.redigir and isinstance(valor, str) and coluna in COLUNAS_REDIGIDAS:
+            return _redigir(valor)
+        return valor
+
+    def registrar(self, query, params, inicio, duracao, resultado):
+        """Grava uma chamada do executar_query"""
+        with self._trava:
+            if self.arquivo is None:
+                return
+            modelo = self.modelos.get(query)
+            if modelo is None:
+                modelo = self.modelos[query] = max(self.modelos.values(), default=0) + 1
+                self.arquivo.write(json.dumps({"sql": modelo, "texto": query}, ensure_ascii=False) + "\n")
+            thread = self.threads.setdefault(threading.get_ident(),
+                                             self._threads_anteriores + len(self.threads) + 1)
+            self.arquivo.write(json.dumps({
+                "t": round(inicio - self.inicio, 6),
+                "th": thread,
+                "sql": modelo,
+                "p": self._parametros(query, params),
+                "ms": round(duracao * 1000, 3),
+                "ok": resultado is not None,
+            }, ensure_ascii=False) + "\n")
+            self.chamadas += 1
+
+    def fechar(self):
+        with self._trava:
+            if self.arquivo:
+                self.arquivo.close()
+                self.arquivo = None
+
+
+def ler_log(caminho):
+    """Devolve (modelos, chamadas) de um log de captura"""
+    modelos = {}
+    chamadas = []
+    with open(caminho, encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            if not linha.strip():
+                continue
+            registro = json.loads(linha)
+            if "texto" in registro:
+                modelos[registro["sql"]] = registro["texto"]
+            else:
+                chamadas.append(registro)
+    chamadas.sort(key=lambda chamada: chamada["t"])
+    return modelos, chamadas
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def reproduzir(caminho_log, banco, velocidade=1.0, threads=4, destino=None):
+    """
+    Reexecuta o log em uma cópia de `banco`. velocidade=0 reproduz o mais
+    rápido possível. Devolve o relatório como dicionário.
+    """
+    from database import DatabaseManager
+
+    modelos, chamadas = ler_log(caminho_log)
+    if not chamadas:
+        print(" Log sem chamadas.")
+        return None
+
+    pasta = None
+    if destino is None:
+        pasta = tempfile.mkdtemp(prefix="reproducao_")
+        destino = os.path.join(pasta, "copia.db")
+    origem = sqlite3.connect(banco)
+    copia = sqlite3.connect(destino)
+    try:
+        origem.backup(copia)
+    finally:
+        origem.close()
+        copia.close()
+
+    # Mesma thread original -> mesma thread de reprodução, na ordem
+    filas = [[] for _ in range(threads)]
+    for chamada in chamadas:
+        filas[chamada["th"] % threads].append(chamada)
+
+    latencias = defaultdict(list)  # modelo -> [segundos]
+    atrasos = []
+    erros = defaultdict(int)
+    trava = threading.Lock()
+    inicio = time.perf_counter() + 0.05  # todas as threads partem juntas
+
+    def trabalhador(fila):
+        db = DatabaseManager(destino)  # uma conexão por thread, como terminais separados
+        locais, atrasos_locais, erros_locais = defaultdict(list), [], defaultdict(int)
+        # Também na velocidade máxima: a duração é medida a partir de `inicio`
+        espera = inicio - time.perf_counter()
+        if espera > 0:
+            time.sleep(espera)
+        for chamada in fila:
+            if velocidade:
+                agendado = inicio + chamada["t"] / velocidade
+                espera = agendado - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+                else:
+                    atrasos_locais.append(-espera)
+            params = chamada["p"]
+            if isinstance(params, list):
+                params = tuple(params)
+            antes = time.perf_counter()
+            resultado = db.executar_query(modelos[chamada["sql"]], params)
+            locais[chamada["sql"]].append(time.perf_counter() - antes)
+            # Só conta como erro o que deu certo na captura
+            if resultado is None and chamada["ok"]:
+                erros_locais[chamada["sql"]] += 1
+        with trava:
+            for modelo, valores in locais.items():
+                latencias[modelo].extend(valores)
+            atrasos.extend(atrasos_locais)
+            for modelo, quantidade in erros_locais.items():
+                erros[modelo] += quantidade
+
+    trabalhadores = [threading.Thread(target=trabalhador, args=(fila,)) for fila in filas if fila]
+    for t in trabalhadores:
+        t.start()
+    for t in trabalhadores:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    if pasta:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    todas = sorted(valor for valores in latencias.values() for valor in valores)
+    atrasos.sort()
+    relatorio = {
+        "chamadas": len(todas),
+        "duracao": duracao,
+        "vazao": len(todas) / duracao if duracao > 0 else 0.0,
+        "p50": _percentil(todas, 0.50),
+        "p95": _percentil(todas, 0.95),
+        "p99": _percentil(todas, 0.99),
+        "maximo": todas[-1],
+        "atraso_p99": _percentil(atrasos, 0.99),
+        "erros": sum(erros.values()),
+        "por_sql": [],
+    }
+    for modelo, valores in latencias.items():
+        valores.sort()
+        relatorio["por_sql"].append({
+            "sql": " ".join(modelos[modelo].split()),
+            "chamadas": len(valores),
+            "total": sum(valores),
+            "p50": _percentil(valores, 0.50),
+            "p99": _percentil(valores, 0.99),
+            "erros": erros.get(modelo, 0),
+        })
+    relatorio["por_sql"].sort(key=lambda item: item["total"], reverse=True)
+    return relatorio
+
+
+def imprimir_relatorio(relatorio, velocidade, mostrar=10):
+    ms = 1000
+    print(f"\n Reprodução {'na velocidade máxima' if not velocidade else f'a {velocidade:g}x'}")
+    print("-" * 90)
+    print(f" Chamadas: {relatorio['chamadas']}   Duração: {relatorio['duracao']:.2f}s   "
+          f"Vazão: {relatorio['vazao']:.0f}/s   Erros novos: {relatorio['erros']}")
+    print(f" Latência: p50 {relatorio['p50'] * ms:.3f}ms   p95 {relatorio['p95'] * ms:.3f}ms   "
+          f"p99 {relatorio['p99'] * ms:.3f}ms   máx {relatorio['maximo'] * ms:.3f}ms")
+    if velocidade:
+        print(f" Atraso em relação ao horário original (p99): {relatorio['atraso_p99'] * ms:.1f}ms")
+    print("-" * 90)
+    print(f"{'Chamadas':>8} {'Total':>9} {'p50':>9} {'p99':>9} {'Erros':>6}  SQL")
+    print("-" * 90)
+    for item in relatorio["por_sql"][:mostrar]:
+        print(f"{item['chamadas']:>8} {item['total']:>8.2f}s {item['p50'] * ms:>7.3f}ms "
+              f"{item['p99'] * ms:>7.3f}ms {item['erros']:>6}  {item['sql'][:50]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Captura e reprodução de carga")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    rep = sub.add_parser("reproduzir", help="Reexecuta um log de captura em uma cópia do banco")
+    rep.add_argument("log")
+    rep.add_argument("--banco", default="sistema_comercial.db")
+    rep.add_argument("--velocidade", type=float, default=1.0, help="1 = original, N = N vezes mais rápido, 0 = máximo")
+    rep.add_argument("--threads", type=int, default=4)
+    rep.add_argument("--destino", help="Arquivo da cópia (padrão: temporário, apagado no fim)")
+    res = sub.add_parser("resumo", help="Mostra as SQL mais frequentes de um log")
+    res.add_argument("log")
+    args = parser.parse_args()
+
+    if args.comando == "reproduzir":
+        relatorio = reproduzir(args.log, args.banco, args.velocidade, args.threads, args.destino)
+        if relatorio:
+            imprimir_relatorio(relatorio, args.velocidade)
+    else:
+        modelos, chamadas = ler_log(args.log)
+        contagem = defaultdict(lambda: [0, 0.0])
+        for chamada in chamadas:
+            contagem[chamada["sql"]][0] += 1
+            contagem[chamada["sql"]][1] += chamada["ms"]
+        duracao = chamadas[-1]["t"] if chamadas else 0
+        print(f" {len(chamadas)} chamadas em {duracao:.1f}s, {len(modelos)} SQL distintas")
+        for modelo, (quantidade, total_ms) in sorted(contagem.items(), key=lambda item: -item[1][1]):
+            print(f"{quantidade:>8} {total_ms:>10.1f}ms  {' '.join(modelos[modelo].split())[:60]}")
+
+
+if __name__ == "__main__":
+    main()
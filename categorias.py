@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Categorias de fornecedores normalizadas, com contagem por categoria
+
+A categoria digitada é reduzida a uma chave (sem acentos, caixa ou
+espaços extras), então "Tecidos", "tecidos " e "TÉCIDOS" viram a mesma
+linha de `categorias`. Os fornecedores guardam `categoria_id` e o
+campo texto `categoria` passa a ter o nome canônico.
+
+`categorias.total` é mantido pelos triggers a cada inserção, exclusão ou
+troca de categoria, então a lista de categorias com contagem não precisa
+contar os fornecedores. O índice (categoria_id, nome COLLATE NOCASE)
+atende a listagem por categoria + prefixo do nome.
+
+Uso:
+    python categorias.py listar
+    python categorias.py mesclar ORIGEM_ID DESTINO_ID
+"""
+
+import argparse
+import sqlite3
+
+from normalizacao import normalizar_texto
+
+
+def criar_estrutura_categorias(db_manager):
+    """Cria a tabela de categorias, índices, triggers e migra dados antigos"""
+    db_manager.executar_query("""
+    CREATE TABLE IF NOT EXISTS categorias (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL,
+        chave TEXT UNIQUE NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    db_manager.adicionar_coluna_se_faltar("fornecedores", "categoria_id", "INTEGER REFERENCES categorias(id)")
+    db_manager.executar_query("""
+    CREATE INDEX IF NOT EXISTS idx_fornecedores_categoria_nome
+    ON fornecedores (categoria_id, nome COLLATE NOCASE)
+    """)
+    db_manager.executar_query("""
+    CREATE TRIGGER IF NOT EXISTS categorias_total_insert AFTER INSERT ON fornecedores
+    WHEN NEW.categoria_id IS NOT NULL
+    BEGIN
+        UPDATE categorias SET total = total + 1 WHERE id = NEW.categoria_id;
+    END
+    """)
+    db_manager.executar_query("""
+    CREATE TRIGGER IF NOT EXISTS categorias_total_delete AFTER DELETE ON fornecedores
+    WHEN OLD.categoria_id IS NOT NULL
+    BEGIN
+        UPDATE categorias SET total = total - 1 WHERE id = OLD.categoria_id;
+    END
+    """)
+    db_manager.executar_query("""
+    CREATE TRIGGER IF NOT EXISTS categorias_total_update AFTER UPDATE OF categoria_id ON fornecedores
+    WHEN OLD.categoria_id IS NOT NEW.categoria_id
+    BEGIN
+        UPDATE categorias SET total = total - 1 WHERE id = OLD.categoria_id;
+        UPDATE categorias SET total = total + 1 WHERE id = NEW.categoria_id;
+    END
+    """)
+    migrar_categorias_texto(db_manager)
+
+
+def resolver_categoria(conn, nome, cache=None):
+    """Devolve (categoria_id, nome canônico), criando a categoria se preciso"""
+    nome = " ".join((nome or "").split())
+    chave = normalizar_texto(nome)
+    if not chave:
+        return None, ""
+    if cache is not None and chave in cache:
+        return cache[chave]
+    conn.execute("INSERT OR IGNORE INTO categorias (nome, chave) VALUES (?, ?)", (nome, chave))
+    linha = conn.execute("SELECT id, nome FROM categorias WHERE chave = ?", (chave,)).fetchone()
+    resultado = (linha[0], linha[1])
+    if cache is not None:
+        cache[chave] = resultado
+    return resultado
+
+
+def procurar_categoria(db_manager, nome):
+    """(categoria_id, nome canônico) de uma categoria existente, sem criar; None se não houver"""
+    chave = normalizar_texto(nome)
+    if not chave:
+        return None
+    resultado = db_manager.executar_query("SELECT id, nome FROM categorias WHERE chave = ?", (chave,))
+    if resultado:
+        return resultado[0]["id"], resultado[0]["nome"]
+    return None
+
+
+def obter_categoria(db_manager, nome):
+    """Versão de resolver_categoria para os CRUDs (via executar_query)"""
+    nome = " ".join((nome or "").split())
+    chave = normalizar_texto(nome)
+    if not chave:
+        return None, ""
+    db_manager.executar_query("INSERT OR IGNORE INTO categorias (nome, chave) VALUES (?, ?)", (nome, chave))
+    resultado = db_manager.executar_query("SELECT id, nome FROM categorias WHERE chave = ?", (chave,))
+    if resultado:
+        return resultado[0]["id"], resultado[0]["nome"]
+    return None, nome
+
+
+def migrar_categorias_texto(db_manager, lote=1000):
+    """Preenche categoria_id dos fornecedores que só têm o texto da categoria"""
+    conn = db_manager.abrir_conexao()
+    try:
+        cache = {}
+        ultimo = 0
+        while True:
+            linhas = conn.execute("""
+                SELECT id, categoria FROM fornecedores
+                WHERE id > ? AND categoria_id IS NULL AND categoria IS NOT NULL AND categoria <> ''
+                ORDER BY id LIMIT ?
+            """, (ultimo, lote)).fetchall()
+            if not linhas:
+                break
+            for linha in linhas:
+                categoria_id, nome = resolver_categoria(conn, linha["categoria"], cache)
+                conn.execute("UPDATE fornecedores SET categoria_id = ?, categoria = ?, versao = versao + 1 WHERE id = ?",
+                             (categoria_id, nome, linha["id"]))
+            conn.commit()
+            ultimo = linhas[-1]["id"]
+    except sqlite3.Error as e:
+        print(f" Erro ao migrar categorias: {e}")
+    finally:
+        conn.close()
+
+
+def listar_categorias(db_manager, incluir_vazias=False):
+    """Categorias com a contagem de fornecedores (sem contar linhas)"""
+    filtro = "" if incluir_vazias else "WHERE total > 0"
+    return db_manager.executar_query(f"SELECT id, nome, total FROM categorias {filtro} ORDER BY nome") or []
+
+
+def fornecedores_da_categoria(db_manager, categoria_id, prefixo="", limite=50):
+    """Fornecedores de uma categoria cujo nome começa com `prefixo`"""
+    prefixo = prefixo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    query = """
+    SELECT * FROM fornecedores
+    WHERE categoria_id = ? AND nome LIKE ? ESCAPE '\\'
+    ORDER BY nome COLLATE NOCASE
+    LIMIT ?
+    """
+    return db_manager.executar_query(query, (categoria_id, prefixo + "%", limite)) or []
+
+
+def recalcular_totais(db_manager):
+    """Recalcula as contagens do zero (só para corrigir divergências)"""
+    db_manager.executar_query("""
+    UPDATE categorias SET total = (
+        SELECT COUNT(*) FROM fornecedores WHERE categoria_id = categorias.id
+    )
+    """)
+
+
+def mesclar_categorias(db_manager, origem_id, destino_id):
+    """Move os fornecedores de uma categoria (ex.: grafia errada) para outra"""
+    destino = db_manager.executar_query("SELECT nome FROM categorias WHERE id = ?", (destino_id,))
+    if not destino or origem_id == destino_id:
+        print(" Categoria de destino inválida.")
+        return False
+    movidos = db_manager.executar_query(
+        "UPDATE fornecedores SET categoria_id = ?, categoria = ?, versao = versao + 1 WHERE categoria_id = ?",
+        (destino_id, destino[0]["nome"], origem_id))
+    db_manager.executar_query("DELETE FROM categorias WHERE id = ?", (origem_id,))
+    print(f" {movidos or 0} fornecedor(es) movidos para '{destino[0]['nome']}'.")
+    return True
+
+
+def main():
+    from database import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Categorias de fornecedores")
+    parser.add_argument("--banco", default="sistema_comercial.db")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("listar")
+    mesclar = sub.add_parser("mesclar")
+    mesclar.add_argument("origem", type=int)
+    mesclar.add_argument("destino", type=int)
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.banco)
+    if args.comando == "listar":
+        for categoria in listar_categorias(db, incluir_vazias=True):
+            print(f" {categoria['id']:<5} {categoria['nome']:<30} {categoria['total']:>8}")
+    else:
+        mesclar_categorias(db, args.origem, args.destino)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Captura de alterações (CDC) para exportação incremental
+
+Triggers em produtos, clientes e fornecedores gravam em `changelog` um
+registro compacto por alteração: operação (I/U/D), tabela, id da linha,
+colunas alteradas (com os novos valores) e horário.
+
+Cada consumidor (ex.: o ERP) tem uma marca d'água em `changelog_marcas`;
+a exportação envia em NDJSON só o que veio depois dela e a compactação
+apaga o que todos os consumidores já leram. Com shards, os triggers gravam
+no arquivo onde a linha está: exportação e compactação percorrem todos os
+arquivos, cada um com as suas marcas.
+
+Uso:
+    python cdc.py exportar --consumidor erp -o alteracoes.ndjson
+    python cdc.py compactar
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+
+TABELAS_CDC = ("produtos", "clientes", "fornecedores")
+
+
+def _colunas(conn, tabela):
+    return [col[1] for col in conn.execute(f"PRAGMA table_info({tabela})") if col[1] != "id"]
+
+
+def _triggers(tabela, colunas):
+    """Gera os três triggers de uma tabela a partir das colunas atuais"""
+    novos = ", ".join(f"'{c}', NEW.{c}" for c in colunas)
+    removidos = ", ".join(f"CASE WHEN OLD.{c} IS NEW.{c} THEN '$.{c}' ELSE '$._' END" for c in colunas)
+    mudou = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in colunas)
+    agora = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS cdc_{tabela}_insert AFTER INSERT ON {tabela}
+        BEGIN
+            INSERT INTO changelog (op, tabela, linha_id, colunas, data)
+            VALUES ('I', '{tabela}', NEW.id, json_object({novos}), {agora});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS cdc_{tabela}_update AFTER UPDATE ON {tabela}
+        WHEN {mudou}
+        BEGIN
+            INSERT INTO changelog (op, tabela, linha_id, colunas, data)
+            VALUES ('U', '{tabela}', NEW.id, json_remove(json_object({novos}), {removidos}), {agora});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS cdc_{tabela}_delete AFTER DELETE ON {tabela}
+        BEGIN
+            INSERT INTO changelog (op, tabela, linha_id, colunas, data)
+            VALUES ('D', '{tabela}', OLD.id, NULL, {agora});
+        END
+        """,
+    ]
+
+
+def criar_estrutura_cdc(db_manager):
+    """Cria changelog, marcas d'água e triggers (recriados se o schema mudou)"""
+    db_manager.executar_query("""
+    CREATE TABLE IF NOT EXISTS changelog (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        op TEXT NOT NULL CHECK(op IN ('I', 'U', 'D')),
+        tabela TEXT NOT NULL,
+        linha_id INTEGER NOT NULL,
+        colunas TEXT,
+        data TEXT NOT NULL
+    )
+    """)
+    db_manager.executar_query("""
+    CREATE TABLE IF NOT EXISTS changelog_marcas (
+        consumidor TEXT PRIMARY KEY,
+        ultimo_id INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+
+    conn = db_manager.abrir_conexao()
+    try:
+        for tabela in TABELAS_CDC:
+            colunas = _colunas(conn, tabela)
+            for sql in _triggers(tabela, colunas):
+                nome = sql.split("EXISTS", 1)[1].split()[0]
+                atual = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                                     (nome,)).fetchone()
+                esperado = sql.strip().replace("IF NOT EXISTS ", "")
+                if atual and atual[0].strip() == esperado:
+                    continue
+                if atual:
+                    db_manager.executar_query(f"DROP TRIGGER IF EXISTS {nome}")
+                db_manager.executar_query(sql)
+    finally:
+        conn.close()
+
+
+def exportar_alteracoes(db_manager, consumidor, saida, lote=1000):
+    """
+    Escreve em `saida` (NDJSON) as alterações após a marca do consumidor.
+    Com shards, cada arquivo tem o próprio changelog e a própria marca; os
+    registros levam o arquivo de origem ("arquivo"), pois `seq` só é único
+    dentro dele. A ordem de cada linha é preservada (ela mora em um arquivo só).
+    """
+    arquivos = db_manager.arquivos()
+    exportadas = 0
+    for arquivo in arquivos:
+        origem = os.path.basename(arquivo) if len(arquivos) > 1 else None
+        conn = db_manager.abrir_conexao(arquivo)
+        try:
+            exportadas += _exportar_arquivo(conn, consumidor, saida, lote, origem)
+        except sqlite3.Error as e:
+            print(f" Erro ao exportar alterações de {arquivo}: {e}", file=sys.stderr)
+        finally:
+            conn.close()
+    return exportadas
+
+
+def _exportar_arquivo(conn, consumidor, saida, lote, origem):
+    marca = conn.execute("SELECT ultimo_id FROM changelog_marcas WHERE consumidor = ?",
+                         (consumidor,)).fetchone()
+    ultimo = marca[0] if marca else 0
+    exportadas = 0
+    while True:
+        linhas = conn.execute("""
+            SELECT id, op, tabela, linha_id, colunas, data FROM changelog
+            WHERE id > ? ORDER BY id LIMIT ?
+        """, (ultimo, lote)).fetchall()
+        if not linhas:
+            break
+        for linha in linhas:
+            registro = {
+                "seq": linha["id"],
+                "op": linha["op"],
+                "tabela": linha["tabela"],
+                "id": linha["linha_id"],
+                "colunas": json.loads(linha["colunas"]) if linha["colunas"] else None,
+                "data": linha["data"],
+            }
+            if origem:
+                registro["arquivo"] = origem
+            saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        saida.flush()
+        ultimo = linhas[-1]["id"]
+        exportadas += len(linhas)
+        # A marca só avança depois que o bloco foi escrito (entrega "pelo menos uma vez")
+        conn.execute("""
+            INSERT INTO changelog_marcas (consumidor, ultimo_id) VALUES (?, ?)
+            ON CONFLICT(consumidor) DO UPDATE SET ultimo_id = excluded.ultimo_id
+        """, (consumidor, ultimo))
+        conn.commit()
+    return exportadas
+
+
+def compactar_changelog(db_manager, lote=5000):
+    """Remove as entradas já consumidas por todos os consumidores (em cada arquivo)"""
+    removidas = 0
+    registrados = False
+    for arquivo in db_manager.arquivos():
+        conn = db_manager.abrir_conexao(arquivo)
+        try:
+            limite = conn.execute("SELECT MIN(ultimo_id) FROM changelog_marcas").fetchone()[0]
+            if limite is None:
+                continue
+            registrados = True
+            while True:
+                cursor = conn.execute("""
+                    DELETE FROM changelog WHERE id IN (
+                        SELECT id FROM changelog WHERE id <= ? ORDER BY id LIMIT ?
+                    )
+                """, (limite, lote))
+                conn.commit()
+                if cursor.rowcount <= 0:
+                    break
+                removidas += cursor.rowcount
+        except sqlite3.Error as e:
+            print(f" Erro ao compactar changelog de {arquivo}: {e}")
+        finally:
+            conn.close()
+    if not registrados:
+        print(" Nenhum consumidor registrado; nada a compactar.")
+    return removidas
+
+
+def main():
+    from database import DatabaseManager
+    from sharding import carregar_mapa_padrao
+
+    parser = argparse.ArgumentParser(description="Exportação incremental de alterações")
+    parser.add_argument("--banco", default="sistema_comercial.db")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    exp = sub.add_parser("exportar", help="Exporta alterações desde a marca d'água")
+    exp.add_argument("--consumidor", required=True)
+    exp.add_argument("-o", "--saida", help="Arquivo NDJSON (padrão: saída padrão)")
+    sub.add_parser("compactar", help="Apaga alterações já consumidas")
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.banco, mapa_shards=carregar_mapa_padrao())
+    if args.comando == "exportar":
+        if args.saida:
+            with open(args.saida, 'a', encoding='utf-8') as arquivo:
+                total = exportar_alteracoes(db, args.consumidor, arquivo)
+        else:
+            total = exportar_alteracoes(db, args.consumidor, sys.stdout)
+        print(f" {total} alterações exportadas.", file=sys.stderr)
+    else:
+        print(f" {compactar_changelog(db)} entradas removidas do changelog.")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,11 @@ CRUD para Clientes
 
 import re
 
+from exclusao_em_massa import excluir_em_blocos, imprimir_progresso, pedir_filtro_data
+from busca_aproximada import buscar_aproximado
+from concorrencia import atualizar_com_versao, avisar_conflito
+from arquivamento import buscar_incluindo_arquivo
+
 class Cliente:
     def __init__(self, id=None, nome="", email="", telefone="", endereco=""):
         self.id = id
@@ -63,7 +68,7 @@ class ClienteCRUD:
     
     def listar_clientes(self):
         """Lista todos os clientes"""
-        query = "SELECT * FROM clientes ORDER BY nome"
+        query = "SELECT * FROM clientes ORDER BY nome_ordenacao, nome"
         clientes = self.db.executar_query(query)
         
         if not clientes:
@@ -100,13 +105,25 @@ class ClienteCRUD:
         query = """
         SELECT * FROM clientes 
         WHERE nome LIKE ? OR email LIKE ?
-        ORDER BY nome
+        ORDER BY nome_ordenacao, nome
         """
         clientes = self.db.executar_query(query, (f"%{termo}%", f"%{termo}%"))
         
         if not clientes:
-            print(" Nenhum cliente encontrado.")
-            return
+            # Sem resultado exato: sugere nomes parecidos (acentos, erros de digitação)
+            parecidos = buscar_aproximado(self.db, "clientes", termo)
+            if parecidos:
+                print(f"\n Nenhum cliente com '{termo}'. Você quis dizer:")
+                clientes = [cliente for _, cliente in parecidos]
+            else:
+                print(" Nenhum cliente encontrado.")
+                # O arquivo frio só é aberto a pedido
+                if input("Procurar também nos clientes arquivados? (s/N): ").strip().lower() != 's':
+                    return
+                clientes = buscar_incluindo_arquivo(self.db, "clientes", termo, ("nome", "email"))
+                if not clientes:
+                    print(" Nenhum cliente arquivado encontrado.")
+                    return
         
         print(f"\n Resultados da busca por '{termo}':")
         print("-" * 80)
@@ -114,8 +131,9 @@ class ClienteCRUD:
         print("-" * 80)
         
         for cliente in clientes:
+            arquivado = " (arquivado)" if 'arquivado' in cliente.keys() and cliente['arquivado'] else ""
             print(f"{cliente['id']:<3} {cliente['nome']:<25} {cliente['email']:<25} "
-                  f"{cliente['telefone'] or 'N/A':<15}")
+                  f"{cliente['telefone'] or 'N/A':<15}{arquivado}")
     
     def atualizar_cliente(self):
         """Atualiza um cliente existente"""
@@ -137,55 +155,57 @@ class ClienteCRUD:
                 print("2. Email")
                 print("3. Telefone")
                 print("4. Endereço")
-                print("5. Voltar")
+                print("5. Inativar/reativar")
+                print("6. Voltar")
                 
                 escolha = input("Opção: ").strip()
                 
                 if escolha == '1':
                     novo_nome = input("Novo nome: ").strip()
                     if novo_nome:
-                        query = "UPDATE clientes SET nome = ? WHERE id = ?"
-                        self.db.executar_query(query, (novo_nome, cliente_id))
-                        cliente = dict(cliente)
-                        cliente['nome'] = novo_nome
-                        print(" Nome atualizado!")
+                        campos, mensagem = {'nome': novo_nome}, " Nome atualizado!"
                     else:
                         print(" Nome não pode estar vazio.")
+                        continue
                 
                 elif escolha == '2':
                     novo_email = input("Novo email: ").strip().lower()
                     if self.validar_email(novo_email):
-                        query = "UPDATE clientes SET email = ? WHERE id = ?"
-                        resultado = self.db.executar_query(query, (novo_email, cliente_id))
-                        if resultado:
-                            cliente = dict(cliente)
-                            cliente['email'] = novo_email
-                            print(" Email atualizado!")
-                        else:
-                            print(" Email já está em uso.")
+                        campos, mensagem = {'email': novo_email}, " Email atualizado!"
                     else:
                         print(" Email inválido.")
+                        continue
                 
                 elif escolha == '3':
-                    novo_telefone = input("Novo telefone: ").strip()
-                    query = "UPDATE clientes SET telefone = ? WHERE id = ?"
-                    self.db.executar_query(query, (novo_telefone, cliente_id))
-                    cliente = dict(cliente)
-                    cliente['telefone'] = novo_telefone
-                    print(" Telefone atualizado!")
+                    campos, mensagem = {'telefone': input("Novo telefone: ").strip()}, " Telefone atualizado!"
                 
                 elif escolha == '4':
-                    novo_endereco = input("Novo endereço: ").strip()
-                    query = "UPDATE clientes SET endereco = ? WHERE id = ?"
-                    self.db.executar_query(query, (novo_endereco, cliente_id))
-                    cliente = dict(cliente)
-                    cliente['endereco'] = novo_endereco
-                    print(" Endereço atualizado!")
+                    campos, mensagem = {'endereco': input("Novo endereço: ").strip()}, " Endereço atualizado!"
                 
                 elif escolha == '5':
+                    # Inativos vão para o arquivo frio no próximo arquivamento
+                    if cliente['ativo']:
+                        campos, mensagem = {'ativo': 0}, " Cliente inativado (será arquivado)."
+                    else:
+                        campos, mensagem = {'ativo': 1}, " Cliente reativado!"
+                
+                elif escolha == '6':
                     break
                 else:
                     print(" Opção inválida.")
+                    continue
+                
+                # Grava só se ninguém alterou o cliente desde que foi aberto
+                situacao, cliente = atualizar_com_versao(self.db, "clientes", cliente, campos)
+                if situacao == "ok":
+                    print(mensagem)
+                elif situacao == "conflito":
+                    avisar_conflito(cliente, ("nome", "email", "telefone", "endereco"))
+                elif situacao == "excluido":
+                    print(" Cliente foi excluído por outro usuário.")
+                    break
+                elif 'email' in campos:
+                    print(" Email já está em uso.")
                     
         except ValueError:
             print(" ID inválido.")
@@ -228,16 +248,31 @@ class ClienteCRUD:
         try:
             confirmacao = input("Tem certeza que deseja excluir TODOS os clientes? (s/N): ").lower()
             if confirmacao == 's':
-                query = "DELETE FROM clientes"
-                resultado = self.db.executar_query(query)
-                if resultado:
-                    print("Todos os clientes foram excluídos com sucesso!")
+                resultado = excluir_em_blocos(self.db, "clientes", progresso=imprimir_progresso)
+                if resultado is not None:
+                    print(f"Todos os clientes foram excluídos com sucesso! ({resultado})")
                 else:
                     print("Erro ao excluir clientes.")
             else:
                 print("Exclusão cancelada.")
         except Exception as e:
             print(f"Erro inesperado: {e}")
+    
+    def excluir_por_data(self):
+        """Exclui em massa os clientes cadastrados antes de uma data"""
+        try:
+            filtro, params = pedir_filtro_data()
+            if not filtro:
+                return
+            confirmacao = input("Confirma a exclusão? (s/N): ").lower()
+            if confirmacao == 's':
+                resultado = excluir_em_blocos(self.db, "clientes", filtro, params, progresso=imprimir_progresso)
+                if resultado is not None:
+                    print(f" {resultado} cliente(s) excluído(s).")
+            else:
+                print("Exclusão cancelada.")
+        except Exception as e:
+            print(f"Erro inesperado: {e}")
 
     
     def menu(self):
@@ -252,7 +287,8 @@ class ClienteCRUD:
             print("4. Atualizar cliente")
             print("5. Excluir cliente")
             print("6. Excluir TODOS os clientes")
-            print("7. Voltar ao menu principal")
+            print("7. Excluir clientes cadastrados antes de uma data")
+            print("8. Voltar ao menu principal")
             print("="*40)
             
             opcao = input("Escolha uma opção: ").strip()
@@ -270,6 +306,8 @@ class ClienteCRUD:
             elif opcao == '6':
                 self.excluir_todos()
             elif opcao == '7':
+                self.excluir_por_data()
+            elif opcao == '8':
                 break
             else:
                 print(" Opção inválida. Tente novamente.")
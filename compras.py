@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fornecedores de cada produto e sugestão de compras
+
+`produtos_fornecedores` liga produtos e fornecedores (muitos para muitos)
+com preço de custo, prazo de entrega em dias e o fornecedor preferencial.
+A tabela é WITHOUT ROWID com chave (produto_id, fornecedor_id), então a
+própria chave já é o índice "fornecedores do produto" com todas as colunas;
+idx_produtos_fornecedores_fornecedor cobre "produtos do fornecedor" sem
+voltar à tabela.
+
+As ligações ficam no mesmo arquivo do produto (com shards, o shard do
+produto), para o join com produtos ser sempre local. Os fornecedores podem
+estar em outro arquivo: os nomes que o LEFT JOIN não achar são buscados
+depois, em lote.
+
+A sugestão de compras parte do índice parcial de estoque baixo
+(alertas_estoque.py) e faz um único join indexado: produto abaixo do
+mínimo -> suas ligações -> fornecedor. Para cada produto fica o fornecedor
+preferencial, senão o de menor custo, e o resultado é agrupado por
+fornecedor. O custo depende de quantos produtos estão abaixo do mínimo,
+não do tamanho das tabelas.
+
+Benchmark:
+    python compras.py --benchmark --produtos 1000000 --fornecedores 100000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+
+def criar_estrutura_compras(db_manager):
+    """Cria a tabela de ligação, o índice por fornecedor e os triggers de limpeza"""
+    db_manager.executar_query("""
+    CREATE TABLE IF NOT EXISTS produtos_fornecedores (
+        produto_id INTEGER NOT NULL,
+        fornecedor_id INTEGER NOT NULL,
+        preco_custo REAL,
+        prazo_dias INTEGER,
+        preferencial INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (produto_id, fornecedor_id)
+    ) WITHOUT ROWID
+    """)
+    db_manager.executar_query("""
+    CREATE INDEX IF NOT EXISTS idx_produtos_fornecedores_fornecedor
+    ON produtos_fornecedores (fornecedor_id, produto_id, preco_custo, prazo_dias, preferencial)
+    """)
+    db_manager.executar_query("""
+    CREATE TRIGGER IF NOT EXISTS produtos_fornecedores_produto_delete AFTER DELETE ON produtos
+    BEGIN
+        DELETE FROM produtos_fornecedores WHERE produto_id = OLD.id;
+    END
+    """)
+    db_manager.executar_query("""
+    CREATE TRIGGER IF NOT EXISTS produtos_fornecedores_fornecedor_delete AFTER DELETE ON fornecedores
+    BEGIN
+        DELETE FROM produtos_fornecedores WHERE fornecedor_id = OLD.id;
+    END
+    """)
+
+
+def _ordem_preferencia(ligacao):
+    """Preferencial primeiro, depois menor custo (sem custo por último), depois menor prazo"""
+    return (not ligacao["preferencial"], ligacao["preco_custo"] is None, ligacao["preco_custo"] or 0,
+            ligacao["prazo_dias"] is None, ligacao["prazo_dias"] or 0)
+
+
+def _nomes_fornecedores(db_manager, ids, lote=500):
+    """id -> linha do fornecedor, para os que estão em outro arquivo"""
+    ids = list(ids)
+    encontrados = {}
+    for inicio in range(0, len(ids), lote):
+        parte = ids[inicio:inicio + lote]
+        marcadores = ", ".join("?" * len(parte))
+        linhas = db_manager.executar_query(
+            f"SELECT id, nome, telefone, email FROM fornecedores WHERE id IN ({marcadores})", tuple(parte))
+        for linha in linhas or []:
+            encontrados[linha["id"]] = linha
+    return encontrados
+
+
+def vincular_fornecedor(db_manager, produto_id, fornecedor_id, preco_custo=None, prazo_dias=None,
+                        preferencial=False):
+    """Cria ou atualiza a ligação; retorna True se gravou"""
+    if not db_manager.executar_query("SELECT id FROM produtos WHERE id = ?", (produto_id,)):
+        print(" Produto não encontrado.")
+        return False
+    if not db_manager.executar_query("SELECT id FROM fornecedores WHERE id = ?", (fornecedor_id,)):
+        print(" Fornecedor não encontrado.")
+        return False
+
+    conn = db_manager.abrir_conexao(db_manager.arquivo_da_chave("produtos", produto_id))
+    try:
+        with conn:
+            if preferencial:
+                conn.execute("UPDATE produtos_fornecedores SET preferencial = 0 WHERE produto_id = ?",
+                             (produto_id,))
+            conn.execute("""
+                INSERT INTO produtos_fornecedores (produto_id, fornecedor_id, preco_custo, prazo_dias, preferencial)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (produto_id, fornecedor_id) DO UPDATE SET
+                    preco_custo = excluded.preco_custo,
+                    prazo_dias = excluded.prazo_dias,
+                    preferencial = excluded.preferencial
+            """, (produto_id, fornecedor_id, preco_custo, prazo_dias, int(bool(preferencial))))
+        return True
+    except sqlite3.Error as e:
+        print(f" Erro ao vincular fornecedor: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def desvincular_fornecedor(db_manager, produto_id, fornecedor_id):
+    """Remove a ligação; retorna True se existia"""
+    conn = db_manager.abrir_conexao(db_manager.arquivo_da_chave("produtos", produto_id))
+    try:
+        with conn:
+            cursor = conn.execute("DELETE FROM produtos_fornecedores WHERE produto_id = ? AND fornecedor_id = ?",
+                                  (produto_id, fornecedor_id))
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        print(f" Erro ao desvincular fornecedor: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def fornecedores_do_produto(db_manager, produto_id):
+    """Ligações de um produto com o nome do fornecedor, na ordem de preferência"""
+    conn = db_manager.abrir_conexao(db_manager.arquivo_da_chave("produtos", produto_id))
+    try:
+        ligacoes = [dict(linha) for linha in conn.execute("""
+            SELECT pf.fornecedor_id, pf.preco_custo, pf.prazo_dias, pf.preferencial, f.nome AS fornecedor
+            FROM produtos_fornecedores pf
+            LEFT JOIN fornecedores f ON f.id = pf.fornecedor_id
+            WHERE pf.produto_id = ?
+        """, (produto_id,))]
+    except sqlite3.Error as e:
+        print(f" Erro ao buscar fornecedores do produto: {e}")
+        return []
+    finally:
+        conn.close()
+
+    faltando = {ligacao["fornecedor_id"] for ligacao in ligacoes if ligacao["fornecedor"] is None}
+    if faltando:
+        nomes = _nomes_fornecedores(db_manager, faltando)
+        for ligacao in ligacoes:
+            if ligacao["fornecedor"] is None and ligacao["fornecedor_id"] in nomes:
+                ligacao["fornecedor"] = nomes[ligacao["fornecedor_id"]]["nome"]
+    ligacoes.sort(key=_ordem_preferencia)
+    return ligacoes
+
+
+def produtos_do_fornecedor(db_manager, fornecedor_id, apos=0, limite=50):
+    """Produtos fornecidos, em ordem de id, a partir de `apos` (paginação por chave)"""
+    produtos = []
+    for arquivo in db_manager.arquivos_da_tabela("produtos"):
+        conn = db_manager.abrir_conexao(arquivo)
+        try:
+            produtos.extend(conn.execute("""
+                SELECT pf.produto_id, pf.preco_custo, pf.prazo_dias, pf.preferencial,
+                       p.nome, p.tamanho, p.estoque
+                FROM produtos_fornecedores pf
+                JOIN produtos p ON p.id = pf.produto_id
+                WHERE pf.fornecedor_id = ? AND pf.produto_id > ?
+                ORDER BY pf.produto_id LIMIT ?
+            """, (fornecedor_id, apos, limite)).fetchall())
+        except sqlite3.Error as e:
+            print(f" Erro ao buscar produtos do fornecedor: {e}")
+        finally:
+            conn.close()
+    produtos.sort(key=lambda linha: linha["produto_id"])
+    return produtos[:limite]
+
+
+def sugestao_compras(db_manager):
+    """
+    Produtos abaixo do estoque mínimo agrupados pelo fornecedor escolhido.
+    Devolve (grupos, sem_fornecedor): grupos é uma lista de
+    {"fornecedor_id", "fornecedor", "telefone", "email", "itens", "total"}
+    ordenada pelo nome do fornecedor; cada item tem a quantidade para voltar
+    ao mínimo e o custo estimado.
+    """
+    melhores = {}  # produto_id -> linha escolhida
+    for arquivo in db_manager.arquivos_da_tabela("produtos"):
+        conn = db_manager.abrir_conexao(arquivo)
+        try:
+            for linha in conn.execute("""
+                SELECT p.id, p.nome, p.tamanho, p.estoque, p.estoque_minimo,
+                       pf.fornecedor_id, pf.preco_custo, pf.prazo_dias, pf.preferencial,
+                       f.nome AS fornecedor, f.telefone, f.email
+                FROM produtos p
+                LEFT JOIN produtos_fornecedores pf ON pf.produto_id = p.id
+                LEFT JOIN fornecedores f ON f.id = pf.fornecedor_id
+                WHERE p.estoque < p.estoque_minimo
+            """):
+                atual = melhores.get(linha["id"])
+                if atual is None or (linha["fornecedor_id"] is not None
+                                     and _ordem_preferencia(linha) < _ordem_preferencia(atual)):
+                    melhores[linha["id"]] = linha
+        except sqlite3.Error as e:
+            print(f" Erro ao montar sugestão de compras: {e}")
+            return None, None
+        finally:
+            conn.close()
+
+    escolhidos = [dict(linha) for linha in melhores.values()]
+    faltando = {item["fornecedor_id"] for item in escolhidos
+                if item["fornecedor_id"] is not None and item["fornecedor"] is None}
+    if faltando:
+        nomes = _nomes_fornecedores(db_manager, faltando)
+        for item in escolhidos:
+            fornecedor = nomes.get(item["fornecedor_id"])
+            if item["fornecedor"] is None and fornecedor:
+                item["fornecedor"], item["telefone"], item["email"] = \
+                    fornecedor["nome"], fornecedor["telefone"], fornecedor["email"]
+
+    grupos = {}
+    sem_fornecedor = []
+    for item in escolhidos:
+        item["quantidade"] = item["estoque_minimo"] - (item["estoque"] or 0)
+        item["custo"] = item["quantidade"] * item["preco_custo"] if item["preco_custo"] is not None else None
+        if item["fornecedor_id"] is None:
+            sem_fornecedor.append(item)
+            continue
+        grupo = grupos.get(item["fornecedor_id"])
+        if grupo is None:
+            grupo = grupos[item["fornecedor_id"]] = {
+                "fornecedor_id": item["fornecedor_id"],
+                "fornecedor": item["fornecedor"] or f"(fornecedor {item['fornecedor_id']} não encontrado)",
+                "telefone": item["telefone"],
+                "email": item["email"],
+                "itens": [],
+                "total": 0.0,
+            }
+        grupo["itens"].append(item)
+        grupo["total"] += item["custo"] or 0.0
+
+    for grupo in grupos.values():
+        grupo["itens"].sort(key=lambda item: item["nome"])
+    sem_fornecedor.sort(key=lambda item: item["nome"])
+    return sorted(grupos.values(), key=lambda grupo: grupo["fornecedor"]), sem_fornecedor
+
+
+def imprimir_sugestao(grupos, sem_fornecedor):
+    if grupos is None:
+        return
+    if not grupos and not sem_fornecedor:
+        print(" Nenhum produto abaixo do estoque mínimo.")
+        return
+    for grupo in grupos:
+        print(f"\n {grupo['fornecedor']} (ID {grupo['fornecedor_id']}) - "
+              f"{grupo['telefone'] or 'sem telefone'} - {grupo['email'] or 'sem email'}")
+        print("-" * 80)
+        print(f"{'ID':<6} {'Produto':<28} {'Tam.':<5} {'Estoque':<8} {'Comprar':<8} {'Custo un.':<11} {'Prazo':<6}")
+        print("-" * 80)
+        for item in grupo["itens"]:
+            custo = f"R${item['preco_custo']:.2f}" if item["preco_custo"] is not None else "-"
+            prazo = f"{item['prazo_dias']}d" if item["prazo_dias"] is not None else "-"
+            print(f"{item['id']:<6} {item['nome'][:28]:<28} {item['tamanho']:<5} {item['estoque']:<8} "
+                  f"{item['quantidade']:<8} {custo:<11} {prazo:<6}")
+        print(f" Total estimado: R${grupo['total']:.2f}")
+    if sem_fornecedor:
+        print(f"\n Sem fornecedor cadastrado ({len(sem_fornecedor)}):")
+        for item in sem_fornecedor:
+            print(f"   {item['id']:<6} {item['nome'][:40]:<40} comprar {item['quantidade']}")
+
+
+# ----------------------------------------------------------------- benchmark
+
+def benchmark(produtos=1000000, fornecedores=100000, ligacoes=2, fracao_baixa=0.02, repeticoes=5):
+    from database import DatabaseManager
+
+    pasta = tempfile.mkdtemp(prefix="compras_")
+    try:
+        caminho = os.path.join(pasta, "compras.db")
+        db = DatabaseManager(caminho)
+        db.criar_tabelas()
+        rng = random.Random(42)
+
+        print(f" Gerando {produtos} produtos, {fornecedores} fornecedores e {ligacoes} ligações por produto...")
+        conn = sqlite3.connect(caminho)
+        # Só os dados: os triggers de CDC, histórico e busca não interessam aqui
+        for (nome,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+            conn.execute(f"DROP TRIGGER {nome}")
+        conn.executemany("INSERT INTO fornecedores (id, nome, cnpj) VALUES (?, ?, ?)",
+                         ((i, f"Fornecedor {i}", f"{i:014d}") for i in range(1, fornecedores + 1)))
+        conn.executemany(
+            "INSERT INTO produtos (id, nome, preco, tamanho, estoque, estoque_minimo) VALUES (?, ?, ?, ?, ?, ?)",
+            ((i, f"Produto {i}", 50.0, "PMG"[i % 3],
+              rng.randint(0, 9) if rng.random() < fracao_baixa else rng.randint(20, 200), 10)
+             for i in range(1, produtos + 1)))
+        conn.executemany(
+            "INSERT OR IGNORE INTO produtos_fornecedores (produto_id, fornecedor_id, preco_custo, prazo_dias) "
+            "VALUES (?, ?, ?, ?)",
+            ((i, rng.randint(1, fornecedores), round(rng.uniform(5, 40), 2), rng.randint(1, 30))
+             for i in range(1, produtos + 1) for _ in range(ligacoes)))
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.close()
+
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            grupos, sem_fornecedor = sugestao_compras(db)
+            tempos.append(time.perf_counter() - inicio)
+        itens = sum(len(grupo["itens"]) for grupo in grupos)
+
+        tempos_fornecedor = []
+        for _ in range(200):
+            inicio = time.perf_counter()
+            produtos_do_fornecedor(db, rng.randint(1, fornecedores))
+            tempos_fornecedor.append(time.perf_counter() - inicio)
+        tempos_produto = []
+        for _ in range(200):
+            inicio = time.perf_counter()
+            fornecedores_do_produto(db, rng.randint(1, produtos))
+            tempos_produto.append(time.perf_counter() - inicio)
+
+        tempos.sort()
+        tempos_fornecedor.sort()
+        tempos_produto.sort()
+        print("-" * 60)
+        print(f" Sugestão de compras: {itens} produtos em {len(grupos)} fornecedores, "
+              f"mediana {tempos[len(tempos) // 2] * 1000:.1f}ms")
+        print(f" Produtos do fornecedor:   mediana {tempos_fornecedor[100] * 1000:.2f}ms")
+        print(f" Fornecedores do produto:  mediana {tempos_produto[100] * 1000:.2f}ms")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fornecedores dos produtos e sugestão de compras")
+    parser.add_argument("--banco", default="sistema_comercial.db")
+    parser.add_argument("--benchmark", action="store_true", help="Mede a sugestão em um banco sintético")
+    parser.add_argument("--produtos", type=int, default=1000000)
+    parser.add_argument("--fornecedores", type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.produtos, args.fornecedores)
+    else:
+        from database import DatabaseManager
+        from sharding import carregar_mapa_padrao
+
+        imprimir_sugestao(*sugestao_compras(DatabaseManager(args.banco, mapa_shards=carregar_mapa_padrao())))
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Controle de concorrência otimista para as edições do CRUD
+
+Cada tabela tem a coluna `versao`. Toda edição grava com
+    UPDATE ... SET ..., versao = versao + 1 WHERE id = ? AND versao = ?
+usando a versão lida quando o registro foi aberto. Se outro operador
+salvou antes, nenhuma linha é alterada: o CRUD mostra o registro atual e
+o operador decide se refaz a alteração. Nada fica travado enquanto o
+operador pensa.
+
+Benchmark (várias threads editando poucos registros, cada edição soma 1
+ao estoque lido; "perdidas" são edições sobrescritas por outra):
+    python concorrencia.py --threads 8 --registros 4 --edicoes 200
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+TABELAS_VERSIONADAS = ("produtos", "clientes", "fornecedores")
+
+
+def atualizar_com_versao(db_manager, tabela, registro, campos):
+    """
+    Grava `campos` em `registro` se ninguém o alterou desde a leitura.
+    Devolve (situacao, registro):
+        "ok"        registro com os novos valores e a nova versão
+        "conflito"  registro como está agora no banco
+        "excluido"  None (outro operador excluiu)
+        "erro"      registro sem mudança (ex.: email ou CNPJ repetido)
+    """
+    atribuicoes = ", ".join(f"{coluna} = ?" for coluna in campos)
+    query = f"UPDATE {tabela} SET {atribuicoes}, versao = versao + 1 WHERE id = ? AND versao = ?"
+    resultado = db_manager.executar_query(query, (*campos.values(), registro['id'], registro['versao']))
+    if resultado is None:
+        return "erro", registro
+    if resultado:
+        novo = dict(registro)
+        novo.update(campos)
+        novo['versao'] = registro['versao'] + 1
+        return "ok", novo
+
+    atual = db_manager.executar_query(f"SELECT * FROM {tabela} WHERE id = ?", (registro['id'],))
+    if not atual:
+        return "excluido", None
+    return "conflito", atual[0]
+
+
+def avisar_conflito(atual, campos_exibidos):
+    """Mensagem padrão dos CRUDs quando a edição perde para outra"""
+    print(" Conflito: o registro foi alterado por outro usuário. Dados atuais:")
+    for campo in campos_exibidos:
+        print(f"   {campo}: {atual[campo]}")
+    print(" Nada foi gravado; refaça a alteração se ainda quiser.")
+
+
+# ----------------------------------------------------------------- benchmark
+
+def _edicao_cega(conn, produto_id, pensar):
+    estoque, = conn.execute("SELECT estoque FROM produtos WHERE id = ?", (produto_id,)).fetchone()
+    time.sleep(pensar)
+    conn.execute("UPDATE produtos SET estoque = ? WHERE id = ?", (estoque + 1, produto_id))
+    conn.commit()
+    return 0
+
+
+def _edicao_otimista(conn, produto_id, pensar):
+    conflitos = 0
+    while True:
+        estoque, versao = conn.execute("SELECT estoque, versao FROM produtos WHERE id = ?",
+                                       (produto_id,)).fetchone()
+        time.sleep(pensar)
+        cursor = conn.execute("UPDATE produtos SET estoque = ?, versao = versao + 1 WHERE id = ? AND versao = ?",
+                              (estoque + 1, produto_id, versao))
+        conn.commit()
+        if cursor.rowcount:
+            return conflitos
+        conflitos += 1
+
+
+def _edicao_pessimista(conn, produto_id, pensar):
+    # O lock de escrita do SQLite é do banco inteiro: trava todo mundo
+    conn.execute("BEGIN IMMEDIATE")
+    estoque, = conn.execute("SELECT estoque FROM produtos WHERE id = ?", (produto_id,)).fetchone()
+    time.sleep(pensar)
+    conn.execute("UPDATE produtos SET estoque = ? WHERE id = ?", (estoque + 1, produto_id))
+    conn.execute("COMMIT")
+    return 0
+
+
+def benchmark(threads=8, registros=4, edicoes=200, pensar_ms=1.0):
+    import random
+
+    from database import DatabaseManager
+
+    pasta = tempfile.mkdtemp(prefix="concorrencia_")
+    try:
+        print(f"\n {threads} threads x {edicoes} edições em {registros} produtos "
+              f"({pensar_ms:g}ms entre ler e gravar)")
+        print("-" * 76)
+        print(f"{'Modo':<12} {'Edições/s':>10} {'Conflitos':>10} {'Taxa':>8} {'Perdidas':>10} {'p99':>10}")
+        print("-" * 76)
+        for modo, editar in (("cego", _edicao_cega), ("otimista", _edicao_otimista),
+                             ("pessimista", _edicao_pessimista)):
+            caminho = os.path.join(pasta, f"{modo}.db")
+            db = DatabaseManager(caminho)
+            db.criar_tabelas()
+            for i in range(registros):
+                db.executar_query("INSERT INTO produtos (nome, preco, tamanho, estoque) VALUES (?, ?, ?, ?)",
+                                  (f"Produto {i}", 10.0, "M", 0))
+
+            conflitos = []
+            latencias = []
+            trava = threading.Lock()
+
+            def operador(numero):
+                rng = random.Random(numero)
+                conn = sqlite3.connect(caminho, timeout=30, isolation_level=None if modo == "pessimista" else "")
+                conn.execute("PRAGMA busy_timeout = 30000")
+                meus_conflitos, minhas_latencias = 0, []
+                try:
+                    for _ in range(edicoes):
+                        inicio = time.perf_counter()
+                        meus_conflitos += editar(conn, rng.randint(1, registros), pensar_ms / 1000)
+                        minhas_latencias.append(time.perf_counter() - inicio)
+                finally:
+                    conn.close()
+                with trava:
+                    conflitos.append(meus_conflitos)
+                    latencias.extend(minhas_latencias)
+
+            inicio = time.perf_counter()
+            trabalhadores = [threading.Thread(target=operador, args=(n,)) for n in range(threads)]
+            for t in trabalhadores:
+                t.start()
+            for t in trabalhadores:
+                t.join()
+            duracao = time.perf_counter() - inicio
+
+            total = threads * edicoes
+            gravado = db.executar_query("SELECT SUM(estoque) AS total FROM produtos")[0]['total']
+            latencias.sort()
+            print(f"{modo:<12} {total / duracao:>10.0f} {sum(conflitos):>10} "
+                  f"{sum(conflitos) / (total + sum(conflitos)):>7.1%} {total - gravado:>10} "
+                  f"{latencias[int(len(latencias) * 0.99)] * 1000:>8.1f}ms")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark: edição cega x otimista x pessimista")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--registros", type=int, default=4, help="quantos produtos disputados")
+    parser.add_argument("--edicoes", type=int, default=200, help="edições por thread")
+    parser.add_argument("--pensar-ms", type=float, default=1.0, help="tempo entre ler e gravar")
+    args = parser.parse_args()
+    benchmark(args.threads, args.registros, args.edicoes, args.pensar_ms)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Geração de dados de exemplo para testes de carga e benchmarks
+"""
+
+import json
+import random
+import sqlite3
+
+from categorias import resolver_categoria
+
+NOMES = ["João", "Maria", "José", "Ana", "Antônio", "Francisca", "Carlos", "Paula",
+         "Lucas", "Juliana", "Luíz", "Márcia", "Pedro", "Beatriz", "Ágata", "Zeca"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Pereira", "Lima", "Gonçalves",
+              "Araújo", "Ribeiro", "Conceição", "Almeida", "Câmara"]
+PECAS = ["Camiseta", "Calça", "Bermuda", "Jaqueta", "Vestido", "Saia", "Moletom",
+         "Blusa", "Camisa", "Short", "Casaco", "Regata"]
+CORES = ["Azul", "Preta", "Branca", "Vermelha", "Verde", "Cinza", "Bege", "Amarela"]
+CATEGORIAS = ["Tecidos", "Aviamentos", "Embalagens", "Calçados", "Acessórios", "Logística"]
+TAMANHOS = ["P", "M", "G", "GG"]
+
+
+def gerar_produto(rng, i):
+    """Gera um produto de exemplo"""
+    return {
+        "tabela": "produtos",
+        "nome": f"{rng.choice(PECAS)} {rng.choice(CORES)} {i}",
+        "preco": round(rng.uniform(9.9, 499.9), 2),
+        "tamanho": rng.choice(TAMANHOS),
+        "estoque": rng.randint(0, 200),
+        "estoque_minimo": rng.choice((0, 0, 0, 10, 30)),
+    }
+
+
+def gerar_cliente(rng, i):
+    """Gera um cliente de exemplo (email único pelo índice)"""
+    nome = f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}"
+    return {
+        "tabela": "clientes",
+        "nome": nome,
+        "email": f"cliente{i}@exemplo.com.br",
+        "telefone": f"(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+        "endereco": f"Rua {rng.choice(SOBRENOMES)}, {rng.randint(1, 2000)}",
+    }
+
+
+def gerar_fornecedor(rng, i):
+    """Gera um fornecedor de exemplo (CNPJ único pelo índice)"""
+    return {
+        "tabela": "fornecedores",
+        "nome": f"{rng.choice(SOBRENOMES)} {rng.choice(CATEGORIAS)} Ltda {i}",
+        "cnpj": f"{i:014d}",
+        "email": f"contato{i}@fornecedor.com.br",
+        "telefone": f"(11) 3{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+        "endereco": f"Av. {rng.choice(SOBRENOMES)}, {rng.randint(1, 5000)}",
+        "categoria": rng.choice(CATEGORIAS),
+    }
+
+
+GERADORES = {
+    "produtos": gerar_produto,
+    "clientes": gerar_cliente,
+    "fornecedores": gerar_fornecedor,
+}
+
+
+def gerar_registros(quantidade, tabelas=None, semente=42):
+    """Gera registros alternando entre as tabelas pedidas"""
+    rng = random.Random(semente)
+    tabelas = tabelas or list(GERADORES)
+    for i in range(quantidade):
+        tabela = tabelas[i % len(tabelas)]
+        yield GERADORES[tabela](rng, i)
+
+
+def escrever_ndjson(caminho, quantidade, tabelas=None, semente=42):
+    """Escreve registros de exemplo em um arquivo NDJSON"""
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        for registro in gerar_registros(quantidade, tabelas, semente):
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    print(f" {quantidade} registros escritos em {caminho}")
+
+
+def popular_banco(db_name, produtos=0, clientes=0, fornecedores=0, semente=42, lote=10000):
+    """Insere dados de exemplo diretamente no banco (tabelas já criadas)"""
+    rng = random.Random(semente)
+    colunas = {
+        "produtos": ["nome", "preco", "tamanho", "estoque", "estoque_minimo"],
+        "clientes": ["nome", "email", "telefone", "endereco"],
+        "fornecedores": ["nome", "cnpj", "email", "telefone", "endereco", "categoria", "categoria_id"],
+    }
+    quantidades = {"produtos": produtos, "clientes": clientes, "fornecedores": fornecedores}
+
+    conn = sqlite3.connect(db_name)
+    cache_categorias = {}
+    try:
+        for tabela, quantidade in quantidades.items():
+            cols = colunas[tabela]
+            query = (f"INSERT INTO {tabela} ({', '.join(cols)}) "
+                     f"VALUES ({', '.join('?' * len(cols))})")
+            for inicio in range(0, quantidade, lote):
+                fim = min(inicio + lote, quantidade)
+                linhas = []
+                for i in range(inicio, fim):
+                    registro = GERADORES[tabela](rng, i)
+                    if tabela == "fornecedores":
+                        registro["categoria_id"], registro["categoria"] = resolver_categoria(
+                            conn, registro["categoria"], cache_categorias)
+                    linhas.append(tuple(registro[c] for c in cols))
+                conn.executemany(query, linhas)
+                conn.commit()
+    finally:
+        conn.close()
@@ -6,18 +6,201 @@ Gerenciador do Banco de Dados SQLite
 
 import sqlite3
 import os
+import threading
+import time
 from datetime import datetime
 
+import zlib
+
+from sharding import MapaShards, RoteadorShards
+
+# Os módulos de estrutura (cdc, categorias...) e os opcionais (escrita
+# agrupada, captura, métricas) são importados só quando usados, para não
+# pesar na inicialização de quem só abre o menu (ver benchmark_inicializacao.py)
+MODULOS_DO_SCHEMA = ("database.py", "categorias.py", "cdc.py", "historico_precos.py", "busca_aproximada.py",
+                     "alertas_estoque.py", "compras.py", "cadastros.py", "ordenacao.py")
+
 class DatabaseManager:
-    def __init__(self, db_name="sistema_comercial.db"):
+    """
+    Modo em memória (em_memoria=True): o arquivo é copiado para um banco
+    em memória compartilhado (API de backup) e todo o tráfego é servido
+    dali. Uma thread copia o banco de volta para o disco a cada
+    `janela_duravel` segundos, só se houve commit, e `fechar()` faz a
+    última cópia.
+
+    Garantias: a cópia para o disco é uma única transação no arquivo, então
+    depois de uma queda o arquivo tem o estado da última cópia completa
+    (nunca um meio-termo). Perde-se no máximo o que foi gravado nos últimos
+    `janela_duravel` segundos; com janela_duravel=0 só há cópia no fechar().
+    Não usar quando outro processo também escreve no arquivo: a cópia
+    sobrescreve o arquivo inteiro.
+    """
+    
+    def __init__(self, db_name="sistema_comercial.db", mapa_shards=None, em_memoria=False, janela_duravel=5.0,
+                 busy_timeout_ms=5000, repeticao=True):
         self.db_name = db_name
         self.conn = None
+        self.busy_timeout = busy_timeout_ms / 1000
+        # Banco ocupado por outro processo: True usa a política padrão,
+        # False devolve o erro na primeira falha (ver repeticao.py)
+        if repeticao is True:
+            from repeticao import PoliticaRepeticao
+            repeticao = PoliticaRepeticao()
+        self.repeticao = repeticao or None
+        self._fila_escrita = threading.Lock()
+        self.roteador = None
+        self.ultima_atividade = 0.0  # Usado pela manutenção para esperar ociosidade
+        self.memoria = None  # Conexão que mantém vivo o banco em memória
+        self.escrita_agrupada = None
+        self.captura = None
+        self.metricas = None
+        self.falhas = 0  # Comandos que deram erro (criar_tabelas compara antes/depois)
+        if em_memoria and mapa_shards:
+            print(" Modo em memória não suporta shards; usando os arquivos.")
+            em_memoria = False
+        if mapa_shards:
+            self.roteador = RoteadorShards(mapa_shards, self.abrir_conexao)
+        if em_memoria:
+            self.carregar_em_memoria(janela_duravel)
+    
+    def abrir_conexao(self, caminho=None):
+        """Abre uma nova conexão configurada (arquivo principal ou um shard)"""
+        if self.memoria is not None and (caminho is None or caminho == self.db_name):
+            conn = sqlite3.connect(self._uri_memoria, uri=True, check_same_thread=False,
+                                   timeout=self.busy_timeout)
+        else:
+            conn = sqlite3.connect(caminho or self.db_name, timeout=self.busy_timeout)
+        conn.row_factory = sqlite3.Row  # Para acessar colunas por nome
+        if self.metricas:
+            self.metricas.registrar_conexao()
+        return conn
+    
+    # ------------------------------------------------------------ modo em memória
+    
+    def carregar_em_memoria(self, janela_duravel=5.0):
+        """Copia o arquivo para a memória e inicia a persistência em segundo plano"""
+        self._uri_memoria = f"file:memoria_{id(self)}?mode=memory&cache=shared"
+        try:
+            memoria = sqlite3.connect(self._uri_memoria, uri=True, check_same_thread=False)
+            if os.path.exists(self.db_name):
+                disco = sqlite3.connect(self.db_name)
+                try:
+                    disco.backup(memoria)
+                finally:
+                    disco.close()
+        except sqlite3.Error as e:
+            print(f" Erro ao carregar banco em memória: {e}")
+            return False
+        self.memoria = memoria
+        self._trava_memoria = threading.Lock()
+        self._versao_persistida = self._versao_memoria()
+        self._parar_persistencia = threading.Event()
+        self._persistencia = None
+        if janela_duravel:
+            self._persistencia = threading.Thread(
+                target=self._persistir_periodicamente, args=(janela_duravel,),
+                name="persistencia", daemon=True)
+            self._persistencia.start()
+        return True
+    
+    def _versao_memoria(self):
+        # data_version muda quando outra conexão faz commit
+        return self.memoria.execute("PRAGMA data_version").fetchone()[0]
+    
+    def _persistir_periodicamente(self, janela_duravel):
+        while not self._parar_persistencia.wait(janela_duravel):
+            self.persistir()
+    
+    def persistir(self, forcar=False):
+        """Copia o banco em memória para o arquivo se houve alteração desde a última cópia"""
+        if self.memoria is None:
+            return False
+        with self._trava_memoria:
+            try:
+                versao = self._versao_memoria()
+                if versao == self._versao_persistida and not forcar:
+                    return False
+                disco = sqlite3.connect(self.db_name)
+                try:
+                    disco.execute("PRAGMA busy_timeout = 5000")
+                    # Uma única etapa: o arquivo muda em uma só transação
+                    self.memoria.backup(disco)
+                finally:
+                    disco.close()
+                self._versao_persistida = versao
+                return True
+            except sqlite3.Error as e:
+                print(f" Erro ao persistir banco em memória: {e}")
+                return False
+    
+    def fechar(self, persistir=True):
+        """Grava a fila da escrita agrupada e encerra o modo em memória"""
+        self.parar_captura()
+        if self.escrita_agrupada:
+            self.escrita_agrupada.parar()
+            self.escrita_agrupada = None
+        if self.memoria is None:
+            return
+        self._parar_persistencia.set()
+        if self._persistencia:
+            self._persistencia.join()
+        if persistir:
+            self.persistir()
+        self.memoria.close()
+        self.memoria = None
+    
+    def arquivos(self):
+        """Arquivos de banco gerenciados (vários quando há shards)"""
+        if self.roteador:
+            return self.roteador.mapa.todos_arquivos()
+        return [self.db_name]
+    
+    def arquivos_da_tabela(self, tabela):
+        """Arquivos que guardam linhas de uma tabela"""
+        if self.roteador:
+            return self.roteador.mapa.arquivos(tabela)
+        return [self.db_name]
+    
+    def arquivo_da_chave(self, tabela, chave):
+        """Arquivo que guarda a linha `chave` da tabela"""
+        if self.roteador:
+            return self.roteador.mapa.arquivo_para_chave(tabela, chave)
+        return self.db_name
+    
+    def configurar_arquivo(self, caminho):
+        """Ativa WAL e auto_vacuum incremental (este só vale para arquivos novos)"""
+        try:
+            conn = self.abrir_conexao(caminho)
+            try:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("PRAGMA journal_mode = WAL")
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            self.falhas += 1
+            print(f" Erro ao configurar banco: {e}")
+    
+    def adicionar_coluna_se_faltar(self, tabela, coluna, definicao):
+        """Migração simples: ALTER TABLE ADD COLUMN em cada arquivo que não tiver a coluna"""
+        for arquivo in self.arquivos():
+            try:
+                conn = self.abrir_conexao(arquivo)
+                try:
+                    # table_xinfo também lista as colunas geradas (table_info as omite)
+                    colunas = [col[1] for col in conn.execute(f"PRAGMA table_xinfo({tabela})")]
+                    if colunas and coluna not in colunas:
+                        conn.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+                        conn.commit()
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                self.falhas += 1
+                print(f" Erro ao adicionar coluna {tabela}.{coluna}: {e}")
     
     def conectar(self):
         """Conecta ao banco de dados"""
         try:
-            self.conn = sqlite3.connect(self.db_name)
-            self.conn.row_factory = sqlite3.Row  # Para acessar colunas por nome
+            self.conn = self.abrir_conexao()
             return self.conn
         except sqlite3.Error as e:
             print(f" Erro ao conectar ao banco: {e}")
@@ -28,33 +211,182 @@ class DatabaseManager:
         if self.conn:
             self.conn.close()
     
+    def ativar_escrita_agrupada(self, lote_maximo=200, espera_ms=5):
+        """Passa a gravar INSERT/UPDATE/DELETE em lotes (ver escrita_agrupada.py)"""
+        if self.roteador:
+            print(" Escrita agrupada não suporta shards; mantendo uma transação por comando.")
+            return False
+        if self.escrita_agrupada is None:
+            from escrita_agrupada import EscritaAgrupada
+            self.escrita_agrupada = EscritaAgrupada(self, lote_maximo, espera_ms)
+            self.escrita_agrupada.start()
+        return True
+    
+    def iniciar_captura(self, caminho, redigir=False):
+        """Grava cada chamada do executar_query em NDJSON (ver captura_carga.py)"""
+        from captura_carga import CapturaCarga
+        self.parar_captura()
+        self.captura = CapturaCarga(caminho, redigir)
+    
+    def parar_captura(self):
+        if self.captura:
+            self.captura.fechar()
+            self.captura = None
+    
+    def ativar_metricas(self):
+        """Passa a contar queries, latência e erros (ver metricas.py)"""
+        if self.metricas is None:
+            from metricas import MetricasBanco
+            self.metricas = MetricasBanco(self)
+        return self.metricas
+    
     def executar_query(self, query, params=None):
         """Executa uma query e retorna os resultados"""
-        conn = self.conectar()
-        if conn:
+        captura, metricas = self.captura, self.metricas
+        if captura is None and metricas is None:
+            resultado = self._executar_query(query, params)
+        else:
+            if metricas:
+                metricas.inicio_query()
+            inicio = time.perf_counter()
+            resultado = self._executar_query(query, params)
+            duracao = time.perf_counter() - inicio
+            if metricas:
+                metricas.registrar_query(query, duracao, resultado)
+            if captura:
+                captura.registrar(query, params, inicio, duracao, resultado)
+        if resultado is None:  # Erro já impresso
+            self.falhas += 1
+        return resultado
+    
+    def _executar_query(self, query, params=None):
+        self.ultima_atividade = time.monotonic()
+        if self.roteador:
+            return self.roteador.executar(query, params)
+        
+        if self.escrita_agrupada and query.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE'):
             try:
-                cursor = conn.cursor()
-                if params:
-                    cursor.execute(query, params)
-                else:
-                    cursor.execute(query)
-                
-                if query.strip().upper().startswith('SELECT'):
-                    resultado = cursor.fetchall()
-                else:
-                    conn.commit()
-                    resultado = cursor.rowcount
-                
-                return resultado
+                return self.escrita_agrupada.enviar(query, params).result()
             except sqlite3.Error as e:
+                if self.metricas:
+                    self.metricas.registrar_erro(query, e)
                 print(f" Erro ao executar query: {e}")
                 return None
-            finally:
-                self.desconectar()
-        return None
+        
+        try:
+            if self.repeticao:
+                from repeticao import executar_com_repeticao
+                return executar_com_repeticao(lambda: self._executar_uma_vez(query, params),
+                                              self.repeticao, self.metricas)
+            return self._executar_uma_vez(query, params)
+        except sqlite3.Error as e:
+            if self.metricas:
+                self.metricas.registrar_erro(query, e)
+            from repeticao import erro_transitorio
+            if erro_transitorio(e):
+                print(" Banco ocupado por outro programa (visualizador, exportação...). "
+                      "Nada foi gravado; tente novamente.")
+            else:
+                print(f" Erro ao executar query: {e}")
+            return None
+    
+    def _executar_uma_vez(self, query, params=None):
+        """Uma tentativa da query; erros do SQLite sobem para quem decide repetir"""
+        conn = self.abrir_conexao()
+        try:
+            comando = query.lstrip()[:7].upper()
+            if self.repeticao and comando.startswith(('INSERT', 'UPDATE', 'DELETE', 'REPLACE')):
+                # Lock de escrita pedido logo no BEGIN; no mesmo processo as
+                # escritas esperam a vez na fila em vez de disputar o arquivo
+                conn.isolation_level = None
+                with self._fila_escrita:
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        cursor = conn.execute(query, params or ())
+                        conn.execute("COMMIT")
+                    except BaseException:
+                        if conn.in_transaction:
+                            conn.execute("ROLLBACK")
+                        raise
+                return cursor.rowcount
+            
+            cursor = conn.cursor()
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            
+            if comando.startswith('SELECT'):
+                return cursor.fetchall()
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+    
+    def impressao_digital_schema(self):
+        """
+        Número que muda sempre que o código que define o schema muda (CRC32
+        dos módulos em MODULOS_DO_SCHEMA); fica guardado em PRAGMA user_version.
+        """
+        pasta = os.path.dirname(os.path.abspath(__file__))
+        crc = 0
+        for modulo in MODULOS_DO_SCHEMA:
+            with open(os.path.join(pasta, modulo), 'rb') as arquivo:
+                crc = zlib.crc32(arquivo.read(), crc)
+        return (crc & 0x7FFFFFFF) or 1  # user_version é um inteiro com sinal; 0 = banco novo
+    
+    def preparar_banco(self):
+        """
+        Caminho rápido da inicialização: se todos os arquivos já têm a
+        impressão digital do schema atual, não roda DDL nenhuma. Devolve
+        True quando precisou criar/atualizar as tabelas.
+
+        A impressão digital só é gravada se criar_tabelas terminou sem
+        erro; senão a próxima inicialização tenta de novo.
+        """
+        esperado = self.impressao_digital_schema()
+        try:
+            for arquivo in self.arquivos():
+                conn = self.abrir_conexao(arquivo)
+                try:
+                    atual = conn.execute("PRAGMA user_version").fetchone()[0]
+                finally:
+                    conn.close()
+                if atual != esperado:
+                    break
+            else:
+                return False
+        except sqlite3.Error as e:
+            print(f" Erro ao verificar schema: {e}")
+        
+        if not self.criar_tabelas():
+            print(" Schema incompleto; a criação das tabelas será repetida na próxima inicialização.")
+            return True
+        for arquivo in self.arquivos():
+            try:
+                conn = self.abrir_conexao(arquivo)
+                try:
+                    conn.execute(f"PRAGMA user_version = {esperado}")
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                print(f" Erro ao gravar versão do schema: {e}")
+        return True
     
     def criar_tabelas(self):
-        """Cria as tabelas do sistema"""
+        """Cria as tabelas do sistema; devolve False se algum comando falhou"""
+        from cdc import criar_estrutura_cdc
+        from categorias import criar_estrutura_categorias
+        from historico_precos import criar_estrutura_historico
+        from busca_aproximada import criar_estrutura_busca
+        from alertas_estoque import criar_estrutura_estoque
+        from compras import criar_estrutura_compras
+        from cadastros import criar_estrutura_cadastros
+        from ordenacao import criar_estrutura_ordenacao
+        
+        falhas = self.falhas
+        for arquivo in self.arquivos():
+            self.configurar_arquivo(arquivo)
         
         # Tabela de produtos (loja de roupas)
         query_produtos = """
@@ -64,7 +396,10 @@ class DatabaseManager:
             preco REAL NOT NULL,
             tamanho TEXT NOT NULL CHECK(tamanho IN ('P', 'M', 'G', 'GG')),
             estoque INTEGER DEFAULT 0,
-            data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            versao INTEGER NOT NULL DEFAULT 0,
+            estoque_minimo INTEGER NOT NULL DEFAULT 0,
+            ativo INTEGER NOT NULL DEFAULT 1
         )
         """
         
@@ -76,7 +411,9 @@ class DatabaseManager:
             email TEXT UNIQUE NOT NULL,
             telefone TEXT,
             endereco TEXT,
-            data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            versao INTEGER NOT NULL DEFAULT 0,
+            ativo INTEGER NOT NULL DEFAULT 1
         )
         """
         
@@ -90,7 +427,9 @@ class DatabaseManager:
             telefone TEXT,
             endereco TEXT,
             categoria TEXT,
-            data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            categoria_id INTEGER REFERENCES categorias(id),
+            versao INTEGER NOT NULL DEFAULT 0
         )
         """
         
@@ -99,10 +438,58 @@ class DatabaseManager:
         self.executar_query(query_clientes)
         self.executar_query(query_fornecedores)
         
+        # Versão de cada linha para o controle de concorrência otimista (concorrencia.py)
+        for tabela in ("produtos", "clientes", "fornecedores"):
+            self.adicionar_coluna_se_faltar(tabela, "versao", "INTEGER NOT NULL DEFAULT 0")
+        # Ponto de reposição dos produtos (alertas_estoque.py)
+        self.adicionar_coluna_se_faltar("produtos", "estoque_minimo", "INTEGER NOT NULL DEFAULT 0")
+        # Produto descontinuado / cliente inativo: candidatos ao arquivamento (arquivamento.py)
+        for tabela in ("produtos", "clientes"):
+            self.adicionar_coluna_se_faltar(tabela, "ativo", "INTEGER NOT NULL DEFAULT 1")
+        
+        # Categorias normalizadas de fornecedores (antes do CDC, que usa as colunas atuais)
+        criar_estrutura_categorias(self)
+        
+        # Changelog e triggers de captura de alterações
+        criar_estrutura_cdc(self)
+        
+        # Histórico de preços dos produtos
+        criar_estrutura_historico(self)
+        
+        # Índice de trigramas para busca aproximada de nomes
+        criar_estrutura_busca(self)
+        
+        # Índices parciais e alertas de estoque abaixo do mínimo
+        criar_estrutura_estoque(self)
+        
+        # Fornecedores de cada produto (sugestão de compras)
+        criar_estrutura_compras(self)
+        
+        # Índices em data_cadastro e contagem de cadastros por dia (relatório do visualizador)
+        criar_estrutura_cadastros(self)
+        
+        # Chave de ordenação sem acento/caixa e índice para as listagens por nome
+        criar_estrutura_ordenacao(self)
+        
+        if self.falhas != falhas:
+            print(f" Erro ao criar tabelas: {self.falhas - falhas} comando(s) falharam")
+            return False
         print(" Tabelas criadas/verificadas com sucesso!")
+        return True
+    
+    def redistribuir_shards(self, novo_mapa, lote=5000, salvar_em=None):
+        """Move os dados para um novo mapa de shards (com os outros processos parados)"""
+        if not self.roteador:
+            self.roteador = RoteadorShards(MapaShards(padrao=self.db_name), self.abrir_conexao)
+        return self.roteador.redistribuir(
+            novo_mapa, lambda arquivo: DatabaseManager(arquivo).criar_tabelas(), lote, salvar_em)
     
     def limpar_banco(self):
         """Remove o arquivo do banco de dados (use com cuidado!)"""
+        self.fechar(persistir=False)
         if os.path.exists(self.db_name):
             os.remove(self.db_name)
+            for sufixo in ("-wal", "-shm"):
+                if os.path.exists(self.db_name + sufixo):
+                    os.remove(self.db_name + sufixo)
             print(" Banco de dados removido!")
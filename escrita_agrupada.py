@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Escrita agrupada (group commit) para inserções de uma linha
+
+Com vários terminais cadastrando ao mesmo tempo, cada INSERT do
+executar_query é uma transação e um fsync. Com a escrita agrupada ativa
+(DatabaseManager.ativar_escrita_agrupada), os INSERT/UPDATE/DELETE de
+qualquer thread entram em uma fila; uma única thread escritora junta até
+`lote_maximo` comandos ou o que chegar em `espera_ms` e grava tudo em uma
+transação. A espera termina antes quando todos os comandos enviados e
+ainda sem resposta já estão no lote (quem chama o executar_query fica
+bloqueado até o resultado, então mais nada chegaria daquelas threads).
+
+Cada comando roda dentro de um SAVEPOINT: um erro de restrição (email ou
+CNPJ repetido) desfaz só aquele comando e vai para o Future de quem o
+enviou; os demais do lote são gravados normalmente. O executar_query
+continua com o mesmo contrato (espera o Future e devolve o rowcount ou
+None com a mensagem de erro).
+
+Benchmark (clientes, com os triggers de CDC e busca):
+    python escrita_agrupada.py --threads 16 --insercoes 300
+        simples    ~900 inserções/s, mediana 4,9ms, p99 136ms
+        agrupada ~12000 inserções/s, mediana 1,3ms, p99 3,4ms
+    com 64 threads: ~1000/s contra ~25000/s
+"""
+
+import argparse
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+
+class EscritaAgrupada(threading.Thread):
+    def __init__(self, db_manager, lote_maximo=200, espera_ms=5):
+        super().__init__(name="escrita_agrupada", daemon=True)
+        self.db = db_manager
+        self.lote_maximo = lote_maximo
+        self.espera = espera_ms / 1000
+        self.fila = queue.Queue()
+        self.lotes = 0
+        self.comandos = 0
+        self._pendentes = 0  # enviados e ainda sem resultado
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+
+    def enviar(self, query, params=None):
+        """Coloca um comando na fila; o Future recebe o rowcount ou a exceção"""
+        futuro = Future()
+        # Mesma trava do parar(): nenhum comando entra na fila depois do fim
+        with self._trava:
+            if self._parar.is_set():
+                futuro.set_exception(sqlite3.OperationalError("escrita agrupada encerrada"))
+                return futuro
+            self._pendentes += 1
+            self.fila.put((query, params, futuro))
+        return futuro
+
+    def parar(self, timeout=5.0):
+        """Grava o que estiver na fila e encerra a thread"""
+        with self._trava:
+            self._parar.set()
+            self.fila.put(None)
+        if self.is_alive():
+            self.join(timeout)
+
+    # ---------------------------------------------------------------- escritor
+
+    def _proximo_lote(self):
+        primeiro = self.fila.get()
+        if primeiro is None:
+            return None
+        lote = [primeiro]
+        limite = time.monotonic() + self.espera
+        while len(lote) < self.lote_maximo:
+            # Se todo comando pendente já está no lote, quem enviou está
+            # esperando o resultado e nada mais vai chegar: não adianta esperar
+            with self._trava:
+                if len(lote) >= self._pendentes and self.fila.empty():
+                    break
+            restante = limite - time.monotonic()
+            try:
+                item = self.fila.get(timeout=restante) if restante > 0 else self.fila.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.fila.put(None)  # fim: grava este lote e para na próxima volta
+                break
+            lote.append(item)
+        return lote
+
+    def run(self):
+        conn = self.db.abrir_conexao()
+        conn.isolation_level = None  # transações controladas aqui
+        conn.execute("PRAGMA busy_timeout = 5000")
+        try:
+            while True:
+                lote = self._proximo_lote()
+                if lote is None:
+                    break
+                self._gravar(conn, lote)
+        finally:
+            conn.close()
+
+    def _concluidos(self, quantidade):
+        with self._trava:
+            self._pendentes -= quantidade
+
+    def _gravar(self, conn, lote):
+        resultados = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for query, params, futuro in lote:
+                conn.execute("SAVEPOINT comando")
+                try:
+                    cursor = conn.execute(query, params or ())
+                    resultados.append((futuro, cursor.rowcount, None))
+                    conn.execute("RELEASE comando")
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO comando")
+                    conn.execute("RELEASE comando")
+                    resultados.append((futuro, None, e))
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            # Falha da transação inteira: ninguém do lote foi gravado
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            self._concluidos(len(lote))
+            return
+
+        self.lotes += 1
+        self.comandos += len(lote)
+        self.db.ultima_atividade = time.monotonic()
+        self._concluidos(len(lote))
+        for futuro, rowcount, erro in resultados:
+            if erro is None:
+                futuro.set_result(rowcount)
+            else:
+                futuro.set_exception(erro)
+
+
+def benchmark(threads=16, insercoes=300, lote_maximo=200, espera_ms=5):
+    """Compara inserções concorrentes de clientes com e sem escrita agrupada"""
+    import os
+    import shutil
+    import tempfile
+
+    from database import DatabaseManager
+
+    pasta = tempfile.mkdtemp(prefix="escrita_agrupada_")
+    try:
+        print(f"\n {threads} threads x {insercoes} clientes (1 email repetido a cada 50)")
+        print("-" * 72)
+        print(f"{'Modo':<10} {'Inserções/s':>12} {'Mediana':>10} {'p99':>10} {'Erros':>8} {'Lotes':>8}")
+        print("-" * 72)
+        for agrupada in (False, True):
+            caminho = os.path.join(pasta, f"agrupada_{agrupada}.db")
+            db = DatabaseManager(caminho)
+            db.criar_tabelas()
+            if agrupada:
+                db.ativar_escrita_agrupada(lote_maximo, espera_ms)
+
+            latencias = []
+            erros = []
+            trava = threading.Lock()
+
+            def terminal(numero):
+                # Sem agrupamento, cada terminal tem o próprio DatabaseManager (e conexão)
+                banco = db if agrupada else DatabaseManager(caminho)
+                latencias_locais, erros_locais = [], 0
+                for i in range(insercoes):
+                    # A cada 50 inserções, um email que outra thread também usa
+                    email = f"repetido{i}@exemplo.com.br" if i % 50 == 0 else f"t{numero}_{i}@exemplo.com.br"
+                    inicio = time.perf_counter()
+                    if banco.executar_query("INSERT INTO clientes (nome, email) VALUES (?, ?)",
+                                         (f"Cliente {numero}-{i}", email)) is None:
+                        erros_locais += 1
+                    latencias_locais.append(time.perf_counter() - inicio)
+                with trava:
+                    latencias.extend(latencias_locais)
+                    erros.append(erros_locais)
+
+            inicio = time.perf_counter()
+            trabalhadores = [threading.Thread(target=terminal, args=(n,)) for n in range(threads)]
+            for t in trabalhadores:
+                t.start()
+            for t in trabalhadores:
+                t.join()
+            duracao = time.perf_counter() - inicio
+
+            lotes = db.escrita_agrupada.lotes if agrupada else threads * insercoes
+            db.fechar()
+            latencias.sort()
+            print(f"{'agrupada' if agrupada else 'simples':<10} {threads * insercoes / duracao:>12.0f} "
+                  f"{latencias[len(latencias) // 2] * 1000:>8.2f}ms {latencias[int(len(latencias) * 0.99)] * 1000:>8.2f}ms "
+                  f"{sum(erros):>8} {lotes:>8}")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da escrita agrupada")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--insercoes", type=int, default=300, help="inserções por thread")
+    parser.add_argument("--lote", type=int, default=200)
+    parser.add_argument("--espera-ms", type=float, default=5)
+    args = parser.parse_args()
+    benchmark(args.threads, args.insercoes, args.lote, args.espera_ms)
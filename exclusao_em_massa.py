@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exclusão em massa em blocos curtos
+
+Em vez de um único DELETE que segura o lock de escrita durante toda a
+operação, apaga por faixas de rowid (cada faixa cobre `tamanho_bloco`
+linhas da tabela) em transações curtas, com uma pausa entre os blocos
+para os outros terminais conseguirem escrever.
+
+As páginas liberadas ficam na freelist e são devolvidas aos poucos pelo
+incremental_vacuum da manutenção (manutencao.py).
+"""
+
+import sqlite3
+import time
+
+TABELAS_PERMITIDAS = ("produtos", "clientes", "fornecedores")
+
+
+def _excluir_bloco(db_manager, conn, query, params):
+    """Um bloco; se outro programa estiver gravando, o bloco é refeito (repeticao.py)"""
+    def excluir():
+        try:
+            cursor = conn.execute(query, params)
+            conn.commit()
+            return cursor
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+    if db_manager.repeticao is None:
+        return excluir()
+    from repeticao import executar_com_repeticao
+    return executar_com_repeticao(excluir, db_manager.repeticao, db_manager.metricas)
+
+
+def excluir_em_blocos(db_manager, tabela, filtro=None, params=(), tamanho_bloco=1000,
+                      pausa=0.01, progresso=None):
+    """
+    Apaga as linhas de `tabela` que atendem `filtro` (trecho SQL com ?).
+
+    `progresso(excluidas, ultimo_id, maior_id)` é chamado após cada bloco.
+    Retorna o total de linhas excluídas, ou None em caso de erro.
+    """
+    if tabela not in TABELAS_PERMITIDAS:
+        print(f" Tabela inválida: {tabela}")
+        return None
+
+    condicao = f" AND ({filtro})" if filtro else ""
+    excluidas = 0
+    for arquivo in db_manager.arquivos_da_tabela(tabela):
+        conn = db_manager.abrir_conexao(arquivo)
+        try:
+            maior_id = conn.execute(f"SELECT MAX(id) FROM {tabela}").fetchone()[0]
+            ultimo_id = 0
+            while maior_id is not None and ultimo_id < maior_id:
+                # Limite superior do bloco andando só pelo rowid (sem ler as linhas)
+                limite = conn.execute(f"""
+                    SELECT MAX(id) FROM (
+                        SELECT id FROM {tabela} WHERE id > ? ORDER BY id LIMIT ?
+                    )
+                """, (ultimo_id, tamanho_bloco)).fetchone()[0]
+                if limite is None:
+                    break
+
+                db_manager.ultima_atividade = time.monotonic()
+                cursor = _excluir_bloco(db_manager, conn,
+                                        f"DELETE FROM {tabela} WHERE id > ? AND id <= ?{condicao}",
+                                        (ultimo_id, limite) + tuple(params))
+                excluidas += max(cursor.rowcount, 0)
+                ultimo_id = limite
+
+                if progresso:
+                    progresso(excluidas, ultimo_id, maior_id)
+                if pausa:
+                    time.sleep(pausa)
+        except sqlite3.Error as e:
+            print(f" Erro ao excluir em blocos: {e}")
+            return None
+        finally:
+            conn.close()
+    return excluidas
+
+
+def imprimir_progresso(excluidas, ultimo_id, maior_id):
+    """Callback de progresso para os menus"""
+    percentual = ultimo_id / maior_id if maior_id else 1
+    print(f"\r Progresso: {percentual:6.1%} - {excluidas} excluídos", end="", flush=True)
+    if ultimo_id >= maior_id:
+        print()
+
+
+def pedir_filtro_data():
+    """Pergunta uma data limite e devolve (filtro, params) para data_cadastro"""
+    data = input("Excluir cadastrados antes de (AAAA-MM-DD): ").strip()
+    if len(data) != 10 or data[4] != '-' or data[7] != '-':
+        print(" Data inválida.")
+        return None, None
+    return "data_cadastro < ?", (data,)
@@ -4,6 +4,12 @@
 CRUD para Fornecedores
 """
 
+from exclusao_em_massa import excluir_em_blocos, imprimir_progresso, pedir_filtro_data
+from categorias import obter_categoria, procurar_categoria, listar_categorias, fornecedores_da_categoria
+from busca_aproximada import buscar_aproximado
+from concorrencia import atualizar_com_versao, avisar_conflito
+from compras import produtos_do_fornecedor
+
 class Fornecedor:
     def __init__(self, id=None, nome="", cnpj="", email="", telefone="", endereco="", categoria=""):
         self.id = id
@@ -90,12 +96,13 @@ class FornecedorCRUD:
             telefone = input("Telefone: ").strip()
             endereco = input("Endereço: ").strip()
             categoria = input("Categoria/Ramo: ").strip()
+            categoria_id, categoria = obter_categoria(self.db, categoria)
             
             query = """
-            INSERT INTO fornecedores (nome, cnpj, email, telefone, endereco, categoria)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO fornecedores (nome, cnpj, email, telefone, endereco, categoria, categoria_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             """
-            resultado = self.db.executar_query(query, (nome, cnpj, email, telefone, endereco, categoria))
+            resultado = self.db.executar_query(query, (nome, cnpj, email, telefone, endereco, categoria, categoria_id))
             
             if resultado:
                 print(" Fornecedor adicionado com sucesso!")
@@ -107,7 +114,7 @@ class FornecedorCRUD:
     
     def listar_fornecedores(self):
         """Lista todos os fornecedores"""
-        query = "SELECT * FROM fornecedores ORDER BY nome"
+        query = "SELECT * FROM fornecedores ORDER BY nome_ordenacao, nome"
         fornecedores = self.db.executar_query(query)
         
         if not fornecedores:
@@ -146,15 +153,59 @@ class FornecedorCRUD:
         query = """
         SELECT * FROM fornecedores 
         WHERE nome LIKE ? OR categoria LIKE ?
-        ORDER BY nome
+        ORDER BY nome_ordenacao, nome
         """
         fornecedores = self.db.executar_query(query, (f"%{termo}%", f"%{termo}%"))
         
+        if not fornecedores:
+            # Sem resultado exato: sugere nomes parecidos (acentos, erros de digitação)
+            parecidos = buscar_aproximado(self.db, "fornecedores", termo)
+            if not parecidos:
+                print(" Nenhum fornecedor encontrado.")
+                return
+            print(f"\n Nenhum fornecedor com '{termo}'. Você quis dizer:")
+            fornecedores = [fornecedor for _, fornecedor in parecidos]
+        
+        print(f"\n Resultados da busca por '{termo}':")
+        print("-" * 90)
+        print(f"{'ID':<3} {'Nome':<25} {'CNPJ':<18} {'Categoria':<20} {'Telefone':<15}")
+        print("-" * 90)
+        
+        for fornecedor in fornecedores:
+            cnpj_formatado = self.formatar_cnpj(fornecedor['cnpj'])
+            print(f"{fornecedor['id']:<3} {fornecedor['nome']:<25} {cnpj_formatado:<18} "
+                  f"{fornecedor['categoria'] or 'N/A':<20} {fornecedor['telefone'] or 'N/A':<15}")
+    
+    def navegar_por_categoria(self):
+        """Navega pelos fornecedores de uma categoria, com filtro por início do nome"""
+        categorias = listar_categorias(self.db)
+        if not categorias:
+            print(" Nenhuma categoria cadastrada.")
+            return
+        
+        print("\n Categorias:")
+        print("-" * 45)
+        for i, categoria in enumerate(categorias, 1):
+            print(f"{i:<4} {categoria['nome']:<30} {categoria['total']:>8}")
+        
+        try:
+            escolha = int(input("\nEscolha uma categoria: ")) - 1
+            if not 0 <= escolha < len(categorias):
+                print(" Opção inválida.")
+                return
+        except ValueError:
+            print(" Digite um número válido.")
+            return
+        
+        categoria = categorias[escolha]
+        prefixo = input("Início do nome (Enter para todos): ").strip()
+        fornecedores = fornecedores_da_categoria(self.db, categoria['id'], prefixo)
+        
         if not fornecedores:
             print(" Nenhum fornecedor encontrado.")
             return
         
-        print(f"\n Resultados da busca por '{termo}':")
+        print(f"\n Fornecedores em '{categoria['nome']}' ({categoria['total']} no total):")
         print("-" * 90)
         print(f"{'ID':<3} {'Nome':<25} {'CNPJ':<18} {'Categoria':<20} {'Telefone':<15}")
         print("-" * 90)
@@ -193,68 +244,56 @@ class FornecedorCRUD:
                 if escolha == '1':
                     novo_nome = input("Novo nome: ").strip()
                     if novo_nome:
-                        query = "UPDATE fornecedores SET nome = ? WHERE id = ?"
-                        self.db.executar_query(query, (novo_nome, fornecedor_id))
-                        fornecedor = dict(fornecedor)
-                        fornecedor['nome'] = novo_nome
-                        print(" Nome atualizado!")
+                        campos, mensagem = {'nome': novo_nome}, " Nome atualizado!"
                     else:
                         print(" Nome não pode estar vazio.")
+                        continue
                 
                 elif escolha == '2':
                     novo_cnpj = input("Novo CNPJ (apenas números): ").strip()
                     if self.validar_cnpj(novo_cnpj):
-                        novo_cnpj = self.so_numeros(novo_cnpj)
-                        query = "UPDATE fornecedores SET cnpj = ? WHERE id = ?"
-                        resultado = self.db.executar_query(query, (novo_cnpj, fornecedor_id))
-                        if resultado:
-                            fornecedor = dict(fornecedor)
-                            fornecedor['cnpj'] = novo_cnpj
-                            print(" CNPJ atualizado!")
-                        else:
-                            print(" CNPJ já está em uso.")
+                        campos, mensagem = {'cnpj': self.so_numeros(novo_cnpj)}, " CNPJ atualizado!"
                     else:
                         print(" CNPJ inválido.")
+                        continue
                 
                 elif escolha == '3':
                     novo_email = input("Novo email: ").strip().lower()
                     if self.validar_email(novo_email):
-                        query = "UPDATE fornecedores SET email = ? WHERE id = ?"
-                        self.db.executar_query(query, (novo_email, fornecedor_id))
-                        fornecedor = dict(fornecedor)
-                        fornecedor['email'] = novo_email
-                        print(" Email atualizado!")
+                        campos, mensagem = {'email': novo_email}, " Email atualizado!"
                     else:
                         print(" Email inválido.")
+                        continue
                 
                 elif escolha == '4':
-                    novo_telefone = input("Novo telefone: ").strip()
-                    query = "UPDATE fornecedores SET telefone = ? WHERE id = ?"
-                    self.db.executar_query(query, (novo_telefone, fornecedor_id))
-                    fornecedor = dict(fornecedor)
-                    fornecedor['telefone'] = novo_telefone
-                    print(" Telefone atualizado!")
+                    campos, mensagem = {'telefone': input("Novo telefone: ").strip()}, " Telefone atualizado!"
                 
                 elif escolha == '5':
-                    novo_endereco = input("Novo endereço: ").strip()
-                    query = "UPDATE fornecedores SET endereco = ? WHERE id = ?"
-                    self.db.executar_query(query, (novo_endereco, fornecedor_id))
-                    fornecedor = dict(fornecedor)
-                    fornecedor['endereco'] = novo_endereco
-                    print(" Endereço atualizado!")
+                    campos, mensagem = {'endereco': input("Novo endereço: ").strip()}, " Endereço atualizado!"
                 
                 elif escolha == '6':
                     nova_categoria = input("Nova categoria: ").strip()
-                    query = "UPDATE fornecedores SET categoria = ? WHERE id = ?"
-                    self.db.executar_query(query, (nova_categoria, fornecedor_id))
-                    fornecedor = dict(fornecedor)
-                    fornecedor['categoria'] = nova_categoria
-                    print(" Categoria atualizada!")
+                    categoria_id, nova_categoria = obter_categoria(self.db, nova_categoria)
+                    campos = {'categoria': nova_categoria, 'categoria_id': categoria_id}
+                    mensagem = " Categoria atualizada!"
                 
                 elif escolha == '7':
                     break
                 else:
                     print(" Opção inválida.")
+                    continue
+                
+                # Grava só se ninguém alterou o fornecedor desde que foi aberto
+                situacao, fornecedor = atualizar_com_versao(self.db, "fornecedores", fornecedor, campos)
+                if situacao == "ok":
+                    print(mensagem)
+                elif situacao == "conflito":
+                    avisar_conflito(fornecedor, ("nome", "cnpj", "email", "telefone", "endereco", "categoria"))
+                elif situacao == "excluido":
+                    print(" Fornecedor foi excluído por outro usuário.")
+                    break
+                elif 'cnpj' in campos:
+                    print(" CNPJ já está em uso.")
                     
         except ValueError:
             print(" ID inválido.")
@@ -297,18 +336,86 @@ class FornecedorCRUD:
         try:
             confirmacao = input("Tem certeza que deseja excluir TODOS os fornecedores? (s/N): ").lower()
             if confirmacao == 's':
-                query = "DELETE FROM fornecedores"
-                resultado = self.db.executar_query(query)
+                resultado = excluir_em_blocos(self.db, "fornecedores", progresso=imprimir_progresso)
                 if resultado is not None:
-                    print("Todos os fornecedores foram excluídos com sucesso!")
+                    print(f"Todos os fornecedores foram excluídos com sucesso! ({resultado})")
                 else:
                     print("Erro ao excluir fornecedores.")
             else:
                 print("Exclusão cancelada.")
         except Exception as e:
             print(f"Erro inesperado: {e}")
+    
+    def excluir_por_filtro(self):
+        """Exclui em massa os fornecedores de uma categoria ou cadastrados antes de uma data"""
+        try:
+            print("\nExcluir fornecedores por:")
+            print("1. Data de cadastro")
+            print("2. Categoria")
+            escolha = input("Opção: ").strip()
+            
+            if escolha == '1':
+                filtro, params = pedir_filtro_data()
+            elif escolha == '2':
+                categoria = input("Categoria: ").strip()
+                if not categoria:
+                    print(" Categoria não pode estar vazia.")
+                    return
+                # Mesma chave normalizada do cadastro: "tecidos" e "Tecidos " acham "Tecidos"
+                encontrada = procurar_categoria(self.db, categoria)
+                if not encontrada:
+                    print(" Categoria não encontrada.")
+                    return
+                print(f" Categoria: {encontrada[1]}")
+                filtro, params = "categoria_id = ?", (encontrada[0],)
+            else:
+                print(" Opção inválida.")
+                return
+            if not filtro:
+                return
+            
+            confirmacao = input("Confirma a exclusão? (s/N): ").lower()
+            if confirmacao == 's':
+                resultado = excluir_em_blocos(self.db, "fornecedores", filtro, params, progresso=imprimir_progresso)
+                if resultado is not None:
+                    print(f" {resultado} fornecedor(es) excluído(s).")
+            else:
+                print("Exclusão cancelada.")
+        except Exception as e:
+            print(f"Erro inesperado: {e}")
 
     
+    def listar_produtos_fornecidos(self):
+        """Produtos vinculados a um fornecedor, 50 por página"""
+        try:
+            fornecedor_id = int(input("\nID do fornecedor: "))
+        except ValueError:
+            print(" ID inválido.")
+            return
+        fornecedor = self.buscar_fornecedor_por_id(fornecedor_id)
+        if not fornecedor:
+            print(" Fornecedor não encontrado.")
+            return
+        
+        apos = 0
+        while True:
+            produtos = produtos_do_fornecedor(self.db, fornecedor_id, apos)
+            if not produtos:
+                print(" Nenhum produto vinculado." if not apos else " Fim da lista.")
+                return
+            print(f"\n Produtos fornecidos por {fornecedor['nome']}:")
+            print("-" * 80)
+            print(f"{'ID':<6} {'Produto':<30} {'Tam.':<5} {'Estoque':<8} {'Custo':<11} {'Prazo':<8}")
+            print("-" * 80)
+            for produto in produtos:
+                custo = f"R${produto['preco_custo']:.2f}" if produto['preco_custo'] is not None else "-"
+                prazo = f"{produto['prazo_dias']}d" if produto['prazo_dias'] is not None else "-"
+                print(f"{produto['produto_id']:<6} {produto['nome'][:30]:<30} {produto['tamanho']:<5} "
+                      f"{produto['estoque']:<8} {custo:<11} {prazo:<8}")
+            apos = produtos[-1]['produto_id']
+            if len(produtos) < 50 or input("Enter para mais, 'q' para sair: ").strip().lower() == 'q':
+                return
+    
     def menu(self):
         """Menu principal de fornecedores"""
         while True:
@@ -321,7 +428,10 @@ class FornecedorCRUD:
             print("4. Atualizar fornecedor")
             print("5. Excluir fornecedor")
             print("6. Excluir TODOS os fornecedores")
-            print("7. Voltar ao menu principal")
+            print("7. Excluir fornecedores por filtro")
+            print("8. Navegar por categoria")
+            print("9. Produtos fornecidos")
+            print("10. Voltar ao menu principal")
             print("="*40)
             
             opcao = input("Escolha uma opção: ").strip()
@@ -339,6 +449,12 @@ class FornecedorCRUD:
             elif opcao == '6':
                 self.excluir_todos()
             elif opcao == '7':
+                self.excluir_por_filtro()
+            elif opcao == '8':
+                self.navegar_por_categoria()
+            elif opcao == '9':
+                self.listar_produtos_fornecidos()
+            elif opcao == '10':
                 break
             else:
                 print(" Opção inválida. Tente novamente.")
\ No newline at end of file
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Histórico de preços dos produtos com consultas "preço em uma data"
+
+Cada alteração de produtos.preco abre um intervalo [valid_from, valid_to)
+em historico_precos (mantido por triggers). Dois índices cobrem as
+consultas sem ler a tabela:
+    - (produto_id, valid_from, preco): um produto, uma busca + 1 linha;
+    - (valid_to, valid_from, produto_id, preco): todos os produtos, lendo
+      só as versões vigentes na data (intervalo aberto = valid_to NULL).
+
+Datas usam o mesmo formato de data_cadastro (UTC, 'AAAA-MM-DD HH:MM:SS');
+uma data sem hora ('AAAA-MM-DD') vale até o fim do dia.
+
+Benchmark:
+    python historico_precos.py --benchmark 1000000
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+AGORA = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def criar_estrutura_historico(db_manager):
+    """Cria a tabela de histórico, o índice, os triggers e preenche o que faltar"""
+    db_manager.executar_query("""
+    CREATE TABLE IF NOT EXISTS historico_precos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        produto_id INTEGER NOT NULL,
+        preco REAL NOT NULL,
+        valid_from TEXT NOT NULL,
+        valid_to TEXT
+    )
+    """)
+    db_manager.executar_query("""
+    CREATE INDEX IF NOT EXISTS idx_historico_precos_produto
+    ON historico_precos (produto_id, valid_from, preco)
+    """)
+    db_manager.executar_query("""
+    CREATE INDEX IF NOT EXISTS idx_historico_precos_validade
+    ON historico_precos (valid_to, valid_from, produto_id, preco)
+    """)
+    db_manager.executar_query(f"""
+    CREATE TRIGGER IF NOT EXISTS historico_precos_insert AFTER INSERT ON produtos
+    BEGIN
+        INSERT INTO historico_precos (produto_id, preco, valid_from)
+        VALUES (NEW.id, NEW.preco, {AGORA});
+    END
+    """)
+    db_manager.executar_query(f"""
+    CREATE TRIGGER IF NOT EXISTS historico_precos_update AFTER UPDATE OF preco ON produtos
+    WHEN OLD.preco IS NOT NEW.preco
+    BEGIN
+        UPDATE historico_precos SET valid_to = {AGORA}
+        WHERE produto_id = NEW.id AND valid_to IS NULL;
+        INSERT INTO historico_precos (produto_id, preco, valid_from)
+        VALUES (NEW.id, NEW.preco, {AGORA});
+    END
+    """)
+    db_manager.executar_query(f"""
+    CREATE TRIGGER IF NOT EXISTS historico_precos_delete AFTER DELETE ON produtos
+    BEGIN
+        UPDATE historico_precos SET valid_to = {AGORA}
+        WHERE produto_id = OLD.id AND valid_to IS NULL;
+    END
+    """)
+    # Produtos cadastrados antes do histórico existir
+    db_manager.executar_query("""
+    INSERT INTO historico_precos (produto_id, preco, valid_from)
+    SELECT p.id, p.preco, COALESCE(p.data_cadastro, CURRENT_TIMESTAMP) FROM produtos p
+    WHERE NOT EXISTS (SELECT 1 FROM historico_precos h WHERE h.produto_id = p.id)
+    """)
+
+
+def _normalizar_data(data):
+    """'AAAA-MM-DD' vira o último instante do dia"""
+    data = str(data).strip()
+    if len(data) == 10:
+        return data + " 23:59:59.999"
+    return data
+
+
+def preco_em(db_manager, produto_id, data):
+    """Preço de um produto em uma data (None se ainda não existia ou já tinha saído)"""
+    data = _normalizar_data(data)
+    resultado = db_manager.executar_query("""
+        SELECT preco FROM historico_precos
+        WHERE produto_id = ? AND valid_from <= ? AND (valid_to IS NULL OR valid_to > ?)
+        ORDER BY valid_from DESC LIMIT 1
+    """, (produto_id, data, data))
+    if resultado:
+        return resultado[0]["preco"]
+    return None
+
+
+def precos_em(db_manager, data, produto_ids=None):
+    """
+    Preços de vários produtos em uma data, como {produto_id: preco}.
+
+    Sem `produto_ids`, faz duas buscas de intervalo no índice de validade
+    (intervalos abertos e intervalos fechados depois da data), lendo só
+    as versões vigentes. Com uma lista de ids, faz uma busca por id.
+    """
+    data = _normalizar_data(data)
+    # Com shards, o histórico fica no arquivo de cada produto (triggers)
+    if produto_ids is None:
+        por_arquivo = {arquivo: None for arquivo in db_manager.arquivos_da_tabela("produtos")}
+    else:
+        por_arquivo = {}
+        for produto_id in produto_ids:
+            por_arquivo.setdefault(db_manager.arquivo_da_chave("produtos", int(produto_id)), []).append(int(produto_id))
+
+    precos = {}
+    for arquivo, ids in por_arquivo.items():
+        conn = db_manager.abrir_conexao(arquivo)
+        conn.row_factory = None  # tuplas simples: bem mais rápido para milhões de linhas
+        try:
+            if ids is None:
+                cursor = conn.execute("""
+                    SELECT produto_id, preco FROM historico_precos
+                    WHERE valid_to IS NULL AND valid_from <= :data
+                    UNION ALL
+                    SELECT produto_id, preco FROM historico_precos
+                    WHERE valid_to > :data AND valid_from <= :data
+                """, {"data": data})
+            else:
+                consulta = """
+                    SELECT value, (SELECT preco FROM historico_precos
+                                   WHERE produto_id = value AND valid_from <= :data
+                                     AND (valid_to IS NULL OR valid_to > :data)
+                                   ORDER BY valid_from DESC LIMIT 1)
+                    FROM json_each(:ids)
+                """
+                cursor = conn.execute(consulta, {"data": data, "ids": "[" + ",".join(str(i) for i in ids) + "]"})
+            precos.update((linha[0], linha[1]) for linha in cursor if linha[1] is not None)
+        except sqlite3.Error as e:
+            print(f" Erro ao consultar histórico de preços: {e}")
+            return {}
+        finally:
+            conn.close()
+    return precos
+
+
+def historico_produto(db_manager, produto_id):
+    """Todas as versões de preço de um produto, da mais antiga à atual"""
+    return db_manager.executar_query("""
+        SELECT preco, valid_from, valid_to FROM historico_precos
+        WHERE produto_id = ? ORDER BY valid_from
+    """, (produto_id,)) or []
+
+
+def benchmark(quantidade):
+    """Mede a consulta em massa sobre `quantidade` produtos com 3 versões de preço cada"""
+    from database import DatabaseManager
+
+    pasta = tempfile.mkdtemp()
+    caminho = os.path.join(pasta, "bench_precos.db")
+    db = DatabaseManager(caminho)
+    db.criar_tabelas()
+
+    conn = sqlite3.connect(caminho)
+    inicio = time.perf_counter()
+    conn.execute("DROP TRIGGER IF EXISTS historico_precos_insert")
+    conn.execute("""
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO produtos (id, nome, preco, tamanho, estoque) SELECT i, 'Produto ' || i, 100, 'M', 10 FROM n
+    """, (quantidade,))
+    for versao, data_inicio, data_fim in ((1, "2024-01-01 00:00:00", "2025-01-01 00:00:00"),
+                                          (2, "2025-01-01 00:00:00", "2026-01-01 00:00:00"),
+                                          (3, "2026-01-01 00:00:00", None)):
+        conn.execute("""
+            INSERT INTO historico_precos (produto_id, preco, valid_from, valid_to)
+            SELECT id, 100 * ?, ?, ? FROM produtos
+        """, (versao, data_inicio, data_fim))
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    print(f" Carga de {quantidade} produtos: {time.perf_counter() - inicio:.1f}s")
+
+    for data in ("2024-06-01", "2025-06-01", "2026-06-01"):
+        inicio = time.perf_counter()
+        precos = precos_em(db, data)
+        print(f" precos_em({data}): {len(precos)} produtos em {time.perf_counter() - inicio:.3f}s")
+
+    ids = list(range(1, quantidade + 1, max(1, quantidade // 1000)))
+    inicio = time.perf_counter()
+    precos_em(db, "2025-06-01", ids)
+    print(f" precos_em para {len(ids)} ids: {time.perf_counter() - inicio:.4f}s")
+
+    inicio = time.perf_counter()
+    for produto_id in ids[:200]:
+        preco_em(db, produto_id, "2025-06-01")
+    print(f" preco_em (média): {(time.perf_counter() - inicio) / min(200, len(ids)) * 1000:.3f}ms")
+    db.limpar_banco()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Histórico de preços")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="Executa o benchmark com N produtos")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.benchmark)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ingestão em massa com múltiplos processos e um único escritor
+
+Arquitetura:
+    leitor (processo principal) -> fila_entrada -> N trabalhadores
+    (parse + validação) -> fila_lotes (limitada) -> 1 escritor
+
+O SQLite só aceita um escritor por vez, então apenas o processo escritor
+abre o DatabaseManager; ele agrupa vários lotes em uma única transação
+(group commit). As regras de validação são as mesmas das classes CRUD.
+
+Uso:
+    python ingestao.py dados.ndjson -w 4
+    python ingestao.py produtos.csv --tabela produtos
+    python ingestao.py --gerar 100000 dados.ndjson
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing as mp
+import os
+import queue
+import time
+
+from database import DatabaseManager
+from loja import Produto
+from cliente import ClienteCRUD
+from fornecedor import FornecedorCRUD
+from categorias import resolver_categoria
+
+COLUNAS = {
+    "produtos": ("nome", "preco", "tamanho", "estoque"),
+    "clientes": ("nome", "email", "telefone", "endereco"),
+    "fornecedores": ("nome", "cnpj", "email", "telefone", "endereco", "categoria"),
+}
+
+FIM = None  # Sentinela de fim de fila
+
+# Validadores reaproveitados dos CRUDs (não precisam de conexão)
+_clientes = ClienteCRUD(None)
+_fornecedores = FornecedorCRUD(None)
+
+
+def validar_produto(registro):
+    """Valida um produto; retorna (tupla, erro)"""
+    nome = str(registro.get("nome") or "").strip()
+    if not nome:
+        return None, "nome vazio"
+    try:
+        preco = float(registro.get("preco"))
+        estoque = int(registro.get("estoque") or 0)
+    except (TypeError, ValueError):
+        return None, "valores numéricos inválidos"
+    if preco < 0:
+        return None, "preço negativo"
+    if estoque < 0:
+        return None, "estoque negativo"
+    tamanho = str(registro.get("tamanho") or "").upper().strip()
+    if tamanho not in Produto.tamanhos_validos:
+        return None, "tamanho inválido"
+    return (nome, preco, tamanho, estoque), None
+
+
+def validar_cliente(registro):
+    """Valida um cliente; retorna (tupla, erro)"""
+    nome = str(registro.get("nome") or "").strip()
+    if not nome:
+        return None, "nome vazio"
+    email = str(registro.get("email") or "").strip().lower()
+    if not _clientes.validar_email(email):
+        return None, "email inválido"
+    telefone = str(registro.get("telefone") or "").strip()
+    endereco = str(registro.get("endereco") or "").strip()
+    return (nome, email, telefone, endereco), None
+
+
+def validar_fornecedor(registro):
+    """Valida um fornecedor; retorna (tupla, erro)"""
+    nome = str(registro.get("nome") or "").strip()
+    if not nome:
+        return None, "nome vazio"
+    cnpj = _fornecedores.validar_cnpj(str(registro.get("cnpj") or "").strip())
+    if not cnpj:
+        return None, "CNPJ inválido"
+    email = str(registro.get("email") or "").strip().lower()
+    if email and not _fornecedores.validar_email(email):
+        return None, "email inválido"
+    telefone = str(registro.get("telefone") or "").strip()
+    endereco = str(registro.get("endereco") or "").strip()
+    categoria = str(registro.get("categoria") or "").strip()
+    return (nome, cnpj, email, telefone, endereco, categoria), None
+
+
+VALIDADORES = {
+    "produtos": validar_produto,
+    "clientes": validar_cliente,
+    "fornecedores": validar_fornecedor,
+}
+
+
+def _tamanho_fila(fila):
+    """qsize() não existe em todas as plataformas"""
+    try:
+        return fila.qsize()
+    except NotImplementedError:
+        return -1
+
+
+def trabalhador(fila_entrada, fila_lotes, fila_resultados, tabela_padrao, tamanho_lote):
+    """Processo trabalhador: faz parse e validação e envia lotes prontos"""
+    stats = {"parse": 0.0, "validacao": 0.0, "espera_envio": 0.0,
+             "validos": 0, "rejeitados": {}}
+    lotes = {tabela: [] for tabela in COLUNAS}
+
+    def enviar(tabela):
+        inicio = time.perf_counter()
+        fila_lotes.put((tabela, lotes[tabela]))
+        stats["espera_envio"] += time.perf_counter() - inicio
+        lotes[tabela] = []
+
+    # O FIM e as métricas saem sempre: sem eles o escritor espera para sempre
+    fim = False
+    try:
+        while True:
+            bloco = fila_entrada.get()
+            if bloco is FIM:
+                fim = True
+                break
+            formato, linhas = bloco
+            for linha in linhas:
+                inicio = time.perf_counter()
+                try:
+                    if formato == "ndjson":
+                        registro = json.loads(linha)
+                    else:
+                        registro = linha
+                except ValueError:
+                    stats["parse"] += time.perf_counter() - inicio
+                    stats["rejeitados"]["JSON inválido"] = stats["rejeitados"].get("JSON inválido", 0) + 1
+                    continue
+                meio = time.perf_counter()
+                stats["parse"] += meio - inicio
+
+                if not isinstance(registro, dict):
+                    # JSON válido mas não é objeto: [1, 2], 5, "texto"
+                    tupla, erro = None, "registro inválido"
+                else:
+                    tabela = registro.get("tabela") or tabela_padrao
+                    validador = VALIDADORES.get(tabela)
+                    if validador is None:
+                        tupla, erro = None, "tabela desconhecida"
+                    else:
+                        tupla, erro = validador(registro)
+                stats["validacao"] += time.perf_counter() - meio
+
+                if erro:
+                    stats["rejeitados"][erro] = stats["rejeitados"].get(erro, 0) + 1
+                    continue
+                stats["validos"] += 1
+                lotes[tabela].append(tupla)
+                if len(lotes[tabela]) >= tamanho_lote:
+                    enviar(tabela)
+
+        for tabela in COLUNAS:
+            if lotes[tabela]:
+                enviar(tabela)
+    except Exception as e:
+        print(f" Erro no trabalhador {os.getpid()}: {e}")
+        # Continua esvaziando a entrada para o leitor não ficar preso na fila cheia
+        while not fim:
+            fim = fila_entrada.get() is FIM
+    finally:
+        fila_lotes.put(FIM)
+        fila_resultados.put(("trabalhador", os.getpid(), stats))
+
+
+def escritor(db_name, fila_lotes, fila_resultados, num_trabalhadores, linhas_por_commit):
+    """Processo escritor: único dono da conexão, faz group commit"""
+    stats = {"escrita": 0.0, "commit": 0.0, "espera_fila": 0.0, "inseridos": 0,
+             "duplicados": 0, "commits": 0, "lotes": 0,
+             "fila_max": 0, "fila_soma": 0, "fila_amostras": 0}
+    db = DatabaseManager(db_name)
+    conn = db.conectar()
+    if not conn:
+        fila_resultados.put(("escritor", os.getpid(), stats))
+        return
+
+    colunas = dict(COLUNAS, fornecedores=COLUNAS["fornecedores"] + ("categoria_id",))
+    queries = {
+        tabela: (f"INSERT OR IGNORE INTO {tabela} ({', '.join(cols)}) "
+                 f"VALUES ({', '.join('?' * len(cols))})")
+        for tabela, cols in colunas.items()
+    }
+    categorias = {}
+    pendentes = 0
+    finalizados = 0
+    try:
+        while finalizados < num_trabalhadores:
+            profundidade = _tamanho_fila(fila_lotes)
+            if profundidade >= 0:
+                stats["fila_max"] = max(stats["fila_max"], profundidade)
+                stats["fila_soma"] += profundidade
+                stats["fila_amostras"] += 1
+
+            inicio = time.perf_counter()
+            item = fila_lotes.get()
+            stats["espera_fila"] += time.perf_counter() - inicio
+            if item is FIM:
+                finalizados += 1
+                continue
+
+            tabela, linhas = item
+            inicio = time.perf_counter()
+            if tabela == "fornecedores":
+                # Categoria normalizada: resolvida aqui porque só o escritor grava
+                resolvidas = []
+                for linha in linhas:
+                    categoria_id, categoria = resolver_categoria(conn, linha[5], categorias)
+                    resolvidas.append(linha[:5] + (categoria, categoria_id))
+                linhas = resolvidas
+            # rowcount não inclui as linhas gravadas pelos triggers (CDC, histórico)
+            inseridos = max(conn.executemany(queries[tabela], linhas).rowcount, 0)
+            stats["escrita"] += time.perf_counter() - inicio
+            stats["inseridos"] += inseridos
+            stats["duplicados"] += len(linhas) - inseridos
+            stats["lotes"] += 1
+            pendentes += len(linhas)
+
+            if pendentes >= linhas_por_commit:
+                inicio = time.perf_counter()
+                conn.commit()
+                stats["commit"] += time.perf_counter() - inicio
+                stats["commits"] += 1
+                pendentes = 0
+
+        inicio = time.perf_counter()
+        conn.commit()
+        stats["commit"] += time.perf_counter() - inicio
+        stats["commits"] += 1
+    except Exception as e:
+        print(f" Erro no escritor: {e}")
+        # Consome o resto para os trabalhadores não ficarem presos na fila cheia
+        while finalizados < num_trabalhadores:
+            if fila_lotes.get() is FIM:
+                finalizados += 1
+    finally:
+        db.desconectar()
+        fila_resultados.put(("escritor", os.getpid(), stats))
+
+
+def ler_blocos(caminho, tabela, tamanho_bloco):
+    """Lê o arquivo de entrada em blocos de linhas"""
+    if caminho.lower().endswith(".csv"):
+        with open(caminho, newline='', encoding='utf-8') as arquivo:
+            bloco = []
+            for linha in csv.DictReader(arquivo):
+                bloco.append(linha)
+                if len(bloco) >= tamanho_bloco:
+                    yield ("csv", bloco)
+                    bloco = []
+            if bloco:
+                yield ("csv", bloco)
+    else:
+        with open(caminho, encoding='utf-8') as arquivo:
+            bloco = []
+            for linha in arquivo:
+                if linha.strip():
+                    bloco.append(linha)
+                if len(bloco) >= tamanho_bloco:
+                    yield ("ndjson", bloco)
+                    bloco = []
+            if bloco:
+                yield ("ndjson", bloco)
+
+
+def ingerir(caminho, db_name="sistema_comercial.db", num_trabalhadores=None, tabela=None,
+            tamanho_lote=1000, linhas_por_commit=20000, tamanho_fila=64):
+    """Executa o pipeline completo e retorna as métricas consolidadas"""
+    num_trabalhadores = num_trabalhadores or os.cpu_count() or 1
+    if caminho.lower().endswith(".csv") and tabela not in COLUNAS:
+        print(" Para arquivos CSV informe --tabela (produtos, clientes ou fornecedores).")
+        return None
+
+    fila_entrada = mp.Queue(maxsize=num_trabalhadores * 4)
+    fila_lotes = mp.Queue(maxsize=tamanho_fila)
+    fila_resultados = mp.Queue()
+
+    proc_escritor = mp.Process(target=escritor, args=(
+        db_name, fila_lotes, fila_resultados, num_trabalhadores, linhas_por_commit))
+    procs = [mp.Process(target=trabalhador, args=(
+        fila_entrada, fila_lotes, fila_resultados, tabela, tamanho_lote))
+        for _ in range(num_trabalhadores)]
+
+    inicio = time.perf_counter()
+    proc_escritor.start()
+    for proc in procs:
+        proc.start()
+
+    leitura = 0.0
+    espera_entrada = 0.0
+    lidos = 0
+    t0 = time.perf_counter()
+    for bloco in ler_blocos(caminho, tabela, tamanho_lote):
+        t1 = time.perf_counter()
+        leitura += t1 - t0
+        fila_entrada.put(bloco)
+        t0 = time.perf_counter()
+        espera_entrada += t0 - t1
+        lidos += len(bloco[1])
+    for _ in procs:
+        fila_entrada.put(FIM)
+
+    resultados = []
+    for _ in range(num_trabalhadores + 1):
+        try:
+            resultados.append(fila_resultados.get(timeout=3600))
+        except queue.Empty:
+            break
+    for proc in procs:
+        proc.join()
+    proc_escritor.join()
+    total = time.perf_counter() - inicio
+
+    metricas = {
+        "registros_lidos": lidos,
+        "tempo_total": total,
+        "leitura": leitura,
+        "espera_fila_entrada": espera_entrada,
+        "trabalhadores": num_trabalhadores,
+        "parse": 0.0, "validacao": 0.0, "espera_envio": 0.0,
+        "validos": 0, "rejeitados": {},
+    }
+    for papel, _pid, stats in resultados:
+        if papel == "trabalhador":
+            for chave in ("parse", "validacao", "espera_envio", "validos"):
+                metricas[chave] += stats[chave]
+            for motivo, qtd in stats["rejeitados"].items():
+                metricas["rejeitados"][motivo] = metricas["rejeitados"].get(motivo, 0) + qtd
+        else:
+            metricas["escritor"] = stats
+    return metricas
+
+
+def imprimir_relatorio(metricas):
+    """Mostra o relatório de throughput e tempo por estágio"""
+    escritor_stats = metricas.get("escritor", {})
+    total = metricas["tempo_total"] or 1e-9
+    n = metricas["trabalhadores"]
+
+    print("\n RELATÓRIO DE INGESTÃO")
+    print("=" * 50)
+    print(f" Registros lidos   : {metricas['registros_lidos']}")
+    print(f" Válidos           : {metricas['validos']}")
+    print(f" Inseridos         : {escritor_stats.get('inseridos', 0)}")
+    print(f" Duplicados        : {escritor_stats.get('duplicados', 0)}")
+    for motivo, qtd in sorted(metricas["rejeitados"].items()):
+        print(f" Rejeitado ({motivo}): {qtd}")
+    print(f" Tempo total       : {total:.2f}s")
+    print(f" Throughput        : {metricas['registros_lidos'] / total:,.0f} registros/s")
+
+    print("\n Tempo por estágio (s)")
+    print("-" * 50)
+    print(f" Leitura (principal)       : {metricas['leitura']:.2f}")
+    print(f" Espera fila de entrada    : {metricas['espera_fila_entrada']:.2f}")
+    print(f" Parse (soma {n} proc.)     : {metricas['parse']:.2f}")
+    print(f" Validação (soma {n} proc.) : {metricas['validacao']:.2f}")
+    print(f" Espera envio de lotes     : {metricas['espera_envio']:.2f}")
+    print(f" Escritor - espera na fila : {escritor_stats.get('espera_fila', 0):.2f}")
+    print(f" Escritor - inserts        : {escritor_stats.get('escrita', 0):.2f}")
+    print(f" Escritor - commits ({escritor_stats.get('commits', 0)})   : {escritor_stats.get('commit', 0):.2f}")
+
+    amostras = escritor_stats.get("fila_amostras", 0)
+    if amostras:
+        print("\n Fila de lotes")
+        print("-" * 50)
+        print(f" Profundidade média : {escritor_stats['fila_soma'] / amostras:.1f}")
+        print(f" Profundidade máxima: {escritor_stats['fila_max']}")
+    # Escritor quase sem espera e fila cheia = escritor saturado;
+    # escritor esperando muito = adicione trabalhadores.
+    ocupacao = (escritor_stats.get('escrita', 0) + escritor_stats.get('commit', 0)) / total
+    print(f" Ocupação do escritor: {ocupacao:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestão em massa para o sistema comercial")
+    parser.add_argument("arquivo", help="Arquivo NDJSON ou CSV")
+    parser.add_argument("--banco", default="sistema_comercial.db")
+    parser.add_argument("-w", "--trabalhadores", type=int, default=None)
+    parser.add_argument("--tabela", choices=list(COLUNAS), help="Tabela de destino (obrigatória para CSV)")
+    parser.add_argument("--lote", type=int, default=1000, help="Registros por lote enviado ao escritor")
+    parser.add_argument("--commit", type=int, default=20000, help="Registros por transação")
+    parser.add_argument("--fila", type=int, default=64, help="Capacidade da fila de lotes")
+    parser.add_argument("--gerar", type=int, metavar="N", help="Gera N registros de exemplo no arquivo e sai")
+    args = parser.parse_args()
+
+    if args.gerar:
+        from dados_exemplo import escrever_ndjson
+        escrever_ndjson(args.arquivo, args.gerar)
+        return
+
+    DatabaseManager(args.banco).criar_tabelas()
+    metricas = ingerir(args.arquivo, args.banco, args.trabalhadores, args.tabela,
+                       args.lote, args.commit, args.fila)
+    if metricas:
+        imprimir_relatorio(metricas)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,17 @@
 CRUD para Loja de Roupas
 """
 
+from historico_precos import historico_produto, preco_em
+from exclusao_em_massa import excluir_em_blocos, imprimir_progresso, pedir_filtro_data
+from autocompletar import IndiceAutocompletar
+from concorrencia import atualizar_com_versao, avisar_conflito
+from alertas_estoque import VigiaEstoque, imprimir_alertas
+from compras import (vincular_fornecedor, desvincular_fornecedor, fornecedores_do_produto,
+                     sugestao_compras, imprimir_sugestao)
+from arquivamento import buscar_incluindo_arquivo
+from alteracao_em_massa import (montar_filtro, alteracao_de_preco, alteracao_de_estoque, previa,
+                                imprimir_previa, aplicar, imprimir_progresso as progresso_alteracao)
+
 class Produto:
     tamanhos_validos = ["P", "M", "G", "GG"]
     
@@ -20,6 +31,8 @@ class Produto:
 class LojaCRUD:
     def __init__(self, db_manager):
         self.db = db_manager
+        self.autocompletar = IndiceAutocompletar(db_manager)  # carregado só no primeiro uso
+        self.vigia_estoque = VigiaEstoque(db_manager)
     
     def adicionar_produto(self):
         """Adiciona um novo produto"""
@@ -47,13 +60,19 @@ class LojaCRUD:
                 print(" Estoque não pode ser negativo.")
                 return
             
+            estoque_minimo = int(input("Estoque mínimo para alerta (Enter = sem alerta): ").strip() or 0)
+            if estoque_minimo < 0:
+                print(" Estoque mínimo não pode ser negativo.")
+                return
+            
             query = """
-            INSERT INTO produtos (nome, preco, tamanho, estoque)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO produtos (nome, preco, tamanho, estoque, estoque_minimo)
+            VALUES (?, ?, ?, ?, ?)
             """
-            resultado = self.db.executar_query(query, (nome, preco, tamanho, estoque))
+            resultado = self.db.executar_query(query, (nome, preco, tamanho, estoque, estoque_minimo))
             
             if resultado:
+                self.autocompletar.sincronizar_novos()
                 print(" Produto adicionado com sucesso!")
             else:
                 print(" Erro ao adicionar produto.")
@@ -65,7 +84,7 @@ class LojaCRUD:
     
     def listar_produtos(self):
         """Lista todos os produtos"""
-        query = "SELECT * FROM produtos ORDER BY nome"
+        query = "SELECT * FROM produtos ORDER BY nome_ordenacao, nome"
         produtos = self.db.executar_query(query)
         
         if not produtos:
@@ -102,13 +121,19 @@ class LojaCRUD:
         query = """
         SELECT * FROM produtos 
         WHERE nome LIKE ? 
-        ORDER BY nome
+        ORDER BY nome_ordenacao, nome
         """
         produtos = self.db.executar_query(query, (f"%{termo}%",))
         
         if not produtos:
             print(" Nenhum produto encontrado.")
-            return
+            # O arquivo frio só é aberto a pedido
+            if input("Procurar também nos produtos arquivados? (s/N): ").strip().lower() != 's':
+                return
+            produtos = buscar_incluindo_arquivo(self.db, "produtos", termo)
+            if not produtos:
+                print(" Nenhum produto arquivado encontrado.")
+                return
         
         print(f"\n Resultados da busca por '{termo}':")
         print("-" * 80)
@@ -116,8 +141,9 @@ class LojaCRUD:
         print("-" * 80)
         
         for produto in produtos:
+            arquivado = " (arquivado)" if 'arquivado' in produto.keys() and produto['arquivado'] else ""
             print(f"{produto['id']:<3} {produto['nome']:<25} {produto['preco']:<25} "
-                  f"{produto['tamanho']:<15} {produto['estoque']:<25}")
+                  f"{produto['tamanho']:<15} {produto['estoque']:<15}{arquivado}")
     
     def atualizar_produto(self):
         """Atualiza um produto existente"""
@@ -139,64 +165,92 @@ class LojaCRUD:
                 print("2. Preço")
                 print("3. Tamanho")
                 print("4. Estoque")
-                print("5. Voltar")
+                print("5. Estoque mínimo (alerta)")
+                print("6. Descontinuar/reativar")
+                print("7. Voltar")
                 
                 escolha = input("Opção: ").strip()
                 
                 if escolha == '1':
                     novo_nome = input("Novo nome: ").strip()
                     if novo_nome:
-                        query = "UPDATE produtos SET nome = ? WHERE id = ?"
-                        self.db.executar_query(query, (novo_nome, produto_id))
-                        produto = dict(produto)
-                        produto['nome'] = novo_nome
-                        print(" Nome atualizado!")
+                        campos, mensagem = {'nome': novo_nome}, " Nome atualizado!"
                     else:
                         print(" Nome não pode estar vazio.")
+                        continue
                 
                 elif escolha == '2':
                     try:
                         novo_preco = float(input("Novo preço: R$"))
-                        if novo_preco >= 0:
-                            query = "UPDATE produtos SET preco = ? WHERE id = ?"
-                            self.db.executar_query(query, (novo_preco, produto_id))
-                            produto = dict(produto)
-                            produto['preco'] = novo_preco
-                            print(" Preço atualizado!")
-                        else:
-                            print(" Preço não pode ser negativo.")
                     except ValueError:
                         print(" Preço inválido.")
+                        continue
+                    if novo_preco >= 0:
+                        campos, mensagem = {'preco': novo_preco}, " Preço atualizado!"
+                    else:
+                        print(" Preço não pode ser negativo.")
+                        continue
                 
                 elif escolha == '3':
                     novo_tamanho = input("Novo tamanho (P, M, G, GG): ").upper().strip()
                     if novo_tamanho in Produto.tamanhos_validos:
-                        query = "UPDATE produtos SET tamanho = ? WHERE id = ?"
-                        self.db.executar_query(query, (novo_tamanho, produto_id))
-                        produto = dict(produto)
-                        produto['tamanho'] = novo_tamanho
-                        print(" Tamanho atualizado!")
+                        campos, mensagem = {'tamanho': novo_tamanho}, " Tamanho atualizado!"
                     else:
                         print(" Tamanho inválido.")
+                        continue
                 
                 elif escolha == '4':
                     try:
                         novo_estoque = int(input("Novo estoque: "))
-                        if novo_estoque >= 0:
-                            query = "UPDATE produtos SET estoque = ? WHERE id = ?"
-                            self.db.executar_query(query, (novo_estoque, produto_id))
-                            produto = dict(produto)
-                            produto['estoque'] = novo_estoque
-                            print(" Estoque atualizado!")
-                        else:
-                            print(" Estoque não pode ser negativo.")
                     except ValueError:
                         print(" Estoque inválido.")
+                        continue
+                    if novo_estoque >= 0:
+                        campos, mensagem = {'estoque': novo_estoque}, " Estoque atualizado!"
+                    else:
+                        print(" Estoque não pode ser negativo.")
+                        continue
                 
                 elif escolha == '5':
+                    try:
+                        novo_minimo = int(input(f"Novo estoque mínimo (atual {produto['estoque_minimo']}, 0 = sem alerta): "))
+                    except ValueError:
+                        print(" Estoque mínimo inválido.")
+                        continue
+                    if novo_minimo >= 0:
+                        campos, mensagem = {'estoque_minimo': novo_minimo}, " Estoque mínimo atualizado!"
+                    else:
+                        print(" Estoque mínimo não pode ser negativo.")
+                        continue
+                
+                elif escolha == '6':
+                    # Descontinuados vão para o arquivo frio no próximo arquivamento
+                    if produto['ativo']:
+                        campos, mensagem = {'ativo': 0}, " Produto descontinuado (será arquivado)."
+                    else:
+                        campos, mensagem = {'ativo': 1}, " Produto reativado!"
+                
+                elif escolha == '7':
                     break
                 else:
                     print(" Opção inválida.")
+                    continue
+                
+                # Grava só se ninguém alterou o produto desde que foi aberto
+                situacao, produto = atualizar_com_versao(self.db, "produtos", produto, campos)
+                if situacao == "ok":
+                    print(mensagem)
+                    if 'nome' in campos:
+                        self.autocompletar.sincronizar(produto_id)
+                    elif 'estoque' in campos:
+                        self.autocompletar.atualizar_estoque(produto_id, campos['estoque'])
+                elif situacao == "conflito":
+                    avisar_conflito(produto, ("nome", "preco", "tamanho", "estoque"))
+                    self.autocompletar.sincronizar(produto_id)
+                elif situacao == "excluido":
+                    print(" Produto foi excluído por outro usuário.")
+                    self.autocompletar.remover(produto_id)
+                    break
                     
         except ValueError:
             print(" ID inválido.")
@@ -223,6 +277,7 @@ class LojaCRUD:
                 resultado = self.db.executar_query(query, (produto_id,))
                 
                 if resultado:
+                    self.autocompletar.remover(produto_id)
                     print(f" Produto '{produto['nome']}' excluído com sucesso!")
                 else:
                     print(" Erro ao excluir produto.")
@@ -242,22 +297,286 @@ class LojaCRUD:
                 print(" Operação cancelada.")
                 return
 
-            query = "DELETE FROM produtos"
-            resultado = self.db.executar_query(query)
+            resultado = excluir_em_blocos(self.db, "produtos", progresso=imprimir_progresso)
+            self.autocompletar.invalidar()
 
-            if resultado is not None:
-                print(" Todos os produtos foram excluídos com sucesso!")
+            if resultado:
+                print(f" Todos os produtos foram excluídos com sucesso! ({resultado})")
             else:
                 print(" Nenhum produto foi excluído (ou tabela já está vazia).")
         
         except Exception as e:
             print(f" Erro inesperado ao excluir todos os produtos: {e}")
+    
+    def excluir_por_filtro(self):
+        """Exclui em massa os produtos de um tamanho ou cadastrados antes de uma data"""
+        try:
+            print("\nExcluir produtos por:")
+            print("1. Data de cadastro")
+            print("2. Tamanho")
+            escolha = input("Opção: ").strip()
+            
+            if escolha == '1':
+                filtro, params = pedir_filtro_data()
+            elif escolha == '2':
+                tamanho = input("Tamanho (P, M, G, GG): ").upper().strip()
+                if tamanho not in Produto.tamanhos_validos:
+                    print(" Tamanho inválido.")
+                    return
+                filtro, params = "tamanho = ?", (tamanho,)
+            else:
+                print(" Opção inválida.")
+                return
+            if not filtro:
+                return
+            
+            confirmacao = input("Confirma a exclusão? (s/N): ").strip().lower()
+            if confirmacao != 's':
+                print(" Operação cancelada.")
+                return
+            
+            resultado = excluir_em_blocos(self.db, "produtos", filtro, params, progresso=imprimir_progresso)
+            self.autocompletar.invalidar()
+            if resultado is not None:
+                print(f" {resultado} produto(s) excluído(s).")
+        
+        except Exception as e:
+            print(f" Erro inesperado: {e}")
 
 
     
+    def ver_historico_precos(self):
+        """Mostra o histórico de preços de um produto e o preço em uma data"""
+        if not self.listar_produtos():
+            return
+        
+        try:
+            produto_id = int(input("\nID do produto: "))
+            produto = self.buscar_produto_por_id(produto_id)
+            
+            if not produto:
+                print(" Produto não encontrado.")
+                return
+            
+            print(f"\n Histórico de preços: {produto['nome']}")
+            print("-" * 60)
+            print(f"{'Preço':<12} {'Desde':<25} {'Até':<25}")
+            print("-" * 60)
+            for versao in historico_produto(self.db, produto_id):
+                print(f"R${versao['preco']:<10.2f} {versao['valid_from']:<25} {versao['valid_to'] or 'atual':<25}")
+            
+            data = input("\nConsultar preço em uma data (AAAA-MM-DD, Enter para pular): ").strip()
+            if data:
+                preco = preco_em(self.db, produto_id, data)
+                if preco is None:
+                    print(" Produto ainda não estava cadastrado nessa data.")
+                else:
+                    print(f" Preço em {data}: R${preco:.2f}")
+                    
+        except ValueError:
+            print(" ID inválido.")
+        except Exception as e:
+            print(f" Erro inesperado: {e}")
+    
+    def sugerir_produtos(self):
+        """Sugestões enquanto o nome é digitado (maior estoque primeiro)"""
+        print("\n Digite o começo do nome (Enter vazio para sair)")
+        while True:
+            prefixo = input("Produto: ").strip()
+            if not prefixo:
+                break
+            
+            sugestoes = self.autocompletar.sugerir(prefixo)
+            if not sugestoes:
+                print(" Nenhum produto começa com esse nome.")
+                continue
+            
+            print(f"{'ID':<6} {'Nome':<35} {'Estoque':<8}")
+            for produto in sugestoes:
+                print(f"{produto['id']:<6} {produto['nome']:<35} {produto['estoque']:<8}")
+    
+    def relatorio_estoque_baixo(self):
+        """Produtos abaixo do ponto de reposição (lidos do índice parcial)"""
+        query = """
+        SELECT id, nome, tamanho, estoque, estoque_minimo FROM produtos
+        WHERE estoque < estoque_minimo
+        ORDER BY estoque
+        """
+        produtos = self.db.executar_query(query)
+        if produtos is None:
+            return
+        if not produtos:
+            print(" Nenhum produto abaixo do estoque mínimo.")
+            return
+        
+        print(f"\n Produtos abaixo do estoque mínimo ({len(produtos)}):")
+        print("-" * 70)
+        print(f"{'ID':<6} {'Nome':<30} {'Tamanho':<8} {'Estoque':<8} {'Mínimo':<8} {'Repor':<6}")
+        print("-" * 70)
+        for produto in produtos:
+            print(f"{produto['id']:<6} {produto['nome'][:30]:<30} {produto['tamanho']:<8} "
+                  f"{produto['estoque']:<8} {produto['estoque_minimo']:<8} "
+                  f"{produto['estoque_minimo'] - produto['estoque']:<6}")
+    
+    def relatorio_valor_estoque(self):
+        """Os 50 produtos de maior valor em estoque (preço x quantidade) de cada tamanho"""
+        query = """
+        SELECT id, nome, preco, estoque, preco * estoque AS valor FROM produtos
+        WHERE tamanho = ? AND estoque > 0
+        ORDER BY valor DESC LIMIT 50
+        """
+        for tamanho in Produto.tamanhos_validos:
+            produtos = self.db.executar_query(query, (tamanho,))
+            if not produtos:
+                continue
+            print(f"\n Tamanho {tamanho}: maiores valores em estoque")
+            print("-" * 70)
+            print(f"{'ID':<6} {'Nome':<30} {'Preço':<10} {'Estoque':<8} {'Valor':<12}")
+            print("-" * 70)
+            for produto in produtos:
+                print(f"{produto['id']:<6} {produto['nome'][:30]:<30} R${produto['preco']:<8.2f} "
+                      f"{produto['estoque']:<8} R${produto['valor']:<10.2f}")
+    
+    def relatorios_estoque(self):
+        """Submenu dos relatórios de estoque"""
+        print("\n1. Produtos abaixo do estoque mínimo")
+        print("2. Top 50 por valor em estoque, por tamanho")
+        print("3. Sugestão de compras por fornecedor")
+        escolha = input("Opção: ").strip()
+        if escolha == '1':
+            self.relatorio_estoque_baixo()
+        elif escolha == '2':
+            self.relatorio_valor_estoque()
+        elif escolha == '3':
+            imprimir_sugestao(*sugestao_compras(self.db))
+        else:
+            print(" Opção inválida.")
+    
+    def gerenciar_fornecedores_produto(self):
+        """Lista, vincula e desvincula os fornecedores de um produto"""
+        try:
+            produto_id = int(input("\nID do produto: "))
+            produto = self.buscar_produto_por_id(produto_id)
+            if not produto:
+                print(" Produto não encontrado.")
+                return
+            
+            while True:
+                ligacoes = fornecedores_do_produto(self.db, produto_id)
+                print(f"\n Fornecedores de {produto['nome']}:")
+                print("-" * 70)
+                if not ligacoes:
+                    print(" Nenhum fornecedor vinculado.")
+                for ligacao in ligacoes:
+                    custo = f"R${ligacao['preco_custo']:.2f}" if ligacao['preco_custo'] is not None else "-"
+                    prazo = f"{ligacao['prazo_dias']} dias" if ligacao['prazo_dias'] is not None else "-"
+                    marca = " (preferencial)" if ligacao['preferencial'] else ""
+                    print(f"{ligacao['fornecedor_id']:<6} {ligacao['fornecedor'] or '?':<30} "
+                          f"{custo:<11} {prazo:<9}{marca}")
+                print("-" * 70)
+                print("1. Vincular/atualizar fornecedor")
+                print("2. Desvincular fornecedor")
+                print("3. Voltar")
+                escolha = input("Opção: ").strip()
+                
+                if escolha == '1':
+                    try:
+                        fornecedor_id = int(input("ID do fornecedor: "))
+                        custo = input("Preço de custo (Enter = não informado): R$").strip()
+                        prazo = input("Prazo de entrega em dias (Enter = não informado): ").strip()
+                        preco_custo = float(custo) if custo else None
+                        prazo_dias = int(prazo) if prazo else None
+                    except ValueError:
+                        print(" Valor inválido.")
+                        continue
+                    preferencial = input("Fornecedor preferencial? (s/N): ").strip().lower() == 's'
+                    if vincular_fornecedor(self.db, produto_id, fornecedor_id, preco_custo, prazo_dias, preferencial):
+                        print(" Fornecedor vinculado!")
+                elif escolha == '2':
+                    try:
+                        fornecedor_id = int(input("ID do fornecedor: "))
+                    except ValueError:
+                        print(" ID inválido.")
+                        continue
+                    if desvincular_fornecedor(self.db, produto_id, fornecedor_id):
+                        print(" Fornecedor desvinculado!")
+                    else:
+                        print(" Esse fornecedor não está vinculado ao produto.")
+                elif escolha == '3':
+                    break
+                else:
+                    print(" Opção inválida.")
+        
+        except ValueError:
+            print(" ID inválido.")
+        except Exception as e:
+            print(f" Erro inesperado: {e}")
+    
+    def alterar_em_massa(self):
+        """Reajuste de preço ou acerto de estoque de todos os produtos de um filtro"""
+        try:
+            print("\nFiltro (Enter deixa a condição de fora):")
+            tamanho = input("Tamanho (P, M, G, GG): ").upper().strip() or None
+            if tamanho and tamanho not in Produto.tamanhos_validos:
+                print(" Tamanho inválido.")
+                return
+            prefixo = input("Começo do nome: ").strip() or None
+            try:
+                texto = input("Preço mínimo: R$").strip()
+                preco_min = float(texto) if texto else None
+                texto = input("Preço máximo: R$").strip()
+                preco_max = float(texto) if texto else None
+            except ValueError:
+                print(" Preço inválido.")
+                return
+            
+            print("\nAlteração:")
+            print("1. Reajuste de preço em %")
+            print("2. Reajuste de preço em R$")
+            print("3. Ajuste de estoque (+/-)")
+            escolha = input("Opção: ").strip()
+            try:
+                if escolha == '1':
+                    alteracao = alteracao_de_preco(percentual=float(input("Percentual (ex.: 10 ou -15): ")))
+                elif escolha == '2':
+                    alteracao = alteracao_de_preco(valor=float(input("Valor a somar (negativo desconta): R$")))
+                elif escolha == '3':
+                    alteracao = alteracao_de_estoque(int(input("Quantidade a somar (negativo baixa): ")))
+                else:
+                    print(" Opção inválida.")
+                    return
+            except ValueError:
+                print(" Valor inválido.")
+                return
+            
+            filtro, params = montar_filtro(tamanho, prefixo, preco_min, preco_max)
+            resultado = previa(self.db, filtro, params, alteracao)
+            if resultado is None:
+                return
+            imprimir_previa(resultado)
+            if not resultado["produtos"][0]:
+                return
+            
+            confirmacao = input("\nConfirma a alteração? (s/N): ").strip().lower()
+            if confirmacao != 's':
+                print(" Operação cancelada.")
+                return
+            
+            alterados, _ = aplicar(self.db, filtro, params, alteracao, progresso=progresso_alteracao)
+            if 'estoque' in alteracao:
+                self.autocompletar.invalidar()
+            if alterados is not None:
+                print(f" {alterados} produto(s) alterado(s).")
+        
+        except Exception as e:
+            print(f" Erro inesperado: {e}")
+    
     def menu(self):
         """Menu principal da loja"""
         while True:
+            # Só os produtos que cruzaram o mínimo desde a última vez
+            imprimir_alertas(self.vigia_estoque.verificar())
+            
             print("\n" + "="*40)
             print(" GERENCIAMENTO LOJA DE ROUPAS")
             print("="*40)
@@ -267,7 +586,13 @@ class LojaCRUD:
             print("4. Atualizar produto")
             print("5. Excluir produto")
             print("6. Excluir TODOS os produtos")
-            print("7. Voltar ao menu principal")
+            print("7. Excluir produtos por filtro")
+            print("8. Histórico de preços")
+            print("9. Sugerir produtos pelo começo do nome")
+            print("10. Relatórios de estoque")
+            print("11. Fornecedores do produto")
+            print("12. Reajuste de preços / estoque em massa")
+            print("13. Voltar ao menu principal")
             print("="*40)
             
             opcao = input("Escolha uma opção: ").strip()
@@ -285,6 +610,18 @@ class LojaCRUD:
             elif opcao == '6':
                 self.excluir_todos()
             elif opcao == '7':
+                self.excluir_por_filtro()
+            elif opcao == '8':
+                self.ver_historico_precos()
+            elif opcao == '9':
+                self.sugerir_produtos()
+            elif opcao == '10':
+                self.relatorios_estoque()
+            elif opcao == '11':
+                self.gerenciar_fornecedores_produto()
+            elif opcao == '12':
+                self.alterar_em_massa()
+            elif opcao == '13':
                 break
             else:
                 print(" Opção inválida. Tente novamente.")
@@ -5,21 +5,67 @@ Sistema de Gerenciamento - Arquivo Principal
 Gerencia Loja de Roupas, Clientes e Fornecedores
 """
 
+import argparse
+import importlib
+
 from database import DatabaseManager
-from loja import LojaCRUD
-from cliente import ClienteCRUD
-from fornecedor import FornecedorCRUD
+from sharding import carregar_mapa_padrao
+from manutencao import AgendadorManutencao
+
+# Os CRUDs (e o que eles importam) só são carregados quando o menu
+# correspondente é aberto pela primeira vez
+MENUS = {
+    '1': ("loja", "LojaCRUD"),
+    '2': ("cliente", "ClienteCRUD"),
+    '3': ("fornecedor", "FornecedorCRUD"),
+}
 
-def menu_principal():
+def menu_principal(em_memoria=False, janela_duravel=5.0, captura=None, redigir=False,
+                   metricas_porta=None, metricas_arquivo=None):
     """Menu principal do sistema"""
     # Inicializar banco de dados
-    db = DatabaseManager()
-    db.criar_tabelas()
+    if em_memoria:
+        db = DatabaseManager(em_memoria=True, janela_duravel=janela_duravel)
+    else:
+        db = DatabaseManager(mapa_shards=carregar_mapa_padrao())
+    if captura:
+        db.iniciar_captura(captura, redigir)
+    
+    # Métricas para o supervisor (Prometheus)
+    exportadores = []
+    if metricas_porta or metricas_arquivo:
+        from metricas import ServidorMetricas, ExportadorTextfile
+    if metricas_porta:
+        exportadores.append(ServidorMetricas(db.ativar_metricas(), metricas_porta))
+    if metricas_arquivo:
+        exportadores.append(ExportadorTextfile(db.ativar_metricas(), metricas_arquivo))
+    for exportador in exportadores:
+        exportador.start()
+    
+    try:
+        executar_menu(db)
+    finally:
+        for exportador in exportadores:
+            exportador.parar()
+        # No modo em memória grava no arquivo o que ainda não foi persistido
+        db.fechar()
+
+def abrir_crud(db, cruds, opcao):
+    """Cria o CRUD de um menu na primeira vez que ele é usado"""
+    if opcao not in cruds:
+        modulo, classe = MENUS[opcao]
+        cruds[opcao] = getattr(importlib.import_module(modulo), classe)(db)
+    return cruds[opcao]
+
+def executar_menu(db):
+    """Cria as tabelas (se o schema mudou), inicia a manutenção e mostra o menu"""
+    db.preparar_banco()
+    
+    # Manutenção em segundo plano (otimização, vacuum, checkpoint, backup)
+    manutencao = AgendadorManutencao(db)
+    manutencao.start()
     
-    # Inicializar CRUDs
-    loja = LojaCRUD(db)
-    cliente = ClienteCRUD(db)
-    fornecedor = FornecedorCRUD(db)
+    cruds = {}
     
     while True:
         print("\n" + "="*50)
@@ -33,21 +79,33 @@ def menu_principal():
         
         opcao = input("Escolha uma opção: ").strip()
         
-        if opcao == '1':
-            loja.menu()
-        elif opcao == '2':
-            cliente.menu()
-        elif opcao == '3':
-            fornecedor.menu()
+        if opcao in MENUS:
+            abrir_crud(db, cruds, opcao).menu()
         elif opcao == '4':
             print(" Encerrando o sistema...")
+            manutencao.parar()
             break
         else:
             print(" Opção inválida. Tente novamente.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sistema de gerenciamento comercial")
+    parser.add_argument("--memoria", action="store_true",
+                        help="serve tudo de um banco em memória e grava no arquivo em segundo plano")
+    parser.add_argument("--janela", type=float, default=5.0,
+                        help="segundos entre gravações no modo em memória (0: só ao sair)")
+    parser.add_argument("--capturar", metavar="ARQUIVO",
+                        help="grava as queries em NDJSON para reproduzir com captura_carga.py")
+    parser.add_argument("--redigir", action="store_true",
+                        help="troca nomes, emails, telefones, endereços e CNPJs capturados por pseudônimos")
+    parser.add_argument("--metricas-porta", type=int, metavar="PORTA",
+                        help="expõe métricas do Prometheus em http://127.0.0.1:PORTA/metrics")
+    parser.add_argument("--metricas-arquivo", metavar="ARQUIVO",
+                        help="escreve as métricas em um arquivo .prom para o node_exporter")
+    args = parser.parse_args()
     try:
-        menu_principal()
+        menu_principal(args.memoria, args.janela, args.capturar, args.redigir,
+                       args.metricas_porta, args.metricas_arquivo)
     except KeyboardInterrupt:
         print("\n\n Sistema encerrado pelo usuário.")
     except Exception as e:
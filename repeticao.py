@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Novas tentativas quando o banco está ocupado (SQLITE_BUSY / SQLITE_LOCKED)
+
+O visualizador, as exportações e o sistema abrem o mesmo arquivo. Quem
+chega enquanto outro grava espera primeiro no busy_timeout da conexão
+(DatabaseManager(busy_timeout_ms=...)); se mesmo assim o banco continuar
+ocupado, o comando inteiro é refeito depois de uma espera exponencial com
+jitter ("full jitter": sorteada entre 0 e base * 2^tentativa, até
+`maximo`), para os processos que desistiram juntos não voltarem juntos.
+
+Só erros transitórios são repetidos. Violação de UNIQUE, NOT NULL, CHECK
+e erros de SQL falham na hora: repetir não muda o resultado.
+
+Escritas rodam em BEGIN IMMEDIATE: o lock de escrita é pedido no começo
+da transação, então duas conexões nunca ficam as duas com lock de leitura
+esperando uma pela outra para escrever (o SQLite devolve BUSY na hora
+nesse caso, sem usar o busy_timeout). Dentro do mesmo processo as
+escritas entram em fila numa trava, em vez de disputarem o arquivo.
+
+Benchmark (leitores e escritores em processos separados, mais um processo
+que segura o lock de escrita como uma exportação longa):
+    python repeticao.py --leitores 4 --escritores 4 --segundos 5
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+
+
+def erro_transitorio(erro):
+    """True para banco ocupado/travado; False para constraint, SQL inválido etc."""
+    if isinstance(erro, sqlite3.IntegrityError):
+        return False
+    codigo = getattr(erro, "sqlite_errorcode", None)
+    if codigo is not None:
+        return codigo & 0xff in (SQLITE_BUSY, SQLITE_LOCKED)
+    mensagem = str(erro).lower()
+    return "locked" in mensagem or "busy" in mensagem
+
+
+class PoliticaRepeticao:
+    def __init__(self, tentativas=5, base=0.01, maximo=0.5):
+        self.tentativas = tentativas  # novas tentativas depois da primeira
+        self.base = base
+        self.maximo = maximo
+
+    def espera(self, tentativa):
+        return random.uniform(0, min(self.maximo, self.base * 2 ** tentativa))
+
+
+def executar_com_repeticao(funcao, politica, metricas=None):
+    """
+    Chama `funcao()` até dar certo ou acabarem as tentativas. Erros não
+    transitórios e o último erro transitório são repassados a quem chamou.
+    """
+    tentativa = 0
+    while True:
+        inicio = time.perf_counter()
+        try:
+            return funcao()
+        except sqlite3.Error as e:
+            if not erro_transitorio(e) or tentativa >= politica.tentativas:
+                raise
+            time.sleep(politica.espera(tentativa))
+            tentativa += 1
+            if metricas:
+                metricas.registrar_espera_lock(time.perf_counter() - inicio)
+
+
+# ----------------------------------------------------------------- benchmark
+
+def _silenciar():
+    # As mensagens de "banco ocupado" de cada falha não interessam aqui
+    sys.stdout = open(os.devnull, 'w')
+
+
+def _leitor(caminho, busy_timeout_ms, repeticao, fim, fila):
+    from database import DatabaseManager
+
+    _silenciar()
+    db = DatabaseManager(caminho, busy_timeout_ms=busy_timeout_ms, repeticao=repeticao)
+    leituras = falhas = 0
+    while time.time() < fim:
+        if db.executar_query("SELECT tamanho, COUNT(*), SUM(estoque) FROM produtos GROUP BY tamanho") is None:
+            falhas += 1
+        else:
+            leituras += 1
+    fila.put(("leitor", leituras, falhas, []))
+
+
+def _escritor(caminho, busy_timeout_ms, repeticao, fim, fila, numero):
+    from database import DatabaseManager
+
+    _silenciar()
+    db = DatabaseManager(caminho, busy_timeout_ms=busy_timeout_ms, repeticao=repeticao)
+    rng = random.Random(numero)
+    escritas = falhas = 0
+    latencias = []
+    while time.time() < fim:
+        inicio = time.perf_counter()
+        if rng.random() < 0.5:
+            resultado = db.executar_query(
+                "INSERT INTO produtos (nome, preco, tamanho, estoque) VALUES (?, ?, ?, ?)",
+                (f"Produto {numero}-{escritas}", 10.0, rng.choice("PMG"), rng.randint(0, 50)))
+        else:
+            resultado = db.executar_query("UPDATE produtos SET estoque = estoque + 1 WHERE id = ?",
+                                          (rng.randint(1, 1000),))
+        latencias.append(time.perf_counter() - inicio)
+        if resultado is None:
+            falhas += 1
+        else:
+            escritas += 1
+        time.sleep(0.002)
+    fila.put(("escritor", escritas, falhas, latencias))
+
+
+def _exportacao(caminho, fim, segurar_ms):
+    """Segura o lock de escrita de tempos em tempos, como uma importação longa"""
+    conn = sqlite3.connect(caminho, timeout=30, isolation_level=None)
+    while time.time() < fim:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE produtos SET preco = preco WHERE id <= 100")
+        time.sleep(segurar_ms / 1000)
+        conn.execute("COMMIT")
+        time.sleep(segurar_ms / 1000)
+    conn.close()
+
+
+def benchmark(leitores=4, escritores=4, segundos=5.0, busy_timeout_ms=100, segurar_ms=150):
+    # Só o benchmark usa estes; o DatabaseManager importa este módulo na inicialização
+    import multiprocessing
+    import shutil
+    import tempfile
+
+    from database import DatabaseManager
+
+    pasta = tempfile.mkdtemp(prefix="repeticao_")
+    try:
+        print(f"\n {leitores} leitores + {escritores} escritores por {segundos:g}s, busy_timeout {busy_timeout_ms}ms, "
+              f"exportação segurando o lock {segurar_ms}ms")
+        print("-" * 84)
+        print(f"{'Modo':<16} {'Escritas':>9} {'Falhas':>7} {'Escritas/s':>11} {'Leituras/s':>11} "
+              f"{'p50':>9} {'p99':>9}")
+        print("-" * 84)
+        for modo, repeticao in (("sem repetição", False), ("com repetição", True)):
+            caminho = os.path.join(pasta, f"{modo.split()[0]}.db")
+            db = DatabaseManager(caminho)
+            db.criar_tabelas()
+            conn = db.abrir_conexao()
+            conn.executemany("INSERT INTO produtos (nome, preco, tamanho, estoque) VALUES (?, ?, ?, ?)",
+                             ((f"Base {i}", 10.0, "PMG"[i % 3], i % 50) for i in range(1000)))
+            conn.commit()
+            conn.close()
+
+            fila = multiprocessing.Queue()
+            fim = time.time() + 0.5 + segundos  # todos começam depois de subir
+            processos = [multiprocessing.Process(target=_exportacao, args=(caminho, fim, segurar_ms))]
+            processos += [multiprocessing.Process(target=_leitor,
+                                                  args=(caminho, busy_timeout_ms, repeticao, fim, fila))
+                          for _ in range(leitores)]
+            processos += [multiprocessing.Process(target=_escritor,
+                                                  args=(caminho, busy_timeout_ms, repeticao, fim, fila, n))
+                          for n in range(escritores)]
+            for processo in processos:
+                processo.start()
+            resultados = [fila.get() for _ in range(leitores + escritores)]
+            for processo in processos:
+                processo.join()
+
+            leituras = sum(r[1] for r in resultados if r[0] == "leitor")
+            escritas = sum(r[1] for r in resultados if r[0] == "escritor")
+            falhas = sum(r[2] for r in resultados if r[0] == "escritor")
+            latencias = sorted(valor for r in resultados for valor in r[3])
+            p50 = latencias[len(latencias) // 2] * 1000 if latencias else 0.0
+            p99 = latencias[int(len(latencias) * 0.99)] * 1000 if latencias else 0.0
+            print(f"{modo:<16} {escritas:>9} {falhas:>7} {escritas / segundos:>11.0f} "
+                  f"{leituras / segundos:>11.0f} {p50:>7.1f}ms {p99:>7.1f}ms")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de contenção: sem x com novas tentativas")
+    parser.add_argument("--leitores", type=int, default=4)
+    parser.add_argument("--escritores", type=int, default=4)
+    parser.add_argument("--segundos", type=float, default=5.0)
+    parser.add_argument("--busy-timeout-ms", type=int, default=100)
+    parser.add_argument("--segurar-ms", type=float, default=150,
+                        help="quanto tempo a exportação simulada segura o lock de escrita")
+    args = parser.parse_args()
+    benchmark(args.leitores, args.escritores, args.segundos, args.busy_timeout_ms, args.segurar_ms)
@@ -0,0 +1,606 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Roteamento de queries entre vários arquivos SQLite (shards)
+
+Dois modos, configuráveis por tabela:
+    - por tabela: cada tabela fica em um arquivo próprio
+      {"por_tabela": {"produtos": "produtos.db"}}
+    - por hash: as linhas de uma tabela são distribuídas pelo hash do id
+      {"por_hash": {"clientes": ["clientes_0.db", "clientes_1.db"]}}
+
+Tabelas não listadas ficam no arquivo padrão. O mapa pode ser salvo em
+JSON (shards.json) e é carregado pelo main.py quando existir.
+
+Limitações do modo por hash:
+    - UNIQUE (email, cnpj) só é garantido dentro de cada shard;
+    - os ids são alocados pelo roteador (MAX(id) + 1 entre os shards);
+      se dois processos alocarem o mesmo id, o segundo recebe erro de
+      chave primária e tenta de novo com o contador atualizado;
+    - agregações em leitura espalhada só suportam SELECT COUNT(*);
+    - LIMIT/OFFSET em leitura espalhada: cada shard devolve até
+      LIMIT + OFFSET linhas e o corte é feito depois da intercalação.
+
+Redistribuição (com o sistema parado):
+    python sharding.py --para novo_mapa.json [--de shards.json]
+Cada processo que carrega o mapa (carregar_mapa_padrao) guarda uma trava
+compartilhada em shards.trava enquanto viver; a redistribuição pede a
+trava exclusiva e se recusa a começar se houver outro processo usando o
+banco. Quem abre o sistema durante a redistribuição espera ela terminar
+e já carrega o mapa novo.
+"""
+
+import argparse
+import contextlib
+import heapq
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+
+ARQUIVO_MAPA = "shards.json"
+TABELAS = ("produtos", "clientes", "fornecedores")
+# Tabelas auxiliares que moram no arquivo da linha e vão junto com ela:
+# tabela -> (coluna com o id, tabela principal; None = indicada na coluna `tabela`)
+DEPENDENTES = {
+    "historico_precos": ("produto_id", "produtos"),
+    "alertas_estoque": ("produto_id", "produtos"),
+    "produtos_fornecedores": ("produto_id", "produtos"),
+    "busca_trigramas": ("linha_id", None),
+    "busca_nomes": ("linha_id", None),
+    "busca_pendentes": ("linha_id", None),
+}
+# Tabelas sem ligação com uma linha, que ficam no arquivo padrão
+GLOBAIS = ("categorias",)
+ESPERA_TRAVA = 24 * 3600  # segundos que um processo espera a redistribuição terminar
+
+_re_tabela = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE(?:\s+IF\s+NOT\s+EXISTS)?)\s+(\w+)", re.I)
+_re_where_id = re.compile(r"\bWHERE\s+id\s*=\s*\?\s*;?\s*$", re.I)
+_re_order_by = re.compile(r"\bORDER\s+BY\s+(.+?)\s*;?\s*$", re.I | re.S)
+_re_limite = re.compile(r"\s+LIMIT\s+(-?\d+|\?)(?:\s+OFFSET\s+(\d+|\?))?\s*;?\s*$", re.I)
+_re_insert = re.compile(r"^\s*INSERT\s+(OR\s+\w+\s+)?INTO\s+(\w+)\s*\(([^)]*)\)\s*VALUES\s*\(([^)]*)\)",
+                        re.I | re.S)
+_re_count = re.compile(r"^\s*SELECT\s+COUNT\(\*\)\s+FROM\b", re.I)
+
+
+def _hash_chave(valor):
+    """Hash estável (não depende de PYTHONHASHSEED)"""
+    if isinstance(valor, int):
+        return valor
+    return zlib.crc32(str(valor).encode("utf-8"))
+
+
+class MapaShards:
+    def __init__(self, padrao="sistema_comercial.db", por_tabela=None, por_hash=None):
+        self.padrao = padrao
+        self.por_tabela = dict(por_tabela or {})
+        self.por_hash = {t: list(arqs) for t, arqs in (por_hash or {}).items()}
+
+    def arquivos(self, tabela):
+        """Todos os arquivos que guardam linhas da tabela"""
+        if tabela in self.por_hash:
+            return list(self.por_hash[tabela])
+        return [self.por_tabela.get(tabela, self.padrao)]
+
+    def arquivo_para_chave(self, tabela, chave):
+        """Arquivo responsável por uma chave da tabela"""
+        arquivos = self.arquivos(tabela)
+        return arquivos[_hash_chave(chave) % len(arquivos)]
+
+    def particionada(self, tabela):
+        return tabela in self.por_hash and len(self.por_hash[tabela]) > 1
+
+    def todos_arquivos(self):
+        """Arquivos distintos, na ordem em que aparecem no mapa"""
+        vistos = [self.padrao]
+        for arquivo in self.por_tabela.values():
+            vistos.append(arquivo)
+        for arquivos in self.por_hash.values():
+            vistos.extend(arquivos)
+        return list(dict.fromkeys(vistos))
+
+    def para_dict(self):
+        return {"padrao": self.padrao, "por_tabela": self.por_tabela, "por_hash": self.por_hash}
+
+    def salvar(self, caminho=ARQUIVO_MAPA):
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump(self.para_dict(), arquivo, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def carregar(cls, caminho=ARQUIVO_MAPA):
+        with open(caminho, encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+        return cls(dados.get("padrao", "sistema_comercial.db"),
+                   dados.get("por_tabela"), dados.get("por_hash"))
+
+
+def arquivo_trava(caminho=ARQUIVO_MAPA):
+    """shards.json -> shards.trava"""
+    return os.path.splitext(caminho)[0] + ".trava"
+
+
+_uso = None  # Conexão que segura a trava compartilhada deste processo
+
+
+def registrar_uso(caminho=ARQUIVO_MAPA):
+    """
+    Trava compartilhada (SQLite, modo rollback) mantida até o processo
+    terminar; o sistema operacional a solta mesmo se o processo cair.
+    Espera uma redistribuição em andamento terminar.
+    """
+    global _uso
+    if _uso is not None:
+        return
+    for espera in (0, ESPERA_TRAVA):
+        conn = sqlite3.connect(arquivo_trava(caminho), timeout=espera, isolation_level=None,
+                               check_same_thread=False)
+        try:
+            # A leitura dentro da transação segura a trava SHARED até o COMMIT (que nunca vem)
+            conn.execute("BEGIN")
+            conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            _uso = conn
+            return
+        except sqlite3.OperationalError:
+            conn.close()
+            if espera:
+                raise
+            print(" Redistribuição de shards em andamento; aguardando terminar...")
+
+
+@contextlib.contextmanager
+def uso_exclusivo(caminho=ARQUIVO_MAPA):
+    """
+    Trava exclusiva para a redistribuição: devolve False (sem esperar) se
+    outro processo estiver usando o banco. A trava compartilhada do
+    próprio processo é solta antes e retomada no fim.
+    """
+    global _uso
+    proprio, _uso = _uso, None
+    if proprio is not None:
+        proprio.close()
+    conn = sqlite3.connect(arquivo_trava(caminho), timeout=0, isolation_level=None)
+    try:
+        try:
+            conn.execute("BEGIN EXCLUSIVE")
+        except sqlite3.OperationalError:
+            yield False
+        else:
+            yield True
+    finally:
+        conn.close()
+        if proprio is not None:
+            registrar_uso(caminho)
+
+
+def carregar_mapa_padrao(caminho=ARQUIVO_MAPA, registrar=True):
+    """
+    Carrega o mapa de shards se o arquivo existir. Com `registrar`, o
+    processo passa a segurar a trava de uso (ver registrar_uso) antes de
+    ler o mapa, para não usar um mapa que está sendo trocado.
+    """
+    if registrar:
+        registrar_uso(caminho)
+    if os.path.exists(caminho):
+        return MapaShards.carregar(caminho)
+    return None
+
+
+def _chave_ordenacao(colunas):
+    """Função de chave para ORDER BY simples (NULL primeiro, como no SQLite)"""
+    def chave(linha):
+        return tuple((linha[c] is not None, linha[c]) for c in colunas)
+    return chave
+
+
+def _separar_limite(query, params):
+    """
+    Tira LIMIT/OFFSET do fim da query (literais ou ?): devolve
+    (query, params, limite, deslocamento); limite None = sem LIMIT
+    """
+    m = _re_limite.search(query)
+    if not m:
+        return query, params, None, 0
+    params = list(params or ())
+    valores = []
+    for grupo in (m.group(1), m.group(2)):
+        if grupo == "?":
+            valores.append(None)  # preenchido abaixo, dos últimos parâmetros
+        else:
+            valores.append(int(grupo) if grupo else 0)
+    for i in reversed(range(len(valores))):
+        if valores[i] is None:
+            valores[i] = int(params.pop())
+    limite, deslocamento = valores
+    return query[:m.start()], tuple(params), (None if limite < 0 else limite), deslocamento
+
+
+def _parse_order_by(query):
+    """Extrai colunas/direções de um ORDER BY simples (query já sem LIMIT)"""
+    m = _re_order_by.search(query)
+    if not m:
+        return None, None
+    colunas, direcoes = [], []
+    for parte in m.group(1).split(","):
+        tokens = parte.split()
+        if not tokens:
+            continue
+        colunas.append(tokens[0].split(".")[-1])
+        direcoes.append(len(tokens) > 1 and tokens[1].upper() == "DESC")
+    return colunas, direcoes
+
+
+class RoteadorShards:
+    """Encaminha cada statement para o(s) arquivo(s) certo(s) do mapa"""
+
+    def __init__(self, mapa, abrir_conexao):
+        self.mapa = mapa
+        self.abrir_conexao = abrir_conexao
+        self._lock = threading.RLock()
+        self._ids = {}
+
+    # ---------------------------------------------------------------- execução
+
+    def _executar_em(self, arquivo, query, params):
+        conn = self.abrir_conexao(arquivo)
+        try:
+            cursor = conn.execute(query, params or ())
+            if query.strip().upper().startswith('SELECT'):
+                return cursor.fetchall(), None
+            conn.commit()
+            return cursor.rowcount, cursor.lastrowid
+        finally:
+            conn.close()
+
+    def executar(self, query, params=None):
+        """Mesmo contrato de DatabaseManager.executar_query"""
+        try:
+            tipo = query.strip().split(None, 1)[0].upper()
+            m = _re_tabela.search(query)
+            tabela = m.group(1) if m else None
+
+            if tipo == 'SELECT':
+                return self._select(tabela, query, params)
+            if tipo == 'INSERT' and tabela:
+                return self._insert(tabela, query, params)
+            if tipo in ('UPDATE', 'DELETE') and tabela:
+                return self._update_delete(tabela, query, params)
+
+            # DDL e demais: aplicados em todos os arquivos para manter o
+            # schema (incluindo triggers entre tabelas) igual em cada shard
+            resultado = None
+            for arquivo in self.mapa.todos_arquivos():
+                resultado, _ = self._executar_em(arquivo, query, params)
+            return resultado
+        except sqlite3.Error as e:
+            print(f" Erro ao executar query: {e}")
+            return None
+
+    def _arquivos_alvo(self, tabela, query, params):
+        """Um único shard quando a query filtra por id; senão todos"""
+        if self.mapa.particionada(tabela) and params and _re_where_id.search(query):
+            return [self.mapa.arquivo_para_chave(tabela, params[-1])]
+        return self.mapa.arquivos(tabela)
+
+    def _select(self, tabela, query, params):
+        arquivos = self._arquivos_alvo(tabela, query, params) if tabela else [self.mapa.padrao]
+        if len(arquivos) == 1:
+            return self._executar_em(arquivos[0], query, params)[0]
+
+        if _re_count.match(query):
+            parciais = [self._executar_em(arq, query, params)[0] for arq in arquivos]
+            return [(sum(p[0][0] for p in parciais),)]
+
+        # LIMIT/OFFSET valem para o resultado intercalado, não para cada shard
+        query, params, limite, deslocamento = _separar_limite(query, params)
+        colunas, direcoes = _parse_order_by(query)
+        if limite is not None:
+            query, params = f"{query} LIMIT ?", params + (limite + deslocamento,)
+        parciais = [self._executar_em(arq, query, params)[0] for arq in arquivos]
+
+        if not colunas:
+            linhas = itertools.chain.from_iterable(parciais)
+        elif len(set(direcoes)) == 1:
+            # Cada shard já devolve ordenado: basta intercalar
+            linhas = heapq.merge(*parciais, key=_chave_ordenacao(colunas), reverse=direcoes[0])
+        else:
+            linhas = list(itertools.chain.from_iterable(parciais))
+            for coluna, desc in reversed(list(zip(colunas, direcoes))):
+                linhas.sort(key=_chave_ordenacao([coluna]), reverse=desc)
+        if limite is not None or deslocamento:
+            linhas = itertools.islice(linhas, deslocamento, None if limite is None else deslocamento + limite)
+        return list(linhas)
+
+    def _proximo_id(self, tabela, recarregar=False):
+        with self._lock:
+            if recarregar or tabela not in self._ids:
+                maior = 0
+                for arquivo in self.mapa.arquivos(tabela):
+                    conn = self.abrir_conexao(arquivo)
+                    try:
+                        maior = max(maior, conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {tabela}").fetchone()[0])
+                        seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (tabela,)).fetchone()
+                        if seq:
+                            maior = max(maior, seq[0])
+                    except sqlite3.OperationalError:
+                        pass
+                    finally:
+                        conn.close()
+                self._ids[tabela] = maior
+            self._ids[tabela] += 1
+            return self._ids[tabela]
+
+    def _insert(self, tabela, query, params):
+        with self._lock:
+            if not self.mapa.particionada(tabela):
+                arquivo = self.mapa.arquivos(tabela)[0]
+                return self._executar_em(arquivo, query, params)[0]
+
+            m = _re_insert.match(query)
+            if not m or re.search(r"\bid\b", m.group(3)):
+                raise sqlite3.OperationalError(
+                    f"INSERT em tabela particionada precisa da forma INSERT INTO {tabela} (...) VALUES (...)")
+            ou = m.group(1) or ""
+            query_com_id = (f"INSERT {ou}INTO {tabela} (id, {m.group(3)}) "
+                            f"VALUES (?, {m.group(4)})")
+
+            for tentativa in range(2):
+                novo_id = self._proximo_id(tabela, recarregar=tentativa > 0)
+                arquivo = self.mapa.arquivo_para_chave(tabela, novo_id)
+                try:
+                    resultado, _ = self._executar_em(arquivo, query_com_id, (novo_id,) + tuple(params or ()))
+                    return resultado
+                except sqlite3.IntegrityError as e:
+                    # Outro processo usou o mesmo id: recarrega o contador
+                    if tentativa or f"{tabela}.id" not in str(e):
+                        raise
+
+    def _update_delete(self, tabela, query, params):
+        with self._lock:
+            arquivos = self._arquivos_alvo(tabela, query, params)
+            total = 0
+            for arquivo in arquivos:
+                resultado, _ = self._executar_em(arquivo, query, params)
+                total += max(resultado, 0)
+            return total
+
+    # ---------------------------------------------------------- redistribuição
+
+    def _desativar_triggers(self, arquivo):
+        """
+        Remove os triggers das tabelas principais e devolve o SQL deles: a
+        cópia não é um cadastro novo (CDC 'I', histórico de preços,
+        contagens) nem a remoção da origem uma exclusão. user_version = 0
+        faz a próxima inicialização recriá-los se o processo cair antes.
+        """
+        conn = self.abrir_conexao(arquivo)
+        try:
+            marcadores = ", ".join("?" * len(TABELAS))
+            triggers = conn.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+                                    f"AND tbl_name IN ({marcadores})", TABELAS).fetchall()
+            conn.execute("PRAGMA user_version = 0")
+            for nome, _ in triggers:
+                conn.execute(f"DROP TRIGGER IF EXISTS {nome}")
+            conn.commit()
+            return [sql for _, sql in triggers]
+        finally:
+            conn.close()
+
+    def _reativar_triggers(self, arquivo, triggers):
+        conn = self.abrir_conexao(arquivo)
+        try:
+            for sql in triggers:
+                conn.execute(sql)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _mover_bloco(self, conn, tabela, colunas):
+        """
+        Move as linhas de temp.movendo (com as auxiliares) de main para
+        destino, em uma transação. Uma cópia deixada por uma execução
+        interrompida é substituída, sem contar de novo.
+        """
+        from busca_aproximada import TABELAS_BUSCA
+        from cadastros import TABELAS_CADASTRO
+
+        movendo = "(SELECT id FROM temp.movendo)"
+        novos = f"{movendo} AND id NOT IN (SELECT id FROM destino.{tabela})"
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if tabela in TABELAS_CADASTRO:
+                # Contagens de cadastros por dia: sai da origem, entra no destino
+                for esquema, filtro, sinal in (("main", movendo, -1), ("destino", novos, 1)):
+                    conn.execute(f"""
+                        INSERT INTO {esquema}.cadastros_por_dia (dia, tabela, total)
+                        SELECT date(data_cadastro), ?, ? * COUNT(*) FROM main.{tabela}
+                        WHERE id IN {filtro} AND date(data_cadastro) IS NOT NULL GROUP BY 1
+                        ON CONFLICT (dia, tabela) DO UPDATE SET total = total + excluded.total
+                    """, (tabela, sinal))
+                    conn.execute(f"DELETE FROM {esquema}.cadastros_por_dia WHERE tabela = ? AND total <= 0",
+                                 (tabela,))
+            if tabela in TABELAS_BUSCA:
+                # Frequências dos trigramas que mudam de arquivo
+                conn.execute(f"""
+                    INSERT INTO destino.busca_frequencias (tabela, trigrama, total)
+                    SELECT tabela, trigrama, COUNT(*) FROM main.busca_trigramas t
+                    WHERE tabela = ? AND linha_id IN {movendo} AND NOT EXISTS (
+                        SELECT 1 FROM destino.busca_trigramas d
+                        WHERE d.tabela = t.tabela AND d.trigrama = t.trigrama AND d.linha_id = t.linha_id)
+                    GROUP BY tabela, trigrama
+                    ON CONFLICT (tabela, trigrama) DO UPDATE SET total = total + excluded.total
+                """, (tabela,))
+                conn.execute(f"""
+                    UPDATE main.busca_frequencias SET total = total - (
+                        SELECT COUNT(*) FROM main.busca_trigramas t
+                        WHERE t.tabela = busca_frequencias.tabela AND t.trigrama = busca_frequencias.trigrama
+                          AND t.linha_id IN {movendo})
+                    WHERE tabela = ? AND trigrama IN (
+                        SELECT trigrama FROM main.busca_trigramas WHERE tabela = ? AND linha_id IN {movendo})
+                """, (tabela, tabela))
+
+            for dependente, (coluna, principal) in DEPENDENTES.items():
+                if principal not in (None, tabela):
+                    continue
+                filtro = f"{coluna} IN {movendo}" + ("" if principal else " AND tabela = ?")
+                params = () if principal else (tabela,)
+                # O id próprio (historico_precos, alertas_estoque) é do arquivo: o destino gera outro
+                lista = ", ".join(col[1] for col in conn.execute(f"PRAGMA main.table_info({dependente})")
+                                  if col[1] != "id")
+                conn.execute(f"DELETE FROM destino.{dependente} WHERE {filtro}", params)
+                conn.execute(f"INSERT INTO destino.{dependente} ({lista}) "
+                             f"SELECT {lista} FROM main.{dependente} WHERE {filtro}", params)
+                conn.execute(f"DELETE FROM main.{dependente} WHERE {filtro}", params)
+
+            conn.execute(f"INSERT OR REPLACE INTO destino.{tabela} ({colunas}) "
+                         f"SELECT {colunas} FROM main.{tabela} WHERE id IN {movendo}")
+            cursor = conn.execute(f"DELETE FROM main.{tabela} WHERE id IN {movendo}")
+            conn.execute("COMMIT")
+            return max(cursor.rowcount, 0)
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def _mover_changelog(self, conn, tabela, novo_mapa, destino, lote):
+        """
+        Leva ao destino as entradas do CDC ainda não lidas por algum
+        consumidor (o changelog e as marcas são de cada arquivo); as já
+        lidas por todos ficam na origem até a compactação.
+        """
+        lidas = conn.execute("SELECT COALESCE(MIN(ultimo_id), 0) FROM main.changelog_marcas").fetchone()[0]
+        ids = [entrada for entrada, linha_id in conn.execute(
+            "SELECT id, linha_id FROM main.changelog WHERE id > ? AND tabela = ? ORDER BY id", (lidas, tabela))
+            if novo_mapa.arquivo_para_chave(tabela, linha_id) == destino]
+        for inicio in range(0, len(ids), lote):
+            bloco = ids[inicio:inicio + lote]
+            marcadores = ", ".join("?" * len(bloco))
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(f"""
+                    INSERT INTO destino.changelog (op, tabela, linha_id, colunas, data)
+                    SELECT op, tabela, linha_id, colunas, data FROM main.changelog
+                    WHERE id IN ({marcadores}) ORDER BY id
+                """, bloco)
+                conn.execute(f"DELETE FROM main.changelog WHERE id IN ({marcadores})", bloco)
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        return len(ids)
+
+    def _mover_linhas(self, tabela, origem, destino, novo_mapa, lote):
+        """Move de `origem` para `destino` as linhas que o novo mapa põe lá"""
+        conn = self.abrir_conexao(origem)
+        conn.isolation_level = None
+        movidas = 0
+        try:
+            conn.execute("ATTACH DATABASE ? AS destino", (destino,))
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS movendo (id INTEGER PRIMARY KEY)")
+            # table_info omite as colunas geradas (nome_ordenacao), que não aceitam INSERT
+            colunas = ", ".join(col[1] for col in conn.execute(f"PRAGMA main.table_info({tabela})"))
+            ultimo = 0
+            while True:
+                ids = [linha[0] for linha in conn.execute(
+                    f"SELECT id FROM main.{tabela} WHERE id > ? ORDER BY id LIMIT ?", (ultimo, lote))]
+                if not ids:
+                    break
+                ultimo = ids[-1]
+                mover = [(i,) for i in ids if novo_mapa.arquivo_para_chave(tabela, i) == destino]
+                if mover:
+                    conn.execute("DELETE FROM temp.movendo")
+                    conn.executemany("INSERT INTO temp.movendo (id) VALUES (?)", mover)
+                    movidas += self._mover_bloco(conn, tabela, colunas)
+            self._mover_changelog(conn, tabela, novo_mapa, destino, lote)
+        finally:
+            conn.close()
+        return movidas
+
+    def _mover_globais(self, mapa_antigo, novo_mapa):
+        """Tabelas do arquivo padrão (categorias), se o padrão mudou"""
+        for tabela in GLOBAIS:
+            origem, destino = mapa_antigo.arquivos(tabela)[0], novo_mapa.arquivos(tabela)[0]
+            if origem == destino:
+                continue
+            conn = self.abrir_conexao(origem)
+            try:
+                conn.execute("ATTACH DATABASE ? AS destino", (destino,))
+                colunas = ", ".join(col[1] for col in conn.execute(f"PRAGMA main.table_info({tabela})"))
+                # Mesmos ids: fornecedores.categoria_id aponta para eles
+                conn.execute(f"INSERT OR REPLACE INTO destino.{tabela} ({colunas}) "
+                             f"SELECT {colunas} FROM main.{tabela}")
+                conn.execute(f"DELETE FROM main.{tabela}")
+                conn.commit()
+            finally:
+                conn.close()
+
+    def redistribuir(self, novo_mapa, criar_tabelas, lote=5000, salvar_em=None):
+        """
+        Redistribui os dados para um novo mapa, com o sistema parado (a
+        trava de uso_exclusivo garante que nenhum outro processo está com
+        o mapa antigo aberto; neste processo, as escritas esperam o lock).
+
+        1. cria o schema nos arquivos novos e tira os triggers das tabelas
+           principais de todos os arquivos;
+        2. move cada bloco de linhas, com as auxiliares (DEPENDENTES), as
+           contagens (cadastros_por_dia, busca_frequencias) e o changelog
+           ainda não consumido, em uma transação com o destino anexado;
+        3. move as tabelas globais se o arquivo padrão mudou, recria os
+           triggers e troca o mapa (salvo em `salvar_em` ainda com a trava,
+           para quem estava esperando já abrir com o mapa novo).
+        Devolve False se outro processo estiver usando o banco.
+        """
+        with uso_exclusivo(salvar_em or ARQUIVO_MAPA) as exclusivo:
+            if not exclusivo:
+                print(" O banco está em uso por outro processo (sistema, importação, manutenção...). "
+                      "Feche-os e tente novamente.")
+                return False
+            with self._lock:
+                for arquivo in novo_mapa.todos_arquivos():
+                    criar_tabelas(arquivo)
+                mapa_antigo = self.mapa
+                arquivos = list(dict.fromkeys(mapa_antigo.todos_arquivos() + novo_mapa.todos_arquivos()))
+                triggers = {arquivo: self._desativar_triggers(arquivo) for arquivo in arquivos}
+                try:
+                    for tabela in TABELAS:
+                        movidas = 0
+                        for origem in mapa_antigo.arquivos(tabela):
+                            for destino in novo_mapa.arquivos(tabela):
+                                if destino != origem:
+                                    movidas += self._mover_linhas(tabela, origem, destino, novo_mapa, lote)
+                        print(f" {tabela}: {movidas} linhas movidas")
+                    self._mover_globais(mapa_antigo, novo_mapa)
+                finally:
+                    for arquivo, sqls in triggers.items():
+                        self._reativar_triggers(arquivo, sqls)
+                self.mapa = novo_mapa
+                self._ids.clear()
+                if salvar_em:
+                    novo_mapa.salvar(salvar_em)
+        print(" Redistribuição concluída!")
+        return True
+
+
+def main():
+    from database import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Redistribui o banco entre shards")
+    parser.add_argument("--de", default=None, help=f"Mapa atual (padrão: {ARQUIVO_MAPA} ou arquivo único)")
+    parser.add_argument("--para", required=True, help="Novo mapa em JSON")
+    parser.add_argument("--lote", type=int, default=5000)
+    args = parser.parse_args()
+
+    # Sem registrar uso: a redistribuição pede a trava exclusiva
+    mapa_atual = MapaShards.carregar(args.de) if args.de else (carregar_mapa_padrao(registrar=False) or MapaShards())
+    novo_mapa = MapaShards.carregar(args.para)
+
+    db = DatabaseManager(mapa_shards=mapa_atual)
+    if db.redistribuir_shards(novo_mapa, lote=args.lote, salvar_em=ARQUIVO_MAPA):
+        print(f" Novo mapa salvo em {ARQUIVO_MAPA}")
+
+
+if __name__ == "__main__":
+    main()
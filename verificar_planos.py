@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Verificação de planos de execução das queries dos módulos CRUD
+
+Coleta (via ast) todo SQL literal de loja.py, cliente.py, fornecedor.py,
+visualisar_dados.py e compras.py, roda EXPLAIN QUERY PLAN de cada um em um banco
+populado e falha quando uma query faz SCAN de tabela sem estar na lista de
+permitidas ou usa B-tree temporária para ORDER BY (esta nem as permitidas
+podem: as listagens saem na ordem de um índice). Percorrer um índice
+parcial inteiro não conta como SCAN: ele só tem as linhas do filtro.
+
+f-strings com {nome_tabela}/{tabela} são expandidas para cada tabela;
+outras partes dinâmicas não podem ser verificadas e só são listadas.
+
+Uso:
+    python verificar_planos.py            # sai com código 1 se houver regressão
+    python verificar_planos.py --listar   # mostra todas as queries e planos
+"""
+
+import argparse
+import ast
+import itertools
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+ARQUIVOS_VERIFICADOS = ["loja.py", "cliente.py", "fornecedor.py", "visualisar_dados.py", "compras.py",
+                       "cadastros.py"]
+TABELAS = ["produtos", "clientes", "fornecedores"]
+# {selecao} é a lista de colunas do visualizador; para o plano, equivale a *.
+# {lista}, {ordem} e {filtro} são a chave da paginação do visualizador (rowid nestas tabelas)
+SUBSTITUICOES = {"nome_tabela": TABELAS, "tabela": TABELAS, "selecao": ["*"], "lista": ["rowid"],
+                 "ordem": ["rowid", "rowid DESC"],
+                 "filtro": ["", "WHERE (rowid) > (?)", "WHERE (rowid) >= (?)", "WHERE (rowid) < (?)"]}
+
+# (arquivo, trecho da query normalizada ou modelo exato da f-string, motivo)
+PERMITIDAS = [
+    ("loja.py", "SELECT * FROM produtos ORDER BY nome_ordenacao, nome",
+     "listagem completa: lê a tabela toda, na ordem do índice nome_ordenacao"),
+    ("cliente.py", "SELECT * FROM clientes ORDER BY nome_ordenacao, nome",
+     "listagem completa: lê a tabela toda, na ordem do índice nome_ordenacao"),
+    ("fornecedor.py", "SELECT * FROM fornecedores ORDER BY nome_ordenacao, nome",
+     "listagem completa: lê a tabela toda, na ordem do índice nome_ordenacao"),
+    ("loja.py", "WHERE nome LIKE ?", "busca por substring (LIKE '%termo%') não usa índice"),
+    ("cliente.py", "WHERE nome LIKE ? OR email LIKE ?", "busca por substring (LIKE '%termo%') não usa índice"),
+    ("fornecedor.py", "WHERE nome LIKE ? OR categoria LIKE ?", "busca por substring (LIKE '%termo%') não usa índice"),
+    *[("visualisar_dados.py", f"FROM {tabela} ORDER BY rowid", "primeira página e amostra das larguras: LIMIT na ordem da chave")
+      for tabela in TABELAS],
+    ("visualisar_dados.py", "LIMIT 0", "só testa se a tabela tem rowid"),
+    ("visualisar_dados.py", "SELECT COUNT(*) FROM", "estatísticas: contagem total"),
+    ("visualisar_dados.py", "SELECT {selecao} FROM {nome_tabela}", "exportação para CSV: tabela inteira"),
+    ("visualisar_dados.py", "SELECT name FROM sqlite_master", "catálogo do SQLite"),
+    ("compras.py", "SELECT name FROM sqlite_master", "catálogo do SQLite (só no benchmark)"),
+    ("cadastros.py", "SELECT 1 FROM sqlite_master", "catálogo do SQLite"),
+    ("cadastros.py", "SELECT date(data_cadastro), '", "carga inicial das contagens: lê a tabela uma vez"),
+    ("cadastros.py", "SET data_cadastro = datetime('2015-01-01'", "benchmark: espalha as datas de cadastro"),
+]
+
+_re_sql = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.I)
+_re_scan = re.compile(r"^SCAN (\w+)")
+_re_indice = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+_re_literal = re.compile(r"'(?:[^']|'')*'")
+
+
+def normalizar(sql):
+    return " ".join(sql.split())
+
+
+def _renderizar(no):
+    """Devolve as versões concretas de uma f-string, ou None se não der"""
+    partes = []
+    for valor in no.values:
+        if isinstance(valor, ast.Constant):
+            partes.append([str(valor.value)])
+        elif isinstance(valor, ast.FormattedValue) and isinstance(valor.value, ast.Name) \
+                and valor.value.id in SUBSTITUICOES:
+            partes.append(SUBSTITUICOES[valor.value.id])
+        else:
+            return None
+    return ["".join(combinacao) for combinacao in itertools.product(*partes)]
+
+
+def coletar_queries(caminho):
+    """Lista de (linha, sql, modelo) com todo SQL literal de um arquivo"""
+    with open(caminho, encoding='utf-8') as arquivo:
+        arvore = ast.parse(arquivo.read(), caminho)
+
+    encontradas = []
+    dinamicas = []
+    dentro_de_fstring = set()
+    for no in ast.walk(arvore):
+        if isinstance(no, ast.JoinedStr):
+            for valor in no.values:
+                dentro_de_fstring.add(id(valor))
+            modelo = "".join(v.value if isinstance(v, ast.Constant)
+                             else "{" + ast.unparse(v.value) + "}" for v in no.values)
+            if not _re_sql.match(modelo):
+                continue
+            versoes = _renderizar(no)
+            if versoes is None:
+                dinamicas.append((no.lineno, normalizar(modelo)))
+            else:
+                encontradas.extend((no.lineno, normalizar(v), normalizar(modelo)) for v in versoes)
+    for no in ast.walk(arvore):
+        if isinstance(no, ast.Constant) and isinstance(no.value, str) and id(no) not in dentro_de_fstring:
+            if _re_sql.match(no.value):
+                sql = normalizar(no.value)
+                encontradas.append((no.lineno, sql, sql))
+    return sorted(encontradas), dinamicas
+
+
+def _parametros(sql):
+    """Parâmetros fictícios (NULL) para o EXPLAIN"""
+    sem_literais = _re_literal.sub("''", sql)
+    nomeados = re.findall(r"(?<![:\w]):(\w+)", sem_literais)
+    if nomeados:
+        return {nome: None for nome in nomeados}
+    return (None,) * sem_literais.count("?")
+
+
+def criar_banco_populado(caminho, quantidade=20000):
+    """Banco de teste com o schema atual e dados de exemplo"""
+    from database import DatabaseManager
+    from dados_exemplo import popular_banco
+
+    db = DatabaseManager(caminho)
+    db.criar_tabelas()
+    popular_banco(caminho, produtos=quantidade, clientes=quantidade, fornecedores=quantidade)
+    conn = sqlite3.connect(caminho)
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def indices_parciais(conn):
+    """Nomes dos índices com WHERE: percorrê-los inteiros só lê as linhas filtradas"""
+    return {nome for nome, sql in conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index'")
+            if sql and " WHERE " in normalizar(sql).upper()}
+
+
+def problemas_do_plano(plano, parciais=()):
+    problemas = []
+    for linha in plano:
+        detalhe = linha[3]
+        m = _re_scan.match(detalhe)
+        indice = _re_indice.search(detalhe)
+        if indice and indice.group(1) in parciais:
+            m = None
+        if m and m.group(1) not in ("json_each",) and "(subquery" not in detalhe:
+            problemas.append(detalhe)
+        if "USE TEMP B-TREE FOR ORDER BY" in detalhe:
+            problemas.append(detalhe)
+    return problemas
+
+
+def permitida(arquivo, sql, modelo):
+    for arq, trecho, motivo in PERMITIDAS:
+        if arq == arquivo and (trecho in sql or trecho == modelo):
+            return motivo
+    return None
+
+
+def verificar(arquivos=None, banco=None, listar=False):
+    """Retorna o número de regressões encontradas"""
+    arquivos = arquivos or ARQUIVOS_VERIFICADOS
+    pasta = None
+    if banco is None:
+        pasta = tempfile.mkdtemp()
+        banco = os.path.join(pasta, "planos.db")
+        print(" Criando banco de teste populado...")
+        criar_banco_populado(banco)
+
+    conn = sqlite3.connect(banco)
+    falhas = 0
+    try:
+        parciais = indices_parciais(conn)
+        for arquivo in arquivos:
+            caminho = arquivo if os.path.exists(arquivo) else os.path.join(os.path.dirname(os.path.abspath(__file__)), arquivo)
+            queries, dinamicas = coletar_queries(caminho)
+            for linha, sql, modelo in queries:
+                try:
+                    plano = conn.execute("EXPLAIN QUERY PLAN " + sql, _parametros(sql)).fetchall()
+                except sqlite3.Error as e:
+                    print(f" ERRO   {arquivo}:{linha}: {e}\n        {sql}")
+                    falhas += 1
+                    continue
+                problemas = problemas_do_plano(plano, parciais)
+                motivo = permitida(arquivo, sql, modelo)
+                if motivo:
+                    # A permissão cobre a varredura, não a ordenação em B-tree temporária
+                    permitidos = [p for p in problemas if "TEMP B-TREE" not in p]
+                    problemas = [p for p in problemas if "TEMP B-TREE" in p]
+                else:
+                    permitidos = []
+                if problemas:
+                    falhas += 1
+                    print(f" FALHOU {arquivo}:{linha}: {'; '.join(problemas)}\n        {sql}")
+                elif listar:
+                    status = f"PERMITIDA ({motivo})" if permitidos else "OK"
+                    print(f" {status} {arquivo}:{linha}\n        {sql}")
+                    for passo in plano:
+                        print(f"          {passo[3]}")
+            for linha, modelo in dinamicas:
+                if listar:
+                    print(f" DINÂMICA (não verificada) {arquivo}:{linha}\n        {modelo}")
+    finally:
+        conn.close()
+        if pasta:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+    if falhas:
+        print(f"\n {falhas} query(s) com plano inesperado.")
+    else:
+        print("\n Todos os planos estão dentro do esperado.")
+    return falhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica os planos de execução das queries")
+    parser.add_argument("--banco", help="Usa um banco existente em vez de criar um populado")
+    parser.add_argument("--arquivos", nargs="+", help="Arquivos a verificar")
+    parser.add_argument("--listar", action="store_true", help="Mostra todas as queries e planos")
+    args = parser.parse_args()
+    sys.exit(1 if verificar(args.arquivos, args.banco, args.listar) else 0)
+
+
+if __name__ == "__main__":
+    main()
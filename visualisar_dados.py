@@ -4,9 +4,12 @@
 Script para visualizar dados do banco SQLite de forma organizada
 """
 
+import shutil
 import sqlite3
 from datetime import datetime
 
+from cadastros import cadastros_por_periodo, imprimir_cadastros
+
 def conectar_banco(db_name="sistema_comercial.db"):
     """Conecta ao banco de dados"""
     try:
@@ -17,8 +20,101 @@ def conectar_banco(db_name="sistema_comercial.db"):
         print(f" Erro ao conectar: {e}")
         return None
 
-def visualizar_tabela(nome_tabela):
-    """Visualiza uma tabela específica"""
+TAMANHO_PAGINA = 20
+LARGURA_MINIMA = 3
+LARGURA_MAXIMA = 40
+TAMANHO_AMOSTRA = 100
+
+def _texto(valor):
+    return "N/A" if valor is None else str(valor)
+
+def _colunas(cursor, nome_tabela):
+    """Colunas mostradas e exportadas: table_info deixa de fora as geradas (nome_ordenacao...)"""
+    cursor.execute(f"PRAGMA table_info({nome_tabela})")
+    return [col[1] for col in cursor.fetchall()]
+
+def _chave(cursor, nome_tabela):
+    """Colunas da paginação: rowid, ou a chave primária nas tabelas WITHOUT ROWID (busca_*, cadastros_por_dia...)"""
+    try:
+        cursor.execute(f"SELECT rowid FROM {nome_tabela} LIMIT 0")
+        return ["rowid"]
+    except sqlite3.OperationalError:
+        cursor.execute(f"PRAGMA table_info({nome_tabela})")
+        return [col[1] for col in sorted((col for col in cursor.fetchall() if col[5]), key=lambda col: col[5])]
+
+def _ordem(chave, desc=False):
+    return ", ".join(f"{coluna} DESC" if desc else coluna for coluna in chave)
+
+def _comparacao(chave, operador, valores):
+    """(a, b) > (?, ?): seek na chave (ou num prefixo dela) com row values"""
+    return f"({', '.join(chave[:len(valores)])}) {operador} ({', '.join('?' * len(valores))})"
+
+def _calcular_larguras(cursor, nome_tabela, colunas, chave):
+    """Calcula larguras a partir de uma amostra (início e fim da tabela)"""
+    selecao = ", ".join(colunas)
+    amostra = []
+    for desc in (False, True):
+        ordem = _ordem(chave, desc)
+        cursor.execute(f"SELECT {selecao} FROM {nome_tabela} ORDER BY {ordem} LIMIT ?", (TAMANHO_AMOSTRA,))
+        amostra.extend(cursor.fetchall())
+    
+    larguras = []
+    for i, col in enumerate(colunas):
+        tamanhos = sorted(len(_texto(linha[i])) for linha in amostra)
+        # Percentil 90: um valor muito longo não alarga a coluna inteira
+        p90 = tamanhos[int(len(tamanhos) * 0.9)] if tamanhos else 0
+        larguras.append(max(LARGURA_MINIMA, min(LARGURA_MAXIMA, max(len(col), p90))))
+    
+    # Ajustar à largura do terminal reduzindo as colunas mais largas
+    disponivel = shutil.get_terminal_size((120, 24)).columns
+    while sum(larguras) + 3 * (len(larguras) - 1) > disponivel and max(larguras) > 8:
+        larguras[larguras.index(max(larguras))] -= 1
+    return larguras
+
+def _formatar(valores, larguras):
+    partes = []
+    for valor, largura in zip(valores, larguras):
+        texto = _texto(valor)
+        if len(texto) > largura:
+            texto = texto[:largura - 1] + "…"
+        partes.append(texto.ljust(largura))
+    return " | ".join(partes)
+
+def _buscar_pagina(cursor, nome_tabela, chave, selecao, tamanho, depois_de=None, antes_de=None, a_partir_de=None):
+    """
+    Busca uma página por seek na chave (nunca usa OFFSET sobre as linhas).
+    Cada linha vem com as colunas da chave na frente; as posições são tuplas.
+    """
+    lista, ordem = ", ".join(chave), _ordem(chave)
+    if antes_de is not None:
+        filtro, params, ordem = f"WHERE {_comparacao(chave, '<', antes_de)}", antes_de, _ordem(chave, True)
+    elif a_partir_de is not None:
+        filtro, params = f"WHERE {_comparacao(chave, '>=', a_partir_de)}", a_partir_de
+    elif depois_de is not None:
+        filtro, params = f"WHERE {_comparacao(chave, '>', depois_de)}", depois_de
+    else:
+        filtro, params = "", ()
+    cursor.execute(f"SELECT {lista}, {selecao} FROM {nome_tabela} {filtro} ORDER BY {ordem} LIMIT ?",
+                   (*params, tamanho))
+    linhas = cursor.fetchall()
+    return list(reversed(linhas)) if antes_de is not None else linhas
+
+def _inicio_da_pagina(cursor, nome_tabela, chave, pagina, tamanho, ancoras):
+    """Chave inicial de uma página, partindo da âncora conhecida mais próxima"""
+    anteriores = [p for p in ancoras if p <= pagina]
+    base = max(anteriores) if anteriores else 1
+    inicio = ancoras.get(base)
+    pular = (pagina - base) * tamanho
+    lista = ", ".join(chave)
+    filtro = f"WHERE {_comparacao(chave, '>=', inicio)}" if inicio else ""
+    # Percorre só a chave (rowid ou chave primária), sem ler as demais colunas
+    cursor.execute(f"SELECT {lista} FROM {nome_tabela} {filtro} ORDER BY {lista} LIMIT 1 OFFSET ?",
+                   (*(inicio or ()), pular))
+    linha = cursor.fetchone()
+    return tuple(linha) if linha else None
+
+def visualizar_tabela(nome_tabela, tamanho_pagina=TAMANHO_PAGINA):
+    """Visualiza uma tabela específica, página por página"""
     conn = conectar_banco()
     if not conn:
         return
@@ -26,38 +122,87 @@ def visualizar_tabela(nome_tabela):
     try:
         cursor = conn.cursor()
         
-        # Buscar dados
-        cursor.execute(f"SELECT * FROM {nome_tabela}")
-        dados = cursor.fetchall()
+        # Buscar nomes das colunas
+        colunas = _colunas(cursor, nome_tabela)
+        selecao = ", ".join(colunas)
+        chave = _chave(cursor, nome_tabela)
+        n = len(chave)
         
-        if not dados:
+        def posicao(linha):
+            return tuple(linha)[:n]
+        
+        pagina_atual = _buscar_pagina(cursor, nome_tabela, chave, selecao, tamanho_pagina)
+        if not pagina_atual:
             print(f" Tabela '{nome_tabela}' está vazia.")
             return
         
-        # Buscar nomes das colunas
-        cursor.execute(f"PRAGMA table_info({nome_tabela})")
-        colunas = [col[1] for col in cursor.fetchall()]
+        larguras = _calcular_larguras(cursor, nome_tabela, colunas, chave)
+        header = _formatar(colunas, larguras)
+        numero = 1
+        ancoras = {1: posicao(pagina_atual[0])}  # página -> chave da primeira linha (só das visitadas)
         
-        print(f"\n TABELA: {nome_tabela.upper()}")
-        print("=" * 80)
-        
-        # Cabeçalho
-        header = " | ".join([f"{col[:15]:15}" for col in colunas])
-        print(header)
-        print("-" * len(header))
-        
-        # Dados
-        for linha in dados:
-            valores = []
-            for valor in linha:
-                if valor is None:
-                    valores.append("N/A".ljust(15))
+        while True:
+            print(f"\n TABELA: {nome_tabela.upper()} - Página {numero or '?'}")
+            print("=" * len(header))
+            print(header)
+            print("-" * len(header))
+            for linha in pagina_atual:
+                print(_formatar(tuple(linha)[n:], larguras))
+            
+            comando = input("\n[Enter] próxima  [a] anterior  [p N] página  [k ID] chave  [s] sair: ").strip().lower()
+            nova = None
+            
+            if comando in ('', 'n'):
+                nova = _buscar_pagina(cursor, nome_tabela, chave, selecao, tamanho_pagina,
+                                      depois_de=posicao(pagina_atual[-1]))
+                if nova:
+                    numero = numero + 1 if numero else None
                 else:
-                    str_valor = str(valor)[:15]
-                    valores.append(str_valor.ljust(15))
-            print(" | ".join(valores))
-        
-        print(f"\n Total de registros: {len(dados)}")
+                    print(" Última página.")
+            elif comando == 'a':
+                nova = _buscar_pagina(cursor, nome_tabela, chave, selecao, tamanho_pagina,
+                                      antes_de=posicao(pagina_atual[0]))
+                if nova:
+                    numero = max(1, numero - 1) if numero else None
+                else:
+                    print(" Primeira página.")
+            elif comando.startswith('p'):
+                try:
+                    destino = int(comando[1:])
+                    inicio = (_inicio_da_pagina(cursor, nome_tabela, chave, destino, tamanho_pagina, ancoras)
+                              if destino >= 1 else None)
+                    if inicio is None:
+                        print(" Página inexistente.")
+                    else:
+                        nova = _buscar_pagina(cursor, nome_tabela, chave, selecao, tamanho_pagina, a_partir_de=inicio)
+                        numero = destino
+                except ValueError:
+                    print(" Digite um número de página válido.")
+            elif comando.startswith('k'):
+                valor = comando[1:].strip()
+                if not valor:
+                    print(" Digite uma chave (id) válida.")
+                else:
+                    try:
+                        valor = int(valor)
+                    except ValueError:
+                        pass  # Chave de texto (ex.: dia em cadastros_por_dia)
+                    # Seek na primeira coluna da chave
+                    nova = _buscar_pagina(cursor, nome_tabela, chave, selecao, tamanho_pagina, a_partir_de=(valor,))
+                    if nova:
+                        # Descobrir o número da página exigiria contar as linhas anteriores
+                        numero = None
+                    else:
+                        print(" Nenhum registro a partir dessa chave.")
+            elif comando == 's':
+                break
+            else:
+                print(" Opção inválida.")
+            
+            if nova:
+                pagina_atual = nova
+                if numero and len(ancoras) < 10000:
+                    ancoras.setdefault(numero, posicao(nova[0]))
         
     except sqlite3.Error as e:
         print(f" Erro ao consultar tabela: {e}")
@@ -117,7 +262,9 @@ def exportar_para_csv(nome_tabela):
     
     try:
         cursor = conn.cursor()
-        cursor.execute(f"SELECT * FROM {nome_tabela}")
+        colunas = _colunas(cursor, nome_tabela)
+        selecao = ", ".join(colunas)
+        cursor.execute(f"SELECT {selecao} FROM {nome_tabela}")
         dados = cursor.fetchall()
         
         if not dados:
@@ -127,10 +274,6 @@ def exportar_para_csv(nome_tabela):
         # Nome do arquivo
         arquivo_csv = f"{nome_tabela}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         
-        # Buscar nomes das colunas
-        cursor.execute(f"PRAGMA table_info({nome_tabela})")
-        colunas = [col[1] for col in cursor.fetchall()]
-        
         # Escrever CSV
         with open(arquivo_csv, 'w', newline='', encoding='utf-8') as arquivo:
             writer = csv.writer(arquivo)
@@ -146,6 +289,38 @@ def exportar_para_csv(nome_tabela):
     finally:
         conn.close()
 
+def relatorio_cadastros():
+    """Novos clientes, fornecedores e produtos por dia, semana ou mês"""
+    try:
+        inicio = datetime.strptime(input("Data inicial (AAAA-MM-DD): ").strip(), "%Y-%m-%d").date()
+        fim = datetime.strptime(input("Data final (AAAA-MM-DD): ").strip(), "%Y-%m-%d").date()
+    except ValueError:
+        print(" Data inválida.")
+        return
+    if fim < inicio:
+        print(" A data final é anterior à inicial.")
+        return
+    
+    periodos = {'1': "dia", '2': "semana", '3': "mes"}
+    periodo = periodos.get(input("Agrupar por 1. Dia  2. Semana  3. Mês: ").strip())
+    if not periodo:
+        print(" Opção inválida.")
+        return
+    
+    conn = conectar_banco()
+    if not conn:
+        return
+    
+    try:
+        # Lê a contagem diária mantida pelos triggers, não as tabelas
+        linhas = cadastros_por_periodo(conn, inicio.isoformat(), fim.isoformat(), periodo)
+        print(f"\n CADASTROS DE {inicio:%d/%m/%Y} A {fim:%d/%m/%Y}")
+        imprimir_cadastros(linhas, periodo)
+    except sqlite3.Error as e:
+        print(f" Erro ao gerar relatório: {e}")
+    finally:
+        conn.close()
+
 def menu_visualizador():
     """Menu principal do visualizador"""
     while True:
@@ -156,7 +331,8 @@ def menu_visualizador():
         print("2. Visualizar tabela específica")
         print("3. Visualizar todas as tabelas")
         print("4. Exportar tabela para CSV")
-        print("5. Sair")
+        print("5. Cadastros por período")
+        print("6. Sair")
         print("="*50)
         
         opcao = input("Escolha uma opção: ").strip()
@@ -206,6 +382,9 @@ def menu_visualizador():
                 print(" Nenhuma tabela encontrada.")
                 
         elif opcao == '5':
+            relatorio_cadastros()
+            
+        elif opcao == '6':
             print(" Saindo do visualizador...")
             break
             